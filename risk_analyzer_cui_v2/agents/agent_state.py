@@ -1,28 +1,40 @@
 # agent_state.py
-from pydantic import BaseModel, Field, root_validator
+from pydantic import BaseModel, Field
+from pydantic.dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from core.logger import logger
+from app_config import (
+    STATE_DEBUG_LOGGING,
+    MESSAGE_WINDOW,
+    INPUT_HISTORY_WINDOW,
+    HISTORY_SUMMARY_MAX_CHARS,
+    HISTORY_LINE_MAX_CHARS,
+)
 
 
-class Message(BaseModel):
+# AgentState is rebuilt by LangGraph before every node and on every
+# checkpoint restore, so construction must stay free of side effects.
+# Set STATE_DEBUG_LOGGING = True to log constructions while debugging.
+#
+# messages / input_history are windows, not transcripts: turns that fall
+# out of the window are folded into history_summary, so checkpoint size
+# stays flat however long a thread runs. The full conversation is in the
+# messages table (/conversation/<conv_id>/messages).
+
+
+def _clip(text: str, limit: int = HISTORY_LINE_MAX_CHARS) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+@dataclass(slots=True)
+class Message:
     role: str  # 'user' or 'assistant'
     content: str
     timestamp: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = None
 
-    # Log whenever a message is created
-    @root_validator(pre=True)
-    def log_message_creation(cls, values):
-        try:
-            role = values.get("role")
-            content = values.get("content", "")
-            safe_preview = (content[:150] + "...") if len(content) > 150 else content
-            logger.debug("Message created: role=%s | content_preview=%s", role, safe_preview)
-        except Exception:
-            logger.exception("Failed logging message creation")
-        return values
-
 
 class AgentState(BaseModel):
     user_id: str
@@ -40,80 +52,84 @@ class AgentState(BaseModel):
     approved: Optional[bool] = None
     refinement_count: int = 0
     human_input: bool = False
+    deadline_at: Optional[float] = None  # epoch seconds; see core/deadline.py
+    summary_mode: Optional[str] = None  # "llm" | "local" | "auto"; None → SUMMARY_MODE
+    analysis_mode: Optional[str] = None  # "single" | "parallel"; None → ANALYSIS_MODE
+    durability: Optional[str] = None  # "sync" | "async" | "exit"; None → CHECKPOINT_DURABILITY
+    history_summary: Optional[str] = None  # turns folded out of messages / input_history
+
+    if STATE_DEBUG_LOGGING:
+        def model_post_init(self, __context) -> None:
+            logger.debug("AgentState built: user_id=%s thread_id=%s status=%s messages=%d",
+                         self.user_id, self.thread_id, self.status, len(self.messages))
 
-    # Log state initialization
-    @root_validator(pre=True)
-    def log_state_initialization(cls, values):
-        try:
-            logger.info("Initializing AgentState for user_id=%s thread_id=%s",
-                        values.get("user_id"), values.get("thread_id"))
-            logger.debug("Initial AgentState values: %s", values)
-        except Exception:
-            logger.exception("Failed logging AgentState initialization")
-        return values
-
-    # Custom helper: add message with logging
+    # Custom helper: add message
     def add_message(self, role: str, content: str, metadata: Dict[str, Any] = None):
-        try:
-            logger.info("Adding message to AgentState: role=%s", role)
-            preview = (content[:150] + "...") if len(content) > 150 else content
-            logger.debug("Message content preview: %s", preview)
+        self.messages.append(Message(role=role, content=content, timestamp=datetime.utcnow(), metadata=metadata))
+        self.compact_history()
+        if STATE_DEBUG_LOGGING:
+            logger.debug("Message added: role=%s total=%d", role, len(self.messages))
 
-            msg = Message(role=role, content=content, timestamp=datetime.utcnow(), metadata=metadata)
-            self.messages.append(msg)
+    # Custom helper: add a follow-up input (clarification / feedback) to the contract
+    def add_input(self, text: str):
+        self.input_history.append(text)
+        self.compact_history()
+        self.input_contract = "\n".join(self.input_history)
 
-            logger.debug("Total messages in state now: %d", len(self.messages))
-        except Exception:
-            logger.exception("Failed to add message to AgentState")
+    # Custom helper: fold turns that left the window into history_summary
+    def compact_history(self):
+        folded = []
 
-    # Custom helper: add error with logging
+        overflow = len(self.messages) - MESSAGE_WINDOW
+        if overflow > 0:
+            folded += [f"{m.role}: {_clip(m.content)}" for m in self.messages[:overflow]]
+            del self.messages[:overflow]
+
+        # input_history[0] is the contract itself and always stays
+        overflow = len(self.input_history) - INPUT_HISTORY_WINDOW
+        if overflow > 0:
+            folded += [f"input: {_clip(t)}" for t in self.input_history[1:1 + overflow]]
+            del self.input_history[1:1 + overflow]
+
+        if not folded:
+            return
+        summary = "\n".join(filter(None, [self.history_summary, *folded]))
+        if len(summary) > HISTORY_SUMMARY_MAX_CHARS:
+            # Keep the newest lines; drop whole lines from the front
+            summary = summary[-HISTORY_SUMMARY_MAX_CHARS:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        self.history_summary = summary
+
+    # Custom helper: prompt context = rolling summary + last `last` messages
+    def recent_context(self, last: int) -> str:
+        lines = [f"{m.role}: {m.content}" for m in self.messages[-last:]]
+        if self.history_summary:
+            lines.insert(0, f"Earlier in this conversation:\n{self.history_summary}")
+        return "\n".join(lines)
+
+    # Custom helper: add error
     def add_error(self, error_msg: str):
-        try            :
-            logger.warning("Adding error to AgentState: %s", error_msg)
-            self.errors.append(error_msg)
-            logger.debug("Total errors in state now: %d", len(self.errors))
-        except Exception:
-            logger.exception("Failed to append error to AgentState")
-
-    # Custom helper: update status with logging
+        logger.warning("Adding error to AgentState: %s", error_msg)
+        self.errors.append(error_msg)
+
+    # Custom helper: update status
     def set_status(self, status: str):
-        try:
-            logger.info("Updating AgentState status: %s → %s", self.status, status)
-            self.status = status
-        except Exception:
-            logger.exception("Failed updating status")
+        if STATE_DEBUG_LOGGING:
+            logger.debug("AgentState status: %s → %s", self.status, status)
+        self.status = status
 
-    # Custom helper: change quality score with logging
+    # Custom helper: change quality score
     def set_quality_score(self, score: int):
-        try:
-            logger.info("Setting quality_score=%s", score)
-            self.quality_score = score
-        except Exception:
-            logger.exception("Failed updating quality_score")
+        self.quality_score = score
 
-    # Custom helper: update summary with logging
+    # Custom helper: update summary
     def set_summary(self, summary_text: str):
-        try:
-            preview = (summary_text[:200] + "...") if len(summary_text) > 200 else summary_text
-            logger.info("Updating summary (preview): %s", preview)
-            self.summary = summary_text
-        except Exception:
-            logger.exception("Failed updating summary")
+        self.summary = summary_text
 
     # Custom helper: update risk analysis report
     def set_risk_report(self, report: Dict[str, Any]):
-        try:
-            logger.info("Updating risk_analysis_report")
-            logger.debug("Risk report data: %s", report)
-            self.risk_analysis_report = report
-        except Exception:
-            logger.exception("Failed updating risk_analysis_report")
+        self.risk_analysis_report = report
 
     # Custom helper: increment refinement count
     def increment_refinement(self):
-        try:
-            logger.info("Incrementing refinement_count: %s → %s",
-                        self.refinement_count, self.refinement_count + 1)
-            self.refinement_count += 1
-        except Exception:
-            logger.exception("Failed to increment refinement_count")
+        self.refinement_count += 1
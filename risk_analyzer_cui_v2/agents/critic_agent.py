@@ -1,6 +1,6 @@
 # critic_agent.py
 from .agent_state import AgentState
-from core.logger import logger
+from core.logger import logger, lazy_dump
 
 
 class CriticAgent:
@@ -9,14 +9,21 @@ class CriticAgent:
         self.state = state
         return self.evaluate()
 
+    async def acall(self, state: AgentState):
+        """
+        Async entrypoint used by the async graph.
+        Scoring is pure CPU work with no I/O, so it runs inline on a
+        throwaway instance to keep concurrent runs isolated.
+        """
+        logger.info("CriticAgent invoked (async)")
+        critic = CriticAgent()
+        critic.state = state
+        return critic.evaluate()
+
     def evaluate(self):
         logger.info("Starting quality evaluation based on risk analysis report")
 
-        try:
-            logger.debug("Incoming state: %s",
-                         self.state.model_dump() if hasattr(self.state, "model_dump") else self.state)
-        except Exception:
-            logger.exception("Failed to dump state for logging")
+        logger.debug("Incoming state: %s", lazy_dump(self.state))
 
         report = self.state.risk_analysis_report or {}
         logger.debug("Risk report received for evaluation: %s", report)
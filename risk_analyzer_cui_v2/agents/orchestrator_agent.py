@@ -1,10 +1,18 @@
 # orchestrator_agent.py
 import uuid
-from typing import Union, Dict, Any
+import asyncio
+import functools
+from typing import Union, Dict, Any, Optional
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command, interrupt
-from core.database import checkpointer
+from langgraph.checkpoint.memory import InMemorySaver
+from core.database import checkpointer, get_async_checkpointer
+from core.async_runtime import run_sync
+from core.tracing import trace_context, refinement_scope, span
+from core.deadline import can_afford_refinement, remaining_seconds
+from core.risk_store import record_report
+from app_config import GRAPH_EXECUTION_MODE, SPECULATIVE_ANALYSIS, CHECKPOINT_DURABILITY
 
 from .agent_state import AgentState
 from .validation_agent import ValidationAgent
@@ -12,25 +20,57 @@ from .risk_analysis_agent import RiskAnalysisAgent
 from .critic_agent import CriticAgent
 from .summarizer_agent import SummarizerAgent
 
-from core.db_utils import (
-    get_conversation_by_thread,
-    create_conversation,
-    add_message
-)
+from core import conversation_repo
 
 from core.logger import logger
 
 
+def _traced_run(name: str):
+    """
+    Open a trace keyed by self.state.thread_id around a run method.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                with trace_context(self.state.thread_id, name):
+                    return await fn(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with trace_context(self.state.thread_id, name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+DURABILITY_MODES = ("sync", "async", "exit")
+
+
+def job_message_id(job_id: Optional[str], role: str) -> Optional[uuid.UUID]:
+    """
+    Stable message_id for a message written on behalf of a queued job, so
+    a retried attempt of the job can't insert it twice. None outside jobs.
+    """
+    return uuid.uuid5(uuid.UUID(str(job_id)), role) if job_id else None
+
+
 class OrchestratorAgent:
     _graph = None
+    _async_graph = None
+    _async_graph_lock = None
+    _offline_graph = None
 
-    def __init__(self, state: AgentState):
+    def __init__(self, state: AgentState, job_id: Optional[str] = None):
         logger.info(
             "Initializing OrchestratorAgent for user_id=%s thread_id=%s",
             state.user_id, state.thread_id
         )
 
         self.state = state
+        self.job_id = job_id    # set when run by the job worker (worker.py)
 
         # Ensure thread_id exists
         if not self.state.thread_id:
@@ -56,26 +96,33 @@ class OrchestratorAgent:
         return state if isinstance(state, dict) else {}
 
     # -----------------------------------------------
-    def _build_graph(self):
-        logger.info("Creating StateGraph...")
+    def _build_graph(self, async_mode: bool = False, saver=None):
+        logger.info("Creating StateGraph (async_mode=%s)...", async_mode)
         g = StateGraph(AgentState)
 
+        wrap = self._awrap if async_mode else self._wrap
+        speculative = async_mode and SPECULATIVE_ANALYSIS
+
         # Nodes
-        g.add_node("validation", self._wrap(self.validation))
-        g.add_node("analyzer", self._wrap(self.analyzer))
-        g.add_node("critic", self._wrap(self.critic))
+        if speculative:
+            g.add_node("validation", self._speculative_validation_node)
+        else:
+            g.add_node("validation", wrap(self.validation))
+        g.add_node("analyzer", wrap(self.analyzer))
+        g.add_node("critic", wrap(self.critic))
         g.add_node("arbiter", self._arbiter_node)
         g.add_node("human_review", self._human_review_node)
-        g.add_node("summarizer", self._wrap(self.summarizer))
+        g.add_node("summarizer", wrap(self.summarizer))
 
         # Flow
         g.add_edge(START, "validation")
 
+        # Speculative validation already ran the first analysis → go straight to critic
         g.add_conditional_edges(
             "validation",
             self.route_after_validation,
             {
-                "analyzer": "analyzer",
+                "analyzer": "critic" if speculative else "analyzer",
                 "end": END
             }
         )
@@ -96,11 +143,30 @@ class OrchestratorAgent:
 
         g.add_edge("summarizer", END)
 
-        compiled = g.compile(checkpointer=checkpointer)
+        compiled = g.compile(checkpointer=saver if saver is not None else checkpointer)
         logger.info("Graph compiled successfully")
 
         return compiled
 
+    # -----------------------------------------------
+    async def get_async_graph(self):
+        """
+        Build the async graph once per process, on the shared event loop
+        (the async checkpointer is bound to that loop).
+        """
+        if OrchestratorAgent._async_graph is not None:
+            return OrchestratorAgent._async_graph
+
+        if OrchestratorAgent._async_graph_lock is None:
+            OrchestratorAgent._async_graph_lock = asyncio.Lock()
+
+        async with OrchestratorAgent._async_graph_lock:
+            if OrchestratorAgent._async_graph is None:
+                saver = await get_async_checkpointer()
+                OrchestratorAgent._async_graph = self._build_graph(async_mode=True, saver=saver)
+
+        return OrchestratorAgent._async_graph
+
     # -----------------------------------------------
     def _wrap(self, agent_callable):
         def node(state):
@@ -108,7 +174,8 @@ class OrchestratorAgent:
             logger.info("Executing node: %s", name)
 
             try:
-                res = agent_callable(state)
+                with refinement_scope(state.refinement_count), span(f"node.{name}", kind="node"):
+                    res = agent_callable(state)
             except Exception as e:
                 logger.exception("Agent '%s' failed: %s", name, e)
                 return {
@@ -121,6 +188,64 @@ class OrchestratorAgent:
 
         return node
 
+    # -----------------------------------------------
+    def _awrap(self, agent_callable):
+        async def node(state):
+            name = agent_callable.__class__.__name__
+            logger.info("Executing node (async): %s", name)
+
+            try:
+                with refinement_scope(state.refinement_count), span(f"node.{name}", kind="node"):
+                    res = await agent_callable.acall(state)
+            except Exception as e:
+                logger.exception("Agent '%s' failed: %s", name, e)
+                return {
+                    "status": "failed",
+                    "errors": [str(e)],
+                    "thread_id": state.thread_id
+                }
+
+            return res.model_dump() if hasattr(res, "model_dump") else res
+
+        return node
+
+    # -----------------------------------------------
+    async def _speculative_validation_node(self, state):
+        """
+        Validation and the first analysis only depend on the input, so in
+        async mode both LLM calls run concurrently on separate state copies.
+        If validation rejects the input the analysis is discarded; otherwise
+        the analyzed state is returned (analysis overwrites the same fields
+        validation sets, so the result matches the sequential flow).
+        """
+        logger.info("Executing node (async): speculative validation + analysis")
+
+        async def traced_call(agent):
+            with span(f"node.{agent.__class__.__name__}", kind="node", speculative=True):
+                return await agent.acall(state.model_copy(deep=True))
+
+        with refinement_scope(state.refinement_count), span("node.SpeculativeValidation", kind="node"):
+            validated, analyzed = await asyncio.gather(
+                traced_call(self.validation),
+                traced_call(self.analyzer),
+                return_exceptions=True,
+            )
+
+        for name, res in (("ValidationAgent", validated), ("RiskAnalysisAgent", analyzed)):
+            if isinstance(res, Exception):
+                logger.error("Agent '%s' failed: %s", name, res)
+                return {
+                    "status": "failed",
+                    "errors": [str(res)],
+                    "thread_id": state.thread_id
+                }
+
+        if validated.errors or validated.status == "failed":
+            logger.info("Validation rejected input; discarding speculative analysis")
+            return validated.model_dump()
+
+        return analyzed.model_dump()
+
     # -----------------------------------------------
     @staticmethod
     def route_after_validation(state):
@@ -146,6 +271,14 @@ class OrchestratorAgent:
 
     # -----------------------------------------------
     def _arbiter_node(self, state):
+        with refinement_scope(state.refinement_count), span("node.arbiter", kind="node") as sp:
+            decision = self._arbitrate(state)
+            if sp is not None:
+                sp["attributes"]["goto"] = decision.goto
+            return decision
+
+    # -----------------------------------------------
+    def _arbitrate(self, state):
         s = OrchestratorAgent._to_dict_state(state)
 
         score = s.get("quality_score", 0)
@@ -163,6 +296,15 @@ class OrchestratorAgent:
                 }
             )
 
+        # ⏱ NO BUDGET LEFT FOR ANOTHER ANALYZER CALL → SUMMARIZE WHAT WE HAVE
+        if score < 80 and refinements < 2 and not can_afford_refinement(s.get("deadline_at")):
+            logger.info("Skipping refinement: remaining budget %.1fs too small",
+                        remaining_seconds(s.get("deadline_at")))
+            return Command(
+                goto="summarizer",
+                update={"message": "Deadline reached; skipping refinement", "thread_id": thread_id}
+            )
+
         # 🔁 REFINE IF POOR QUALITY
         if score < 80 and refinements < 2:
             return Command(
@@ -186,31 +328,199 @@ class OrchestratorAgent:
         User is asked to provide corrections.
         LangGraph interrupt pauses execution.
         """
-        return interrupt(
-            "Human review needed. Provide corrections or improvements."
+        with span("node.human_review", kind="node"):
+            return interrupt(
+                "Human review needed. Provide corrections or improvements."
+            )
+
+    # -----------------------------------------------
+    @classmethod
+    def from_checkpoint(cls, thread_id: str, feedback: str = "", job_id: Optional[str] = None):
+        """
+        Restore the latest checkpoint of a thread and apply human feedback.
+        Returns None when the thread has no saved state.
+        """
+        with trace_context(thread_id, "graph.restore"):
+            saved_state = checkpointer.get_tuple({"configurable": {"thread_id": thread_id}})
+        if not saved_state:
+            return None
+
+        restored = saved_state.checkpoint["channel_values"]
+        logger.debug("Restored state from checkpoint: %s", restored)
+
+        # 🔥 Convert restored state to AgentState
+        state = AgentState(**restored)
+
+        # 🔥 Append new human feedback
+        if feedback:
+            conversation_repo.add_message(
+                conversation_repo.get_by_thread(thread_id),
+                "user",
+                feedback,
+                message_id=job_message_id(job_id, "user"),
+            )
+            # Keep the exchange in the (windowed) state so agents see what was asked
+            if state.message:
+                state.add_message("assistant", state.message)
+            state.message = None            # clear prior prompt
+            state.add_message("user", feedback)
+            state.add_input(feedback)
+            state.human_input = False       # feedback consumed
+        else:
+            state.compact_history()         # trims checkpoints written before the window existed
+
+        # Restart the agent from validation
+        return cls(state, job_id=job_id)
+
+    # -----------------------------------------------
+    @classmethod
+    def from_job_checkpoint(cls, thread_id: str, job_id: str):
+        """
+        Agent for a retried job whose earlier attempt already ran part of
+        the graph (its checkpoints carry the job_id), or None. Continue it
+        with continue_run() instead of starting over, which would apply the
+        job's input to the thread a second time.
+        """
+        saved = checkpointer.get_tuple({"configurable": {"thread_id": thread_id}})
+        if not saved or (saved.metadata or {}).get("job_id") != str(job_id):
+            return None
+        logger.info("Continuing job_id=%s from checkpoint %s", job_id,
+                    saved.config["configurable"]["checkpoint_id"])
+        return cls(AgentState(**saved.checkpoint["channel_values"]), job_id=job_id)
+
+    # -----------------------------------------------
+    def continue_run(self, deadline_at: Optional[float]) -> Dict[str, Any]:
+        """
+        Run the pending steps of the thread's latest checkpoint with a new
+        deadline (the stored one belongs to the interrupted attempt).
+
+        The deadline goes in as Command(update=...), which is applied before
+        the pending steps run. update_state() would instead count as a run
+        of the last node and drop the arbiter's Command(goto=...) route.
+        """
+        self.state.deadline_at = deadline_at
+        return self.invoke_graph(Command(update={"deadline_at": deadline_at}))
+
+    # -----------------------------------------------
+    def _durability(self, default: str = CHECKPOINT_DURABILITY) -> str:
+        return self.state.durability or default
+
+    # -----------------------------------------------
+    def _config(self) -> Dict[str, Any]:
+        config = {"configurable": {"thread_id": self.state.thread_id}}
+        if self.job_id:
+            # Stored in checkpoint metadata; lets a retry find this job's progress
+            config["metadata"] = {"job_id": str(self.job_id)}
+        return config
+
+    # -----------------------------------------------
+    def invoke_graph(self, graph_input: Union[Dict[str, Any], Command, None]) -> Dict[str, Any]:
+        """
+        Run the graph for this thread using the configured execution mode.
+        None or a Command continues from the thread's latest checkpoint.
+        """
+        if GRAPH_EXECUTION_MODE == "async":
+            return run_sync(self.ainvoke_graph(graph_input))
+
+        return self._invoke_sync(graph_input, self._config())
+
+    # -----------------------------------------------
+    @_traced_run("graph.invoke")
+    def _invoke_sync(self, graph_input: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.graph.invoke(graph_input, config=config, durability=self._durability())
+        record_report(result)
+        return result
+
+    # -----------------------------------------------
+    @_traced_run("graph.invoke")
+    async def ainvoke_graph(self, graph_input: Union[Dict[str, Any], Command, None]) -> Dict[str, Any]:
+        graph = await self.get_async_graph()
+        result = await graph.ainvoke(
+            graph_input,
+            config=self._config(),
+            durability=self._durability(),
         )
+        await asyncio.to_thread(record_report, result)
+        return result
 
     # -----------------------------------------------
     def run(self):
+        if GRAPH_EXECUTION_MODE == "async":
+            return run_sync(self.arun())
+
+        return self._run_sync()
+
+    # -----------------------------------------------
+    @_traced_run("graph.run")
+    def _run_sync(self):
         thread_id = self.state.thread_id
 
         # Ensure conversation exists
-        conv = get_conversation_by_thread(thread_id)
-        if not conv:
-            conv_id = create_conversation(self.state.user_id, thread_id)
-            conv = {"conversation_id": conv_id}
+        conv = conversation_repo.get_or_create(self.state.user_id, thread_id)
 
         # Log initial user message
-        add_message(conv["conversation_id"], "user", self.state.input_contract)
+        conversation_repo.add_message(conv, "user", self.state.input_contract,
+                                      message_id=job_message_id(self.job_id, "user"))
 
         # Run graph
-        result = self.graph.invoke(
-            self.state.model_dump(),
-            config={"configurable": {"thread_id": thread_id}}
-        )
+        result = self._invoke_sync(self.state.model_dump(), self._config())
 
-        # Save assistant reply
-        if result.get("message"):
-            add_message(conv["conversation_id"], "assistant", result["message"])
+        self.save_reply(result)
+        return result
+
+    # -----------------------------------------------
+    @_traced_run("graph.run")
+    async def arun(self):
+        """
+        Async counterpart of run(). DB helpers are blocking (psycopg pool),
+        so they are pushed to worker threads.
+        """
+        thread_id = self.state.thread_id
+
+        # Ensure conversation exists
+        conv = await asyncio.to_thread(conversation_repo.get_or_create, self.state.user_id, thread_id)
 
+        # Log initial user message
+        await asyncio.to_thread(conversation_repo.add_message, conv, "user", self.state.input_contract,
+                                message_id=job_message_id(self.job_id, "user"))
+
+        # Run graph
+        result = await self.ainvoke_graph(self.state.model_dump())
+
+        await asyncio.to_thread(self.save_reply, result)
         return result
+
+    # -----------------------------------------------
+    def save_reply(self, result: Dict[str, Any]) -> None:
+        """Record the assistant reply of a run in the conversation."""
+        if result.get("message"):
+            conversation_repo.add_message(
+                conversation_repo.get_or_create(self.state.user_id, self.state.thread_id),
+                "assistant",
+                result["message"],
+                message_id=job_message_id(self.job_id, "assistant"),
+            )
+
+    # -----------------------------------------------
+    @_traced_run("graph.run_offline")
+    async def arun_offline(self):
+        """
+        Run the async graph for bulk/offline jobs: no conversations, messages
+        or Postgres checkpoints. An in-memory saver is still needed for
+        interrupt(); the thread is dropped once the run finishes.
+        """
+        if OrchestratorAgent._offline_graph is None:
+            OrchestratorAgent._offline_graph = self._build_graph(async_mode=True, saver=InMemorySaver())
+
+        graph = OrchestratorAgent._offline_graph
+        thread_id = self.state.thread_id
+
+        try:
+            return await graph.ainvoke(
+                self.state.model_dump(),
+                config={"configurable": {"thread_id": thread_id}},
+                # The in-memory thread is dropped right after; intermediate steps are never read
+                durability=self._durability(default="exit"),
+            )
+        finally:
+            await graph.checkpointer.adelete_thread(thread_id)
@@ -1,9 +1,21 @@
 # risk_analysis_agent.py
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
 from .agent_state import AgentState
 from prompts.risk_analysis_prompt import risk_analysis_prompt
-from llm.llm_manager import call_llm
+from prompts.category_prompts import category_prompts
+from llm.llm_manager import call_llm, acall_llm
 from utils.common import extract_json
-from core.logger import logger
+from utils.risk_merge import merge_reports
+from core.deadline import llm_timeout
+from core.blob_store import expand
+from core.logger import logger, lazy_dump
+from app_config import ANALYSIS_MODE
+
+
+ANALYSIS_MODES = ("single", "parallel")
 
 
 class RiskAnalysisAgent:
@@ -13,68 +25,181 @@ class RiskAnalysisAgent:
         self.user_input = state.input_contract
         return self.run_analyzer()
 
+    async def acall(self, state: AgentState) -> AgentState:
+        """
+        Async entrypoint used by the async graph.
+        Works on the given state only, so the instance is safe to share
+        between concurrent runs.
+        """
+        logger.info("RiskAnalysisAgent invoked (async)")
+        if self._is_parallel(state):
+            return await self._acall_specialists(state)
+
+        prompt = self._build_prompt(state)
+
+        try:
+            logger.info("Calling LLM for risk analysis (async)...")
+            resp_text = await acall_llm(prompt, timeout=llm_timeout(state.deadline_at))
+            self._apply_response(state, resp_text)
+        except Exception as e:
+            self._apply_error(state, e)
+
+        return state
+
     def run_analyzer(self) -> AgentState:
-        logger.info("Starting risk analysis")
+        if self._is_parallel(self.state):
+            return self._run_specialists(self.state)
+
+        prompt = self._build_prompt(self.state)
+
         try:
-            logger.debug("Incoming state: %s", self.state.model_dump() if hasattr(self.state, "model_dump") else dict(self.state))
-        except Exception:
-            logger.exception("Failed to dump incoming state for logging")
+            logger.info("Calling Gemini LLM for risk analysis...")
+            resp_text = call_llm(prompt, timeout=llm_timeout(self.state.deadline_at))
+            self._apply_response(self.state, resp_text)
+        except Exception as e:
+            self._apply_error(self.state, e)
+
+        return self.state
+
+    # -------------------------------------------------------
+    # Category specialists (analysis_mode="parallel")
+    # -------------------------------------------------------
+    @staticmethod
+    def _is_parallel(state: AgentState) -> bool:
+        return (state.analysis_mode or ANALYSIS_MODE) == "parallel"
+
+    async def _acall_specialists(self, state: AgentState) -> AgentState:
+        full_input = self._build_input(state)
+        categories = list(category_prompts)
+        logger.info("Calling %d category specialists concurrently (async)...", len(categories))
+
+        try:
+            timeout = llm_timeout(state.deadline_at)
+            responses = await asyncio.gather(
+                *(acall_llm(category_prompts[c] + full_input, timeout=timeout) for c in categories),
+                return_exceptions=True,
+            )
+        except Exception as e:
+            self._apply_error(state, e)
+            return state
+
+        self._apply_specialist_responses(state, dict(zip(categories, responses)))
+        return state
+
+    def _run_specialists(self, state: AgentState) -> AgentState:
+        full_input = self._build_input(state)
+        categories = list(category_prompts)
+        logger.info("Calling %d category specialists concurrently...", len(categories))
+
+        try:
+            timeout = llm_timeout(state.deadline_at)
+        except Exception as e:
+            self._apply_error(state, e)
+            return state
+
+        responses = {}
+        with ThreadPoolExecutor(max_workers=len(categories), thread_name_prefix="specialist") as pool:
+            # copy_context() keeps the trace/span context inside the worker threads
+            futures = {
+                c: pool.submit(contextvars.copy_context().run, call_llm, category_prompts[c] + full_input, timeout)
+                for c in categories
+            }
+            for c, future in futures.items():
+                try:
+                    responses[c] = future.result()
+                except Exception as e:
+                    responses[c] = e
+
+        self._apply_specialist_responses(state, responses)
+        return state
+
+    @classmethod
+    def _apply_specialist_responses(cls, state: AgentState, responses) -> None:
+        reports, failed = {}, []
+        for category, resp in responses.items():
+            if isinstance(resp, BaseException):
+                logger.warning("Specialist %s failed: %s", category, resp)
+                failed.append(f"Analysis error ({category}): {resp}")
+                continue
+            reports[category] = extract_json(resp.strip() if isinstance(resp, str) else str(resp)) or {}
+
+        if not reports:
+            cls._apply_error(state, RuntimeError("; ".join(failed) or "no specialist responses"))
+            return
+
+        # Partial results are still useful. Not added to state.errors: any error there ends the run
+        if failed:
+            logger.warning("Continuing with %d/%d specialist reports", len(reports), len(responses))
+        merged = merge_reports(reports)
+        logger.info("Merged %d specialist reports into %d risks", len(reports), len(merged.get("analysis", [])))
+
+        state.risk_analysis_report = merged
+        state.status = "in_progress"
+        state.human_input = bool(merged.get("human_input"))
+        state.message = "Human input required" if state.human_input else ""
+
+    @staticmethod
+    def _build_prompt(state: AgentState) -> str:
+        prompt = risk_analysis_prompt + RiskAnalysisAgent._build_input(state)
+        logger.debug("Risk analysis prompt length=%d", len(prompt))
+        return prompt
+
+    @staticmethod
+    def _build_input(state: AgentState) -> str:
+        logger.info("Starting risk analysis")
+        logger.debug("Incoming state: %s", lazy_dump(state))
 
         # Append feedback to input if present
         try:
-            if getattr(self.state, "feedback", None):
+            if getattr(state, "feedback", None):
                 logger.info("Appending feedback to input_contract for analysis")
-                self.state.input_contract += f"\nFeedback: {self.state.feedback}"
+                state.input_contract += f"\nFeedback: {state.feedback}"
         except Exception as e:
             logger.exception("Error while appending feedback: %s", e)
 
         # Build recent context from last 3 messages
         try:
             logger.debug("Building recent_context from last 3 messages")
-            recent_context = "\n".join([f"{m.role}: {m.content}" for m in self.state.messages[-3:]])
+            recent_context = state.recent_context(3)
             logger.debug(f"recent_context: {recent_context}")
         except Exception as e:
             logger.exception("Failed to build recent_context: %s", e)
             recent_context = ""
 
-        full_input = f"{recent_context}\nAnalyze: {self.state.input_contract}"
-        prompt = risk_analysis_prompt + full_input
-        logger.debug("Risk analysis prompt length=%d", len(prompt))
+        return f"{recent_context}\nAnalyze: {expand(state.input_contract)}"
 
-        try:
-            logger.info("Calling Gemini LLM for risk analysis...")
-            resp_text = call_llm(prompt)
-            if isinstance(resp_text, str):
-                resp_text = resp_text.strip()
-            logger.info("LLM risk analysis response received")
-            logger.info("Raw LLM response preview: %s", (resp_text[:500] + "...") if isinstance(resp_text, str) and len(resp_text) > 500 else resp_text)
-
-            # Try to extract JSON from response
-            try:
-                resp_json = extract_json(resp_text) or {}
-                logger.info("Extracted JSON from LLM response: %s", resp_json)
-            except Exception as e:
-                logger.exception("Failed to extract JSON from LLM response: %s", e)
-                resp_json = {}
-
-            # Persist results into state
-            self.state.risk_analysis_report = resp_json
-            self.state.status = "in_progress"
-            human_flag = bool(resp_json.get("human_input"))
-            self.state.human_input = human_flag
-            self.state.message = "Human input required" if human_flag else ""
-            logger.info("Risk analysis completed; human_input=%s", human_flag)
-            logger.debug("State after analysis: %s", self.state.model_dump() if hasattr(self.state, "model_dump") else dict(self.state))
+    @staticmethod
+    def _apply_response(state: AgentState, resp_text) -> None:
+        if isinstance(resp_text, str):
+            resp_text = resp_text.strip()
+        logger.info("LLM risk analysis response received")
+        logger.info("Raw LLM response preview: %s", (resp_text[:500] + "...") if isinstance(resp_text, str) and len(resp_text) > 500 else resp_text)
 
+        # Try to extract JSON from response
+        try:
+            resp_json = extract_json(resp_text) or {}
+            logger.info("Extracted JSON from LLM response: %s", resp_json)
         except Exception as e:
-            logger.exception("Error during risk analysis: %s", e)
-            # ensure errors list exists
-            try:
-                self.state.errors = getattr(self.state, "errors", [])
-                self.state.errors.append(f"Analysis error: {e}")
-            except Exception:
-                logger.exception("Failed to append analysis error to state.errors")
-            self.state.status = "failed"
-            logger.debug("State after failed analysis: %s", self.state.model_dump() if hasattr(self.state, "model_dump") else dict(self.state))
+            logger.exception("Failed to extract JSON from LLM response: %s", e)
+            resp_json = {}
 
-        return self.state
+        # Persist results into state
+        state.risk_analysis_report = resp_json
+        state.status = "in_progress"
+        human_flag = bool(resp_json.get("human_input"))
+        state.human_input = human_flag
+        state.message = "Human input required" if human_flag else ""
+        logger.info("Risk analysis completed; human_input=%s", human_flag)
+        logger.debug("State after analysis: %s", lazy_dump(state))
+
+    @staticmethod
+    def _apply_error(state: AgentState, e: Exception) -> None:
+        logger.exception("Error during risk analysis: %s", e)
+        # ensure errors list exists
+        try:
+            state.errors = getattr(state, "errors", [])
+            state.errors.append(f"Analysis error: {e}")
+        except Exception:
+            logger.exception("Failed to append analysis error to state.errors")
+        state.status = "failed"
+        logger.debug("State after failed analysis: %s", lazy_dump(state))
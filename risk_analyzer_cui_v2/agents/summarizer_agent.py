@@ -1,82 +1,152 @@
 # summarizer_agent.py
 from .agent_state import AgentState
 from prompts.summarizer_prompt import summarizer_prompt
-from llm.llm_manager import call_llm
-from core.logger import logger
+from llm.llm_manager import call_llm, acall_llm
+from core.deadline import llm_timeout, summary_time_is_short, DeadlineExceeded
+from core.logger import logger, lazy_dump
+from utils.summary_renderer import render_summary, is_well_formed
+from app_config import SUMMARY_MODE, LOCAL_SUMMARY_MAX_RISKS
+import asyncio
 import json
 
 
+SUMMARY_MODES = ("llm", "local", "auto")
+
+
 class SummarizerAgent:
     def __call__(self, state: AgentState):
         logger.info("SummarizerAgent invoked")
         self.state = state
         return self.summarize()
 
+    async def acall(self, state: AgentState) -> AgentState:
+        """
+        Async entrypoint used by the async graph (state-local, no self.state).
+        """
+        logger.info("SummarizerAgent invoked (async)")
+        if self._use_local_summary(state):
+            return self._summarize_locally(state)
+
+        full_prompt = self._build_prompt(state)
+
+        try:
+            logger.info("Calling LLM for summarization (async)...")
+            resp_text = await acall_llm(full_prompt, timeout=llm_timeout(state.deadline_at))
+            self._apply_summary(state, resp_text)
+        except (DeadlineExceeded, asyncio.TimeoutError, TimeoutError) as e:
+            # TimeoutError includes LLMUnavailableError: the provider timed out or returned nothing
+            logger.warning("No LLM summary (%s); using local summary", e)
+            return self._summarize_locally(state)
+        except Exception as e:
+            self._apply_error(state, e)
+
+        return state
+
     def summarize(self) -> AgentState:
-        logger.info("Starting summarization process...")
+        if self._use_local_summary(self.state):
+            return self._summarize_locally(self.state)
+
+        full_prompt = self._build_prompt(self.state)
+
         try:
-            state_dump = self.state.model_dump() if hasattr(self.state, "model_dump") else dict(self.state)
-            logger.debug("Incoming state for summarizer: %s", state_dump)
-        except Exception:
-            logger.exception("Failed to dump incoming state")
+            logger.info("Calling Gemini LLM for summarization...")
+            resp_text = call_llm(full_prompt, timeout=llm_timeout(self.state.deadline_at))
+            self._apply_summary(self.state, resp_text)
+        except (DeadlineExceeded, TimeoutError) as e:
+            logger.warning("No LLM summary (%s); using local summary", e)
+            return self._summarize_locally(self.state)
+        except Exception as e:
+            self._apply_error(self.state, e)
+
+        return self.state
+
+    @staticmethod
+    def _use_local_summary(state: AgentState) -> bool:
+        """
+        summary_mode "local" always renders locally and "llm" always calls the
+        LLM; "auto" renders small, well-formed reports locally. Any mode goes
+        local when the deadline leaves no room for an LLM call.
+        """
+        if summary_time_is_short(state.deadline_at):
+            logger.info("Deadline nearly reached; rendering summary locally")
+            return True
+
+        mode = (state.summary_mode or SUMMARY_MODE).lower()
+        if mode == "local":
+            return True
+        if mode == "auto":
+            report = state.risk_analysis_report or {}
+            return is_well_formed(report) and len(report["analysis"]) <= LOCAL_SUMMARY_MAX_RISKS
+        return False
+
+    @classmethod
+    def _summarize_locally(cls, state: AgentState) -> AgentState:
+        logger.info("Rendering summary locally (no LLM call)")
+        cls._apply_summary(state, render_summary(state.risk_analysis_report or {}))
+        return state
+
+    @staticmethod
+    def _build_prompt(state: AgentState) -> str:
+        logger.info("Starting summarization process...")
+        logger.debug("Incoming state for summarizer: %s", lazy_dump(state))
 
         # Build recent conversation context (last 10 messages)
         try:
             logger.debug("Building recent messages context (last 10)")
-            recent_msgs = "\n".join([f"{m.role}: {m.content}" for m in self.state.messages[-10:]])
+            recent_msgs = state.recent_context(10)
         except Exception as e:
             logger.exception("Failed to build recent messages: %s", e)
             recent_msgs = ""
 
         # Prepare risk report JSON safely
         try:
-            risk_report_json = json.dumps(self.state.risk_analysis_report or {}, default=str)
+            risk_report_json = json.dumps(state.risk_analysis_report or {}, default=str)
         except Exception as e:
             logger.exception("Failed to serialize risk_analysis_report: %s", e)
             risk_report_json = "{}"
 
         full_prompt = summarizer_prompt + risk_report_json + f"\nConversation: {recent_msgs}"
         logger.debug("Final summarization prompt length=%d", len(full_prompt))
+        return full_prompt
+
+    @staticmethod
+    def _apply_summary(state: AgentState, resp_text) -> None:
+        if isinstance(resp_text, str):
+            resp_text = resp_text.strip()
+        logger.info("Received summarization response (len=%d)", len(resp_text) if isinstance(resp_text, str) else 0)
+        logger.debug("Raw summarizer response preview: %s", (resp_text[:500] + "...") if isinstance(resp_text, str) and len(resp_text) > 500 else resp_text)
 
+        # Truncate for storage / perf
+        truncated = resp_text[:1000] if isinstance(resp_text, str) else ""
+        state.summary = resp_text
+        logger.debug("Truncated summary length=%d", len(truncated))
+
+        # Decide next status based on whether human input was flagged in risk report
+        human_input_flag = False
         try:
-            logger.info("Calling Gemini LLM for summarization...")
-            resp_text = call_llm(full_prompt)
-            if isinstance(resp_text, str):
-                resp_text = resp_text.strip()
-            logger.info("Received summarization response (len=%d)", len(resp_text) if isinstance(resp_text, str) else 0)
-            logger.debug("Raw summarizer response preview: %s", (resp_text[:500] + "...") if isinstance(resp_text, str) and len(resp_text) > 500 else resp_text)
-
-            # Truncate for storage / perf
-            truncated = resp_text[:1000] if isinstance(resp_text, str) else ""
-            self.state.summary = resp_text
-            logger.debug("Truncated summary length=%d", len(truncated))
-
-            # Decide next status based on whether human input was flagged in risk report
-            human_input_flag = False
-            try:
-                human_input_flag = bool(self.state.risk_analysis_report and self.state.risk_analysis_report.get("human_input"))
-            except Exception:
-                logger.exception("Error checking human_input flag in risk_analysis_report")
-
-            if human_input_flag:
-                logger.info("Risk report indicates human input required; marking state in_progress")
-                self.state.status = "in_progress"
-                self.state.message = "Human input required"
-            else:
-                logger.info("Summarization successful; marking state success")
-                self.state.status = "success"
-                # Use summary as response message
-                self.state.message = self.state.summary
-
-            logger.debug("State after summarization: %s", self.state.model_dump() if hasattr(self.state, "model_dump") else dict(self.state))
-        except Exception as e:
-            logger.exception("Summarization error: %s", e)
-            self.state.errors = getattr(self.state, "errors", [])
-            try:
-                self.state.errors.append(f"Summarization error: {e}")
-            except Exception:
-                logger.exception("Failed to append summarization error to state.errors")
-            self.state.status = "failed"
-            self.state.message = "Summarization failed; retrying..."
+            human_input_flag = bool(state.risk_analysis_report and state.risk_analysis_report.get("human_input"))
+        except Exception:
+            logger.exception("Error checking human_input flag in risk_analysis_report")
 
-        return self.state
+        if human_input_flag:
+            logger.info("Risk report indicates human input required; marking state in_progress")
+            state.status = "in_progress"
+            state.message = "Human input required"
+        else:
+            logger.info("Summarization successful; marking state success")
+            state.status = "success"
+            # Use summary as response message
+            state.message = state.summary
+
+        logger.debug("State after summarization: %s", lazy_dump(state))
+
+    @staticmethod
+    def _apply_error(state: AgentState, e: Exception) -> None:
+        logger.exception("Summarization error: %s", e)
+        state.errors = getattr(state, "errors", [])
+        try:
+            state.errors.append(f"Summarization error: {e}")
+        except Exception:
+            logger.exception("Failed to append summarization error to state.errors")
+        state.status = "failed"
+        state.message = "Summarization failed; retrying..."
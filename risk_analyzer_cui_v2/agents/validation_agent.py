@@ -1,8 +1,10 @@
 # validation_agent.py
 from .agent_state import AgentState
 from prompts.validation_prompt import validation_prompt
-from llm.llm_manager import call_llm
-from core.logger import logger
+from llm.llm_manager import call_llm, acall_llm
+from core.deadline import llm_timeout
+from core.blob_store import expand
+from core.logger import logger, lazy_dump
 
 
 class ValidationAgent:
@@ -11,59 +13,98 @@ class ValidationAgent:
         self.state = state
         return self.validate_input()
 
+    async def acall(self, state: AgentState) -> AgentState:
+        """
+        Async entrypoint used by the async graph.
+        Works on the given state only (no self.state), so one instance can
+        serve many concurrent runs on the same event loop.
+        """
+        logger.info("ValidationAgent invoked (async)")
+        prompt = self._build_prompt(state)
+        if prompt is None:
+            return state
+
+        try:
+            logger.info("Calling LLM for validation (async)...")
+            result = await acall_llm(prompt, timeout=llm_timeout(state.deadline_at))
+            self._apply_result(state, result)
+        except Exception as e:
+            self._apply_error(state, e)
+
+        logger.debug("Final state after validation: %s", lazy_dump(state))
+        return state
+
     def validate_input(self) -> AgentState:
         logger.info("Starting validation process...")
-        logger.debug("Incoming state: %s", self.state.model_dump() if hasattr(self.state, "model_dump") else self.state)
+        prompt = self._build_prompt(self.state)
+        if prompt is None:
+            return self.state
+
+        # Call LLM
+        try:
+            logger.info("Calling Gemini LLM for validation...")
+            result = call_llm(prompt, timeout=llm_timeout(self.state.deadline_at))  # Must be sync now
+            self._apply_result(self.state, result)
+        except Exception as e:
+            self._apply_error(self.state, e)
+
+        logger.debug("Final state after validation: %s", lazy_dump(self.state))
+        return self.state
+
+    @staticmethod
+    def _build_prompt(state: AgentState):
+        """
+        Build the validation prompt, or fail the state and return None
+        when the input is too short to be worth an LLM call.
+        """
+        logger.debug("Incoming state: %s", lazy_dump(state))
 
         # Build context from last 5 messages
         try:
             logger.debug("Building context from previous messages")
-            context = "\n".join([f"{m.role}: {m.content}" for m in self.state.messages[-5:]])
+            context = state.recent_context(5)
         except Exception as e:
             logger.exception("Failed building context from messages: %s", e)
             context = ""
 
-        full_input = f"{context}\nCurrent: {self.state.input_contract}"
+        full_input = f"{context}\nCurrent: {expand(state.input_contract)}"
         logger.debug("Full validation input constructed: %s", full_input)
 
         # Basic sanity validation
-        if len(self.state.input_contract) < 2:
+        if len(state.input_contract) < 2:
             logger.warning("Input contract too short. Validation failing immediately.")
-            self.state.errors.append("Input too short.")
-            self.state.message = "Input validation failed."
-            self.state.status = "failed"
-            logger.debug("Updated state after short input failure: %s", self.state.model_dump())
-            return self.state
+            state.errors.append("Input too short.")
+            state.message = "Input validation failed."
+            state.status = "failed"
+            logger.debug("Updated state after short input failure: %s", lazy_dump(state))
+            return None
 
         # Build prompt
         prompt = validation_prompt + full_input
         logger.debug("Final prompt being sent to LLM: %s", prompt)
+        return prompt
 
-        # Call LLM
-        try:
-            logger.info("Calling Gemini LLM for validation...")
-            result = call_llm(prompt)  # Must be sync now
-            if isinstance(result, str):
-                result = result.strip()
-
-            logger.info("Validation LLM response received")
-            logger.debug("LLM response content: %s", result)
-
-            # Interpret LLM result
-            if "Invalid Input" in result:
-                logger.warning("LLM marked the input as invalid")
-                self.state.errors.append("Invalid contract data.")
-                self.state.message = result
-                self.state.status = "failed"
-            else:
-                logger.info("LLM validation passed successfully")
-                self.state.message = "OK"
-                self.state.status = "in_progress"
+    @staticmethod
+    def _apply_result(state: AgentState, result) -> None:
+        if isinstance(result, str):
+            result = result.strip()
 
-        except Exception as e:
-            logger.exception("Error occurred during LLM validation: %s", e)
-            self.state.errors.append(f"Validation error: {e}")
-            self.state.status = "failed"
+        logger.info("Validation LLM response received")
+        logger.debug("LLM response content: %s", result)
 
-        logger.debug("Final state after validation: %s", self.state.model_dump())
-        return self.state
+        # Interpret LLM result
+        if "Invalid Input" in result:
+            logger.warning("LLM marked the input as invalid")
+            state.errors.append("Invalid contract data.")
+            state.message = result
+            state.status = "failed"
+        else:
+            logger.info("LLM validation passed successfully")
+            state.message = "OK"
+            state.status = "in_progress"
+
+    @staticmethod
+    def _apply_error(state: AgentState, e: Exception) -> None:
+        logger.exception("Error occurred during LLM validation: %s", e)
+        state.errors.append(f"Validation error: {e}")
+        state.status = "failed"
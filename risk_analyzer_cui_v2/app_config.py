@@ -3,3 +3,138 @@ GEMINI_API_KEY = ""
 RAPID_API_KEY = ""
 OPENAI_API_KEY = ""
 
+# Graph execution: "sync" (graph.invoke) or "async" (graph.ainvoke on the shared event loop)
+GRAPH_EXECUTION_MODE = "async"
+# Async mode only: run validation and the first analysis concurrently. Saves the
+# validation latency on accepted inputs, but every rejected input still pays for a
+# full analyzer LLM call. Opt in per deployment.
+SPECULATIVE_ANALYSIS = False
+# Risk analysis: "single" (one prompt, all categories) or "parallel" (one focused
+# specialist prompt per category, run concurrently and merged)
+ANALYSIS_MODE = "single"
+# Worker threads for blocking LLM calls made from async code (fan-out needs more than the CPU count)
+LLM_THREAD_POOL_SIZE = 32
+
+# Background jobs for /chat/start and /chat/resume ({"async": true} → 202 + job_id)
+JOB_WORKERS = 4
+JOB_RESULT_TTL_SECONDS = 3600
+JOB_MODE_DEFAULT = False
+
+# Job backend: "memory" (in-process pool) or "postgres" (analysis_jobs table + worker.py)
+JOB_BACKEND = "memory"
+JOB_LEASE_SECONDS = 120
+JOB_HEARTBEAT_SECONDS = 30
+JOB_RETRY_BACKOFF_SECONDS = 10
+JOB_POLL_INTERVAL_SECONDS = 1.0
+# /jobs/<id>?wait and /jobs/<id>/events are woken by LISTEN/NOTIFY; this re-read is the backstop
+JOB_WAIT_RECHECK_SECONDS = 5.0
+
+# Tracing: spans per node / LLM call / DB call / checkpoint I/O (see /debug/trace/<thread_id>)
+TRACE_ENABLED = True
+TRACE_BUFFER_SIZE = 20000
+TRACE_EXPORT_PATH = "logs/traces_otlp.jsonl"
+
+# Log every AgentState construction (debug aid; off in production, LangGraph builds one per node)
+STATE_DEBUG_LOGGING = False
+
+# Conversation window kept in AgentState (and so in every checkpoint). Older turns are
+# folded into a short rolling history_summary; full text stays in the messages table.
+MESSAGE_WINDOW = 10          # agents read at most the last 10 messages
+INPUT_HISTORY_WINDOW = 6     # contract + the 5 most recent feedback inputs
+HISTORY_SUMMARY_MAX_CHARS = 2000
+HISTORY_LINE_MAX_CHARS = 300
+
+# Contract blob store (core/blob_store.py): contracts of at least CONTRACT_BLOB_MIN_BYTES
+# are stored once (zstd) and referenced by hash from state, checkpoints and messages
+CONTRACT_BLOB_MIN_BYTES = 4096
+CONTRACT_BLOB_ZSTD_LEVEL = 3
+CONTRACT_CACHE_MAX_ITEMS = 256
+CONTRACT_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+# email → user_id cache in front of get_or_create_user (core/db_utils.py)
+USER_CACHE_MAX_ITEMS = 10000
+USER_CACHE_TTL_SECONDS = 3600
+
+# Conversation rows by thread_id (core/conversation_repo.py), on top of the per-request identity map
+CONVERSATION_CACHE_MAX_ITEMS = 2048
+CONVERSATION_CACHE_TTL_SECONDS = 300
+
+# Write-behind message persistence (core/message_buffer.py): messages are queued and written
+# in batches of up to MAX_ROWS, at most FLUSH_SECONDS after queuing. Off = one transaction per
+# message. A crash loses at most the unflushed batch.
+MESSAGE_WRITE_BEHIND = False
+MESSAGE_BUFFER_MAX_ROWS = 200
+MESSAGE_BUFFER_FLUSH_SECONDS = 0.5
+MESSAGE_BUFFER_MAX_PENDING = 10000
+
+# Full-text search (core/conversation_search.py): a search that runs longer than this is
+# cancelled and reported as too broad (400) instead of holding a pooled connection
+SEARCH_STATEMENT_TIMEOUT_MS = 2000
+
+# Checkpoint serializer (core/checkpoint_serde.py): channel values whose msgpack encoding is
+# at least CHECKPOINT_COMPRESS_MIN_BYTES are zstd-compressed. None disables compression.
+CHECKPOINT_COMPRESS_MIN_BYTES = 1024
+CHECKPOINT_ZSTD_LEVEL = 3
+
+# Checkpointer connection pools (one sync, one async per process), separate from app_pool
+CHECKPOINT_POOL_MIN_SIZE = 2
+CHECKPOINT_POOL_MAX_SIZE = 16
+CHECKPOINT_POOL_TIMEOUT_SECONDS = 10
+CHECKPOINT_POOL_MAX_IDLE_SECONDS = 300
+CHECKPOINT_POOL_MAX_LIFETIME_SECONDS = 1800
+CHECKPOINT_POOL_RECONNECT_TIMEOUT_SECONDS = 60
+CHECKPOINT_POOL_CHECK_IDLE_SECONDS = 30   # ping connections idle longer than this on checkout
+
+# Checkpoint retention (python -m core.checkpoint_retention): keep the latest N checkpoints
+# per thread plus interrupted ones; threads active within MIN_IDLE are left alone
+CHECKPOINT_KEEP_LATEST = 5
+CHECKPOINT_RETENTION_BATCH_THREADS = 200
+CHECKPOINT_RETENTION_PAUSE_SECONDS = 0.1
+CHECKPOINT_RETENTION_MIN_IDLE_SECONDS = 600
+
+# Latest checkpoint per thread kept in memory by the savers (core/checkpoint_cache.py).
+# VERIFY confirms a hit with a checkpoint_id lookup, needed when several processes
+# (web + job workers) can advance the same thread.
+CHECKPOINT_CACHE_MAX_THREADS = 512
+CHECKPOINT_CACHE_TTL_SECONDS = 900
+CHECKPOINT_CACHE_VERIFY = True
+
+# When graph runs write checkpoints (LangGraph durability), overridable per run via
+# "durability" in /chat/start: "sync" (each step persisted before the next starts),
+# "async" (each step persisted in the background while the next runs) or "exit"
+# (only when the run finishes or pauses for review; a crash mid-run loses the run)
+CHECKPOINT_DURABILITY = "async"
+
+# Latency budget (seconds). Interactive requests get DEFAULT_DEADLINE_SECONDS unless
+# the payload sends "deadline_seconds"; background jobs get JOB_DEADLINE_SECONDS.
+DEFAULT_DEADLINE_SECONDS = 30
+JOB_DEADLINE_SECONDS = 180
+LLM_MAX_TIMEOUT_SECONDS = 60
+LLM_MIN_TIMEOUT_SECONDS = 1.5
+ESTIMATED_ANALYZER_SECONDS = 8
+SUMMARY_RESERVE_SECONDS = 4
+
+# Summary engine: "llm", "local" (template renderer, no LLM call) or "auto"
+# (local for well-formed reports with at most LOCAL_SUMMARY_MAX_RISKS items)
+SUMMARY_MODE = "auto"
+LOCAL_SUMMARY_MAX_RISKS = 8
+
+# Portfolio analytics group users into organizations by email domain. Users of these
+# public mail providers belong to no organization (core/risk_store.py)
+PUBLIC_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "live.com", "msn.com",
+    "yahoo.com", "ymail.com", "icloud.com", "me.com", "mac.com", "aol.com",
+    "proton.me", "protonmail.com", "gmx.com", "gmx.net", "mail.com", "zoho.com",
+    "yandex.com", "yandex.ru", "qq.com", "163.com",
+})
+
+# HTTP responses: JSON bodies of at least RESPONSE_COMPRESS_MIN_BYTES are zstd/gzip-compressed
+# when the client accepts it (core/http_compression.py)
+RESPONSE_COMPRESS_MIN_BYTES = 1024
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_ZSTD_LEVEL = 3
+
+# /contracts/compare: concurrency is shared by all comparison requests
+COMPARE_MAX_CONTRACTS = 10
+COMPARE_CONCURRENCY = 6
+COMPARE_DEADLINE_SECONDS = 120
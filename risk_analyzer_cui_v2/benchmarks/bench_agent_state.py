@@ -0,0 +1,170 @@
+# benchmarks/bench_agent_state.py
+"""
+Micro-benchmark: AgentState construction and serialization, before/after
+removing the logging root_validators.
+
+    python -m benchmarks.bench_agent_state [--messages 20] [--risks 10] [--number 2000]
+
+Run the -m form from risk_analyzer_cui_v2/; `python benchmarks/bench_agent_state.py` works as well.
+
+"before" is a copy of the previous models (root_validator(pre=True) hooks
+that log on every construction); "after" is agents.agent_state. The app
+logger is configured like production (INFO) but writes to os.devnull, so
+the numbers include formatting and handler cost without disk noise.
+"""
+import os
+import sys
+import logging
+import argparse
+import timeit
+import warnings
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+
+from pydantic import BaseModel, Field, root_validator
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+if not __package__:
+    # Run as a script: put the app directory (parent of benchmarks/) on the path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.logger import logger
+from agents.agent_state import AgentState, Message
+
+
+# -------------------------------------------------------
+# "before": previous models, verbatim validators
+# -------------------------------------------------------
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+
+    class LegacyMessage(BaseModel):
+        role: str
+        content: str
+        timestamp: Optional[datetime] = None
+        metadata: Optional[Dict[str, Any]] = None
+
+        @root_validator(pre=True)
+        def log_message_creation(cls, values):
+            try:
+                role = values.get("role")
+                content = values.get("content", "")
+                safe_preview = (content[:150] + "...") if len(content) > 150 else content
+                logger.debug("Message created: role=%s | content_preview=%s", role, safe_preview)
+            except Exception:
+                logger.exception("Failed logging message creation")
+            return values
+
+    class LegacyAgentState(BaseModel):
+        user_id: str
+        input_contract: str
+        input_history: List[str] = Field(default_factory=list)
+        messages: List[LegacyMessage] = Field(default_factory=list)
+        errors: List[str] = Field(default_factory=list)
+        message: Optional[str] = None
+        feedback: Optional[str] = None
+        summary: Optional[str] = None
+        risk_analysis_report: Optional[Dict[str, Any]] = None
+        status: Optional[str] = None
+        quality_score: int = 0
+        thread_id: Optional[str] = None
+        approved: Optional[bool] = None
+        refinement_count: int = 0
+        human_input: bool = False
+
+        @root_validator(pre=True)
+        def log_state_initialization(cls, values):
+            try:
+                logger.info("Initializing AgentState for user_id=%s thread_id=%s",
+                            values.get("user_id"), values.get("thread_id"))
+                logger.debug("Initial AgentState values: %s", values)
+            except Exception:
+                logger.exception("Failed logging AgentState initialization")
+            return values
+
+
+def _payload(n_messages: int, n_risks: int) -> Dict[str, Any]:
+    contract = "The supplier shall deliver the services described in Schedule A. " * 40
+    return {
+        "user_id": "2b1c6d2e-8a8e-4a57-9a55-0c1b7f1c9d10",
+        "input_contract": contract,
+        "input_history": [contract],
+        "messages": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 30,
+             "timestamp": datetime(2026, 1, 1, 12, 0, i % 60), "metadata": {"i": i}}
+            for i in range(n_messages)
+        ],
+        "risk_analysis_report": {
+            "human_input": False,
+            "analysis": [
+                {"risk": f"Risk {i}", "type": "Financial", "impact": "High",
+                 "reason": "Because " * 10, "mitigation": "Mitigate " * 10}
+                for i in range(n_risks)
+            ],
+        },
+        "status": "in_progress",
+        "quality_score": 70,
+        "thread_id": "bench-thread",
+    }
+
+
+def _bench(fn, number: int) -> float:
+    """Best of 5, microseconds per call."""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def _bytes_per_message(cls, n: int = 5000) -> float:
+    ts = datetime(2026, 1, 1)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [cls(role="user", content="x", timestamp=ts, metadata=None) for _ in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--risks", type=int, default=10)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.FileHandler(os.devnull))
+    logger.propagate = False
+
+    payload = _payload(args.messages, args.risks)
+    serde = JsonPlusSerializer()
+
+    before = LegacyAgentState(**payload)
+    after = AgentState(**payload)
+    before_blob = serde.dumps_typed(before.model_dump())
+    after_blob = serde.dumps_typed(after.model_dump())
+
+    cases = [
+        ("construct from dict", lambda: LegacyAgentState(**payload), lambda: AgentState(**payload)),
+        ("add message",
+         lambda: LegacyMessage(role="user", content="feedback " * 20, timestamp=datetime.utcnow()),
+         lambda: Message(role="user", content="feedback " * 20, timestamp=datetime.utcnow())),
+        ("model_dump", before.model_dump, after.model_dump),
+        ("checkpoint dumps_typed", lambda: serde.dumps_typed(before.model_dump()),
+         lambda: serde.dumps_typed(after.model_dump())),
+        ("checkpoint restore", lambda: LegacyAgentState(**serde.loads_typed(before_blob)),
+         lambda: AgentState(**serde.loads_typed(after_blob))),
+    ]
+
+    print(f"messages={args.messages} risks={args.risks} number={args.number}")
+    print(f"{'case':<26}{'before µs':>12}{'after µs':>12}{'speedup':>10}")
+    for name, old, new in cases:
+        b, a = _bench(old, args.number), _bench(new, args.number)
+        print(f"{name:<26}{b:>12.1f}{a:>12.1f}{b / a:>9.1f}x")
+
+    b, a = _bytes_per_message(LegacyMessage), _bytes_per_message(Message)
+    print(f"{'bytes per Message':<26}{b:>12.0f}{a:>12.0f}{b / a:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
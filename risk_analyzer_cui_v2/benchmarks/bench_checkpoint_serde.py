@@ -0,0 +1,118 @@
+# benchmarks/bench_checkpoint_serde.py
+"""
+Benchmark: checkpoint bytes and encode/decode time, default JsonPlusSerializer
+vs core.checkpoint_serde.CompressingSerializer.
+
+    python -m benchmarks.bench_checkpoint_serde [--number 200] [--min-bytes 1024] [--level 3]
+
+Run the -m form from risk_analyzer_cui_v2/; `python benchmarks/bench_checkpoint_serde.py` works as well.
+
+Each case serializes every channel of a realistic AgentState the way
+PostgresSaver does (one dumps_typed per channel value) and loads it back.
+Contract text is generated from varied clause templates so it compresses
+like real prose rather than like a repeated string.
+"""
+import os
+import sys
+import random
+import argparse
+import timeit
+from typing import Any, Dict
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+if not __package__:
+    # Run as a script: put the app directory (parent of benchmarks/) on the path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.agent_state import AgentState
+from core.checkpoint_serde import CompressingSerializer
+
+
+_PARTIES = ["the Supplier", "the Customer", "the Contractor", "each Party", "the Service Provider", "the Licensee"]
+_VERBS = ["shall deliver", "shall indemnify", "may terminate", "shall maintain", "shall not disclose", "shall invoice"]
+_OBJECTS = ["the Deliverables", "all Confidential Information", "the Services", "insurance coverage",
+            "the Software", "any Personal Data", "the Milestones in Schedule {n}", "third-party claims"]
+_TAILS = ["within {n} days of written notice", "in accordance with Annex {n}", "at no additional cost",
+          "subject to clause {n}.{m}", "for a period of {n} months", "unless otherwise agreed in writing",
+          "to the reasonable satisfaction of the Customer", "in compliance with applicable law"]
+
+
+def _contract(n_bytes: int, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    parts, size, clause = [], 0, 1
+    while size < n_bytes:
+        sentence = (f"{clause}.{rnd.randint(1, 9)} {rnd.choice(_PARTIES).capitalize()} {rnd.choice(_VERBS)} "
+                    f"{rnd.choice(_OBJECTS)} {rnd.choice(_TAILS)}. ").format(n=rnd.randint(1, 90), m=rnd.randint(1, 9))
+        parts.append(sentence)
+        size += len(sentence)
+        clause += rnd.random() < 0.2
+    return "".join(parts)
+
+
+def _state(contract: str, n_messages: int, n_risks: int) -> Dict[str, Any]:
+    rnd = random.Random(n_risks)
+    state = AgentState(
+        user_id="2b1c6d2e-8a8e-4a57-9a55-0c1b7f1c9d10",
+        input_contract=contract,
+        input_history=[contract],
+        thread_id="bench-thread",
+        status="in_progress",
+        quality_score=70,
+        summary=_contract(1500, seed=3),
+        risk_analysis_report={
+            "human_input": False,
+            "analysis": [
+                {"risk": _contract(120, seed=i), "type": rnd.choice(["Financial", "Technical", "Operational"]),
+                 "impact": rnd.choice(["High", "Medium", "Low"]), "reason": _contract(250, seed=100 + i),
+                 "mitigation": _contract(200, seed=200 + i)}
+                for i in range(n_risks)
+            ],
+        },
+    )
+    for i in range(n_messages):
+        state.add_message("user" if i % 2 == 0 else "assistant", _contract(300, seed=300 + i))
+    return state.model_dump()
+
+
+CASES = {
+    "blob ref + 10 msgs, 10 risks": ("blob:sha256:" + "ab" * 32, 10, 10),
+    "4 KB contract, 4 msgs, 8 risks": (4 * 1024, 4, 8),
+    "64 KB contract, 10 msgs, 20 risks": (64 * 1024, 10, 20),
+    "1 MB contract, 10 msgs, 40 risks": (1024 * 1024, 10, 40),
+}
+
+
+def _measure(serde, values: Dict[str, Any], number: int):
+    blobs = {k: serde.dumps_typed(v) for k, v in values.items()}
+    size = sum(len(b) for _, b in blobs.values())
+    encode = min(timeit.repeat(lambda: [serde.dumps_typed(v) for v in values.values()], number=number, repeat=3))
+    decode = min(timeit.repeat(lambda: [serde.loads_typed(b) for b in blobs.values()], number=number, repeat=3))
+    assert {k: serde.loads_typed(b) for k, b in blobs.items()} == values
+    return size, encode / number * 1e6, decode / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--min-bytes", type=int, default=None, help="compression threshold (default: app_config)")
+    parser.add_argument("--level", type=int, default=None, help="zstd level (default: app_config)")
+    args = parser.parse_args()
+
+    default = JsonPlusSerializer()
+    overrides = {k: v for k, v in (("min_bytes", args.min_bytes), ("level", args.level)) if v is not None}
+    compressing = CompressingSerializer(**overrides)
+    print(f"number={args.number} min_bytes={compressing.min_bytes} level={compressing.level}")
+    print(f"{'case':<36}{'serde':<14}{'bytes':>11}{'encode µs':>12}{'decode µs':>12}")
+
+    for name, (contract, n_messages, n_risks) in CASES.items():
+        text = contract if isinstance(contract, str) else _contract(contract)
+        values = _state(text, n_messages, n_risks)
+        number = max(1, args.number // max(1, len(text) // 65536))
+        for label, serde in (("default", default), ("zstd", compressing)):
+            size, enc, dec = _measure(serde, values, number)
+            print(f"{name:<36}{label:<14}{size:>11,}{enc:>12.1f}{dec:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
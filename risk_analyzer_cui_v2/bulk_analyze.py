@@ -0,0 +1,214 @@
+# bulk_analyze.py
+"""
+Bulk offline contract analysis.
+
+Walks a directory of .pdf/.docx/.txt contracts, extracts text in a process
+pool, runs the risk pipeline with bounded LLM concurrency and appends one
+JSON line per contract to the output file:
+
+    python bulk_analyze.py ./contracts --out results.jsonl --concurrency 8
+
+The output file doubles as the progress checkpoint: a rerun skips every
+file that already has a non-error line in it.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from core.logger import logger, setup_logging
+from utils.docs_reader import ALLOWED_EXTENSIONS, FileReadError, read_contract_file
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.agent_state import AgentState
+from core.deadline import deadline_from_seconds
+
+
+BULK_USER_ID = "bulk-offline"
+
+# Statuses of a finished contract; anything else ("error", "failed",
+# "unknown", ...) is retried by the next run with the same --out.
+DONE_STATUSES = ("success", "needs_human")
+
+
+def _extract(path: str):
+    """
+    Process-pool task. Returns (text, error) so nothing but plain
+    strings has to be pickled back to the parent.
+    """
+    try:
+        return read_contract_file(path), None
+    except FileReadError as e:
+        return None, f"{e.message} {'; '.join(e.errors)}"
+    except Exception as e:
+        return None, str(e)
+
+
+def find_contracts(root: str):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS:
+                yield os.path.join(dirpath, name)
+
+
+def load_completed(out_path: str) -> set:
+    """
+    Relative paths whose latest record has a DONE_STATUSES status.
+    Later lines win, so a retried file that succeeded counts as done.
+    """
+    latest = {}
+    if not os.path.exists(out_path):
+        return set()
+
+    with open(out_path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # partial line from an interrupted run
+            latest[rec.get("file")] = rec.get("status")
+
+    return {f for f, status in latest.items() if status in DONE_STATUSES}
+
+
+def _record_from_result(rel_path: str, text: str, result: dict, elapsed: float) -> dict:
+    if "__interrupt__" in result:
+        status = "needs_human"
+    else:
+        status = result.get("status") or "unknown"
+
+    report = result.get("risk_analysis_report") or {}
+    return {
+        "file": rel_path,
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "status": status,
+        "quality_score": result.get("quality_score"),
+        "summary": result.get("summary"),
+        "report": report,
+        "clarification": report.get("clarification"),
+        "errors": result.get("errors") or [],
+        "elapsed_s": round(elapsed, 2),
+        "completed_at": datetime.utcnow().isoformat(),
+    }
+
+
+class Progress:
+    def __init__(self, total: int, every: float = 5.0):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.start = time.time()
+        self.every = every
+        self._last = 0.0
+
+    def tick(self, ok: bool):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+
+        now = time.time()
+        if now - self._last >= self.every or self.done == self.total:
+            self._last = now
+            self.report(now)
+
+    def report(self, now: float):
+        elapsed = max(now - self.start, 1e-6)
+        rate = self.done / elapsed
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else float("inf")
+        print(
+            f"[bulk] {self.done}/{self.total} done ({self.failed} failed) | "
+            f"{rate * 60:.1f} contracts/min | elapsed {elapsed / 60:.1f} min | "
+            f"ETA {eta / 60:.1f} min",
+            flush=True,
+        )
+
+
+async def run_bulk(root: str, out_path: str, concurrency: int, extract_workers: int,
+                   deadline_seconds: float = 0):
+    all_files = list(find_contracts(root))
+    completed = load_completed(out_path)
+    pending = [p for p in all_files if os.path.relpath(p, root) not in completed]
+
+    print(f"[bulk] {len(all_files)} contracts found, {len(all_files) - len(pending)} already done, "
+          f"{len(pending)} to process", flush=True)
+    if not pending:
+        return
+
+    loop = asyncio.get_running_loop()
+    llm_slots = asyncio.Semaphore(concurrency)
+    # Bound extracted-but-not-analyzed texts so memory stays flat on huge directories
+    in_flight = asyncio.Semaphore(concurrency * 2)
+    progress = Progress(len(pending))
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as pool, \
+            open(out_path, "a", encoding="utf-8") as out:
+
+        def write(record: dict):
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+
+        async def handle(path: str):
+            rel_path = os.path.relpath(path, root)
+            async with in_flight:
+                start = time.time()
+                text, error = await loop.run_in_executor(pool, _extract, path)
+
+                if error:
+                    write({"file": rel_path, "status": "error", "stage": "extract", "errors": [error],
+                           "completed_at": datetime.utcnow().isoformat()})
+                    progress.tick(ok=False)
+                    return
+
+                state = AgentState(
+                    user_id=BULK_USER_ID,
+                    input_contract=text,
+                    input_history=[text],
+                    thread_id=f"bulk-{uuid.uuid4()}",
+                )
+
+                try:
+                    async with llm_slots:
+                        # Budget starts once the contract gets an LLM slot
+                        state.deadline_at = deadline_from_seconds(deadline_seconds)
+                        result = await OrchestratorAgent(state).arun_offline()
+                except Exception as e:
+                    logger.exception("Bulk analysis failed for %s: %s", rel_path, e)
+                    write({"file": rel_path, "status": "error", "stage": "analyze", "errors": [str(e)],
+                           "completed_at": datetime.utcnow().isoformat()})
+                    progress.tick(ok=False)
+                    return
+
+                record = _record_from_result(rel_path, text, result, time.time() - start)
+                write(record)
+                progress.tick(ok=record["status"] in DONE_STATUSES)
+
+        await asyncio.gather(*(handle(p) for p in pending))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk offline contract risk analysis")
+    parser.add_argument("input_dir", help="directory scanned recursively for .pdf/.docx/.txt")
+    parser.add_argument("--out", default="bulk_results.jsonl", help="JSONL output (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="max contracts in the LLM pipeline at once")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2,
+                        help="processes used for text extraction")
+    parser.add_argument("--deadline", type=float, default=0,
+                        help="per-contract latency budget in seconds (0 = none)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        print(f"Not a directory: {args.input_dir}", file=sys.stderr)
+        sys.exit(2)
+
+    setup_logging()
+    asyncio.run(run_bulk(args.input_dir, args.out, args.concurrency, args.extract_workers, args.deadline))
+
+
+if __name__ == "__main__":
+    main()
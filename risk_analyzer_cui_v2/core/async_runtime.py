@@ -0,0 +1,79 @@
+# core/async_runtime.py
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+from core.logger import logger
+
+
+# ----------------------------------------------------
+# Shared event loop for async graph execution
+# ----------------------------------------------------
+# Flask request threads are synchronous, but async graph runs (and the
+# AsyncPostgresSaver, which binds to the loop it was created on) need ONE
+# long-lived event loop. We run it in a daemon thread and submit
+# coroutines to it from any request thread.
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+_loop_started = threading.Event()   # set from inside the loop once run_forever() is running
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.call_soon(_loop_started.set)
+    loop.run_forever()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared background event loop, starting it on first use.
+
+    Exactly one loop is ever created: the async checkpointer, pools and
+    semaphores bind to it. Callers block until it is running.
+    """
+    global _loop, _loop_thread
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _loop_thread = threading.Thread(
+                    target=_run_loop,
+                    args=(loop,),
+                    name="graph-event-loop",
+                    daemon=True,
+                )
+                _loop_thread.start()
+                _loop = loop
+                logger.info("Started shared graph event loop (thread=%s)", _loop_thread.name)
+
+    _loop_started.wait()
+    return _loop
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> Future:
+    """
+    Schedule a coroutine on the shared loop and return a concurrent Future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared loop and block the calling thread for its result.
+
+    Must NOT be called from the shared loop itself (it would deadlock).
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is not None and running is _loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared event loop; await the coroutine instead")
+
+    return submit(coro).result(timeout=timeout)
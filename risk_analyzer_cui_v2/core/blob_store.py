@@ -0,0 +1,132 @@
+# core/blob_store.py
+import hashlib
+from typing import Optional, Tuple
+
+import zstandard
+
+from core.cache import LRUCache
+from core.db_utils import get_conn
+from core.logger import logger
+from core.tracing import traced
+from app_config import (
+    CONTRACT_BLOB_MIN_BYTES,
+    CONTRACT_BLOB_ZSTD_LEVEL,
+    CONTRACT_CACHE_MAX_ITEMS,
+    CONTRACT_CACHE_MAX_CHARS,
+)
+
+
+# -------------------------------------------------------
+# Content-addressed contract texts (table: contract_blobs)
+# -------------------------------------------------------
+# Large contracts are stored once, zstd-compressed, keyed by the sha256 of
+# the text (the same digest as risk_items.contract_hash). AgentState,
+# checkpoints, job payloads and the messages table hold the reference
+# "blob:sha256:<hex>" instead of the text:
+#
+#     input_history[0] = "blob:sha256:<hex>"
+#     input_contract   = "blob:sha256:<hex>\n<follow-up inputs...>"
+#
+# Agents call expand() when they build prompts; recently used texts are
+# served from an in-process LRU.
+# -------------------------------------------------------
+
+BLOB_REF_PREFIX = "blob:sha256:"
+_REF_LENGTH = len(BLOB_REF_PREFIX) + 64
+
+_texts = LRUCache(CONTRACT_CACHE_MAX_ITEMS, max_size=CONTRACT_CACHE_MAX_CHARS)
+
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, str) and len(value) == _REF_LENGTH and value.startswith(BLOB_REF_PREFIX)
+
+
+def ref_digest(ref: str) -> str:
+    return ref[len(BLOB_REF_PREFIX):]
+
+
+@traced("db.put_contract_blob", kind="db")
+def put_text(text: str) -> str:
+    """
+    Store `text` (idempotent) and return its reference.
+    """
+    data = text.encode("utf-8")
+    ref = BLOB_REF_PREFIX + hashlib.sha256(data).hexdigest()
+    if _texts.get(ref) is not None:
+        return ref  # cached ⇒ already stored
+
+    compressed = zstandard.ZstdCompressor(level=CONTRACT_BLOB_ZSTD_LEVEL).compress(data)
+    with get_conn(transactional=True) as cur:
+        cur.execute(
+            """
+            INSERT INTO contract_blobs (blob_hash, codec, size_bytes, data, search_vector)
+            VALUES (%s, 'zstd', %s, %s, to_tsvector('english', left(%s, 250000)))
+            ON CONFLICT (blob_hash) DO NOTHING
+            """,
+            (ref_digest(ref), len(data), compressed, text),
+        )
+    _texts.put(ref, text)
+    logger.info("Stored contract blob %s (%d → %d bytes)", ref_digest(ref)[:12], len(data), len(compressed))
+    return ref
+
+
+@traced("db.get_contract_blob", kind="db")
+def _load(ref: str) -> Optional[str]:
+    with get_conn() as cur:
+        cur.execute("SELECT codec, data FROM contract_blobs WHERE blob_hash = %s", (ref_digest(ref),))
+        row = cur.fetchone()
+    if not row:
+        return None
+    codec, data = row
+    if codec == "zstd":
+        data = zstandard.ZstdDecompressor().decompress(bytes(data))
+    return bytes(data).decode("utf-8")
+
+
+def get_text(ref: str) -> str:
+    """
+    Text for a reference; raises KeyError if the blob does not exist.
+    """
+    text = _texts.get(ref)
+    if text is None:
+        text = _load(ref)
+        if text is None:
+            raise KeyError(f"Unknown contract blob: {ref}")
+        _texts.put(ref, text)
+    return text
+
+
+def externalize(text: str) -> str:
+    """
+    Reference for contracts of at least CONTRACT_BLOB_MIN_BYTES, the text
+    itself otherwise (short inputs are cheaper inline).
+    """
+    if len(text.encode("utf-8")) < CONTRACT_BLOB_MIN_BYTES:
+        return text
+    return put_text(text)
+
+
+def split_ref(text: Optional[str]) -> Tuple[Optional[str], str]:
+    """
+    Split a leading blob reference off: "blob:...\\nFeedback: x" →
+    ("<hex digest>", "Feedback: x"). Plain texts give (None, text).
+    """
+    if not text or not text.startswith(BLOB_REF_PREFIX):
+        return None, text or ""
+    ref, _, rest = text.partition("\n")
+    if not is_blob_ref(ref):
+        return None, text
+    return ref_digest(ref), rest
+
+
+def expand(text: Optional[str]) -> str:
+    """
+    Resolve a leading blob reference: "blob:...\\nFeedback: x" → "<contract>\\nFeedback: x".
+    Plain texts are returned unchanged.
+    """
+    if not text or not text.startswith(BLOB_REF_PREFIX):
+        return text or ""
+    ref, sep, rest = text.partition("\n")
+    if not is_blob_ref(ref):
+        return text
+    return get_text(ref) + sep + rest
@@ -0,0 +1,86 @@
+# core/cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache.
+
+    Bounded by entry count and, optionally, by total size (as measured by
+    `sizeof`, e.g. len of a text). Entries older than `ttl_seconds` are
+    treated as missing. One instance per cached thing; share it module-wide.
+    """
+
+    def __init__(self, max_items: int, max_size: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, sizeof: Callable[[Any], int] = len):
+        self.max_items = max_items
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key → (value, size, stored_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or self._expired(entry):
+                if entry is not _MISSING:
+                    self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value) -> None:
+        size = self._sizeof(value) if self.max_size is not None else 0
+        if self.max_size is not None and size > self.max_size:
+            return  # would evict everything else; not worth caching
+
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, time.monotonic())
+            self._size += size
+            while len(self._data) > self.max_items or (self.max_size is not None and self._size > self.max_size):
+                self._drop(next(iter(self._data)))
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            self._drop(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"items": len(self._data), "size": self._size, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    # -- internals (caller holds the lock) --
+    def _expired(self, entry) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - entry[2] > self.ttl_seconds
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._size -= size
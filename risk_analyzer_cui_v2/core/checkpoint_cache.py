@@ -0,0 +1,227 @@
+# core/checkpoint_cache.py
+import copy
+import threading
+from typing import Dict, Optional, Tuple
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from core.cache import LRUCache
+from app_config import (
+    CHECKPOINT_CACHE_MAX_THREADS,
+    CHECKPOINT_CACHE_TTL_SECONDS,
+    CHECKPOINT_CACHE_VERIFY,
+)
+
+
+# -------------------------------------------------------
+# Latest-checkpoint cache (write-through, per process)
+# -------------------------------------------------------
+# A resume reads the thread's latest checkpoint twice (from_checkpoint,
+# then the graph itself), and every read is a join over checkpoints,
+# blobs and writes plus deserialization. The savers below keep the latest
+# checkpoint of each thread in memory as they write it, with the pending
+# writes LangGraph attaches to it, so those reads don't reach Postgres.
+#
+# The sync and async savers share one cache. Channel values and writes are
+# kept msgpack-encoded (uncompressed) and decoded on every read, so a hit
+# returns exactly what the saver would load from Postgres and graph code
+# mutating a restored state can never alter the cache. With
+# durability="async" writes for a checkpoint may be stored before the
+# checkpoint itself; they are kept and merged in when it arrives.
+#
+# Other processes (the job worker, other web workers) write the same
+# tables. With CHECKPOINT_CACHE_VERIFY a hit on "latest" is confirmed by
+# a primary-key lookup of the thread's newest checkpoint_id, which is far
+# cheaper than the full read; turn it off only when each thread is always
+# run by the same process.
+# -------------------------------------------------------
+
+_LATEST_ID_SQL = """
+    SELECT checkpoint_id FROM checkpoints
+    WHERE thread_id = %s AND checkpoint_ns = %s
+    ORDER BY checkpoint_id DESC LIMIT 1
+"""
+
+
+class _Entry:
+    __slots__ = ("checkpoint_id", "checkpoint", "values", "metadata", "parent_id", "writes")
+
+    def __init__(self, checkpoint_id: str):
+        self.checkpoint_id = checkpoint_id
+        self.checkpoint = None    # checkpoint without channel_values; None until put() is seen
+        self.values: Dict[str, Tuple[str, bytes]] = {}
+        self.metadata = None
+        self.parent_id = None
+        self.writes: Dict[Tuple[str, int], Tuple[str, str, Tuple[str, bytes]]] = {}  # (task_id, idx) → write
+
+
+_serde = JsonPlusSerializer()
+
+
+# thread_id → {checkpoint_ns: _Entry}
+_threads = LRUCache(CHECKPOINT_CACHE_MAX_THREADS, ttl_seconds=CHECKPOINT_CACHE_TTL_SECONDS)
+_lock = threading.Lock()   # entries are updated in place
+
+
+def _key(config) -> Tuple[str, str]:
+    configurable = config["configurable"]
+    return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+
+def _entry_for(key: Tuple[str, str], checkpoint_id: str) -> Optional[_Entry]:
+    """
+    The entry for checkpoint_id, replacing an older one. None if the cache
+    already holds a newer checkpoint (ids are time-ordered).
+    """
+    thread_id, checkpoint_ns = key
+    namespaces = _threads.get(thread_id)
+    if namespaces is None:
+        namespaces = {}
+        _threads.put(thread_id, namespaces)
+
+    entry = namespaces.get(checkpoint_ns)
+    if entry is not None and entry.checkpoint_id > checkpoint_id:
+        return None
+    if entry is None or entry.checkpoint_id != checkpoint_id:
+        entry = namespaces[checkpoint_ns] = _Entry(checkpoint_id)
+    return entry
+
+
+def remember_checkpoint(config, checkpoint, metadata, next_config) -> None:
+    values = {k: _serde.dumps_typed(v) for k, v in checkpoint["channel_values"].items()}
+    with _lock:
+        entry = _entry_for(_key(next_config), checkpoint["id"])
+        if entry is None:
+            return
+        entry.checkpoint = copy.deepcopy({k: v for k, v in checkpoint.items() if k != "channel_values"})
+        entry.values = values
+        entry.metadata = copy.deepcopy(get_serializable_checkpoint_metadata(config, metadata))
+        entry.parent_id = get_checkpoint_id(config)
+
+
+def remember_writes(config, writes, task_id: str) -> None:
+    # Same rules as the saver's SQL: all-special writes upsert, others never overwrite
+    upsert = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+    encoded = [(channel, _serde.dumps_typed(value)) for channel, value in writes]
+    with _lock:
+        entry = _entry_for(_key(config), config["configurable"]["checkpoint_id"])
+        if entry is None:
+            return
+        for idx, (channel, value) in enumerate(encoded):
+            slot = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            if upsert or slot not in entry.writes:
+                entry.writes[slot] = (task_id, channel, value)
+
+
+def cached_tuple(config) -> Optional[CheckpointTuple]:
+    """
+    The cached tuple for config (latest, or a specific checkpoint_id), or None.
+    """
+    key = _key(config)
+    with _lock:
+        entry = (_threads.get(key[0]) or {}).get(key[1])
+        if entry is None or entry.checkpoint is None:
+            return None
+        wanted = get_checkpoint_id(config)
+        if wanted and wanted != entry.checkpoint_id:
+            return None
+
+        checkpoint = copy.deepcopy(entry.checkpoint)
+        metadata = copy.deepcopy(entry.metadata)
+        values, parent_id = entry.values, entry.parent_id
+        writes = [entry.writes[slot] for slot in sorted(entry.writes)]
+        checkpoint_id = entry.checkpoint_id
+
+    # Decode outside the lock; the encoded values are immutable
+    checkpoint["channel_values"] = {k: _serde.loads_typed(v) for k, v in values.items()}
+    thread_id, checkpoint_ns = key
+    return CheckpointTuple(
+        {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                          "checkpoint_id": checkpoint_id}},
+        checkpoint,
+        metadata,
+        {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                          "checkpoint_id": parent_id}} if parent_id else None,
+        [(task_id, channel, _serde.loads_typed(value)) for task_id, channel, value in writes],
+    )
+
+
+def forget(thread_id: str) -> None:
+    with _lock:
+        _threads.pop(thread_id)
+
+
+def cache_stats() -> dict:
+    return _threads.stats()
+
+
+def _needs_check(config) -> bool:
+    return CHECKPOINT_CACHE_VERIFY and not get_checkpoint_id(config)
+
+
+def _still_latest(config, hit: CheckpointTuple, row) -> bool:
+    if row is not None and row["checkpoint_id"] == hit.config["configurable"]["checkpoint_id"]:
+        return True
+    forget(config["configurable"]["thread_id"])
+    return False
+
+
+class CachedSaverMixin:
+    """
+    Mix into a Postgres saver (before the saver class) to serve reads of a
+    thread's latest checkpoint from the process-wide cache above.
+    """
+
+    def get_tuple(self, config):
+        hit = cached_tuple(config)
+        if hit is not None:
+            if not _needs_check(config):
+                return hit
+            with self._cursor() as cur:
+                cur.execute(_LATEST_ID_SQL, _key(config))
+                if _still_latest(config, hit, cur.fetchone()):
+                    return hit
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        remember_checkpoint(config, checkpoint, metadata, next_config)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        super().put_writes(config, writes, task_id, task_path)
+        remember_writes(config, writes, task_id)
+
+    def delete_thread(self, thread_id):
+        forget(thread_id)
+        super().delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        hit = cached_tuple(config)
+        if hit is not None:
+            if not _needs_check(config):
+                return hit
+            async with self._cursor() as cur:
+                await cur.execute(_LATEST_ID_SQL, _key(config))
+                if _still_latest(config, hit, await cur.fetchone()):
+                    return hit
+        return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        remember_checkpoint(config, checkpoint, metadata, next_config)
+        return next_config
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await super().aput_writes(config, writes, task_id, task_path)
+        remember_writes(config, writes, task_id)
+
+    async def adelete_thread(self, thread_id):
+        forget(thread_id)
+        await super().adelete_thread(thread_id)
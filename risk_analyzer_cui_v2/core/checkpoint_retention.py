@@ -0,0 +1,230 @@
+# core/checkpoint_retention.py
+"""
+Checkpoint retention for LangGraph's Postgres tables.
+
+Every super-step writes a checkpoint, so a thread accumulates one per node
+per run / refinement / resume. Only the latest one is ever restored. This
+job keeps, per thread and namespace:
+
+    * the latest CHECKPOINT_KEEP_LATEST checkpoints
+    * every checkpoint with a pending interrupt (human review)
+
+and deletes the rest, their pending writes and any channel blob no kept
+checkpoint references any more. Threads that wrote a checkpoint in the
+last CHECKPOINT_RETENTION_MIN_IDLE_SECONDS are skipped so a running graph
+is never touched mid-write.
+
+Work is done a batch of threads per transaction, pausing between batches:
+
+    python -m core.checkpoint_retention --dry-run
+    python -m core.checkpoint_retention [--keep 5] [--batch 200] [--pause 0.1] [--vacuum]
+"""
+import time
+import argparse
+from typing import Any, Dict, List, Optional
+
+from psycopg import Connection
+
+from core.db_utils import get_conn
+from core.database import RAW_DSN
+from core.logger import logger, setup_logging
+from app_config import (
+    CHECKPOINT_KEEP_LATEST,
+    CHECKPOINT_RETENTION_BATCH_THREADS,
+    CHECKPOINT_RETENTION_PAUSE_SECONDS,
+    CHECKPOINT_RETENTION_MIN_IDLE_SECONDS,
+)
+
+
+# Threads holding more checkpoints than we keep, idle long enough, in thread_id order
+_CANDIDATE_THREADS = """
+    SELECT thread_id
+    FROM checkpoints
+    WHERE thread_id > %(after)s
+    GROUP BY thread_id
+    HAVING count(*) > %(keep)s
+       AND max((checkpoint ->> 'ts')::timestamptz) < now() - make_interval(secs => %(idle)s)
+    ORDER BY thread_id
+    LIMIT %(batch)s
+"""
+
+_DOOMED = """
+    CREATE TEMP TABLE retention_doomed ON COMMIT DROP AS
+    SELECT r.thread_id, r.checkpoint_ns, r.checkpoint_id, r.size
+    FROM (
+        SELECT thread_id, checkpoint_ns, checkpoint_id,
+               pg_column_size(checkpoint) + pg_column_size(metadata) AS size,
+               row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+        FROM checkpoints
+        WHERE thread_id = ANY(%(threads)s)
+    ) r
+    WHERE r.rn > %(keep)s
+      AND NOT EXISTS (
+          SELECT 1 FROM checkpoint_writes w
+          WHERE w.thread_id = r.thread_id AND w.checkpoint_ns = r.checkpoint_ns
+            AND w.checkpoint_id = r.checkpoint_id AND w.channel = '__interrupt__'
+      )
+"""
+
+_WRITE_IS_DOOMED = """
+    w.thread_id = d.thread_id AND w.checkpoint_ns = d.checkpoint_ns AND w.checkpoint_id = d.checkpoint_id
+"""
+
+# Blobs no surviving checkpoint points at (channel_versions maps channel → version).
+# A blob is only an orphan if a newer version of its channel is referenced: the
+# saver commits a new checkpoint's blobs before the checkpoint row itself.
+_BLOB_IS_ORPHANED = """
+    b.thread_id = ANY(%(threads)s)
+      AND EXISTS (
+          SELECT 1 FROM checkpoints n
+          WHERE n.thread_id = b.thread_id AND n.checkpoint_ns = b.checkpoint_ns
+            AND n.checkpoint -> 'channel_versions' ->> b.channel > b.version COLLATE "C"
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM checkpoints c
+          WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+            AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+            AND NOT EXISTS (
+                SELECT 1 FROM retention_doomed d
+                WHERE d.thread_id = c.thread_id AND d.checkpoint_ns = c.checkpoint_ns
+                  AND d.checkpoint_id = c.checkpoint_id
+            )
+      )
+"""
+
+
+def _empty_report() -> Dict[str, int]:
+    return {"threads": 0, "checkpoints": 0, "writes": 0, "blobs": 0, "bytes": 0}
+
+
+def _process_batch(threads: List[str], keep: int, dry_run: bool) -> Dict[str, int]:
+    """
+    One transaction: measure (dry run) or delete the batch's doomed rows.
+    """
+    params = {"threads": threads, "keep": keep}
+    report = _empty_report()
+    report["threads"] = len(threads)
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(_DOOMED, params)
+        cur.execute("SELECT count(*), coalesce(sum(size), 0) FROM retention_doomed")
+        report["checkpoints"], size = cur.fetchone()
+        report["bytes"] += int(size)
+
+        if dry_run:
+            cur.execute(f"""
+                SELECT count(*), coalesce(sum(pg_column_size(w.blob)), 0)
+                FROM checkpoint_writes w JOIN retention_doomed d ON {_WRITE_IS_DOOMED}
+            """)
+            report["writes"], size = cur.fetchone()
+            report["bytes"] += int(size)
+            cur.execute(f"""
+                SELECT count(*), coalesce(sum(pg_column_size(b.blob)), 0)
+                FROM checkpoint_blobs b WHERE {_BLOB_IS_ORPHANED}
+            """, params)
+            report["blobs"], size = cur.fetchone()
+            report["bytes"] += int(size)
+            return report
+
+        # Blobs first: the orphan test needs the doomed checkpoints still present
+        cur.execute(f"""
+            DELETE FROM checkpoint_blobs b WHERE {_BLOB_IS_ORPHANED}
+            RETURNING coalesce(pg_column_size(b.blob), 0)
+        """, params)
+        sizes = cur.fetchall()
+        report["blobs"] = len(sizes)
+        report["bytes"] += sum(s for (s,) in sizes)
+
+        cur.execute(f"""
+            DELETE FROM checkpoint_writes w USING retention_doomed d WHERE {_WRITE_IS_DOOMED}
+            RETURNING pg_column_size(w.blob)
+        """)
+        sizes = cur.fetchall()
+        report["writes"] = len(sizes)
+        report["bytes"] += sum(s for (s,) in sizes)
+
+        cur.execute("""
+            DELETE FROM checkpoints c USING retention_doomed d
+            WHERE c.thread_id = d.thread_id AND c.checkpoint_ns = d.checkpoint_ns AND c.checkpoint_id = d.checkpoint_id
+        """)
+
+    return report
+
+
+def apply_retention(
+    keep: int = CHECKPOINT_KEEP_LATEST,
+    batch_threads: int = CHECKPOINT_RETENTION_BATCH_THREADS,
+    pause_seconds: float = CHECKPOINT_RETENTION_PAUSE_SECONDS,
+    min_idle_seconds: float = CHECKPOINT_RETENTION_MIN_IDLE_SECONDS,
+    dry_run: bool = False,
+    max_batches: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Walk all threads with more than `keep` checkpoints and prune them.
+    Returns totals (rows deleted, or that would be deleted on a dry run).
+    """
+    keep = max(1, int(keep))
+    totals = _empty_report()
+    after, batches = "", 0
+    started = time.time()
+
+    while max_batches is None or batches < max_batches:
+        with get_conn() as cur:
+            cur.execute(_CANDIDATE_THREADS, {"after": after, "keep": keep,
+                                             "idle": min_idle_seconds, "batch": batch_threads})
+            threads = [r[0] for r in cur.fetchall()]
+        if not threads:
+            break
+
+        report = _process_batch(threads, keep, dry_run)
+        for k, v in report.items():
+            totals[k] += v
+        after = threads[-1]
+        batches += 1
+        logger.info("Checkpoint retention batch %d%s: %s", batches, " (dry run)" if dry_run else "", report)
+
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    totals.update({"batches": batches, "keep": keep, "dry_run": dry_run,
+                   "elapsed_s": round(time.time() - started, 2)})
+    logger.info("Checkpoint retention finished: %s", totals)
+    return totals
+
+
+def vacuum_checkpoint_tables() -> None:
+    """
+    VACUUM (ANALYZE) the checkpoint tables so freed space is reused.
+    Needs its own autocommit connection (VACUUM can't run in a transaction).
+    """
+    with Connection.connect(RAW_DSN, autocommit=True) as conn:
+        for table in ("checkpoints", "checkpoint_writes", "checkpoint_blobs"):
+            conn.execute(f"VACUUM (ANALYZE) {table}")
+    logger.info("Vacuumed checkpoint tables")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune old LangGraph checkpoints")
+    parser.add_argument("--keep", type=int, default=CHECKPOINT_KEEP_LATEST, help="latest checkpoints kept per thread")
+    parser.add_argument("--batch", type=int, default=CHECKPOINT_RETENTION_BATCH_THREADS, help="threads per transaction")
+    parser.add_argument("--pause", type=float, default=CHECKPOINT_RETENTION_PAUSE_SECONDS, help="seconds between batches")
+    parser.add_argument("--min-idle", type=float, default=CHECKPOINT_RETENTION_MIN_IDLE_SECONDS,
+                        help="skip threads that wrote a checkpoint more recently than this")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) the tables afterwards")
+    args = parser.parse_args()
+
+    setup_logging()
+    totals = apply_retention(args.keep, args.batch, args.pause, args.min_idle, dry_run=args.dry_run)
+
+    verb = "would delete" if args.dry_run else "deleted"
+    print(f"{totals['threads']} threads in {totals['batches']} batches: {verb} "
+          f"{totals['checkpoints']} checkpoints, {totals['writes']} writes, {totals['blobs']} blobs "
+          f"(~{totals['bytes'] / 1024 / 1024:.1f} MB) in {totals['elapsed_s']}s")
+
+    if args.vacuum and not args.dry_run:
+        vacuum_checkpoint_tables()
+
+
+if __name__ == "__main__":
+    main()
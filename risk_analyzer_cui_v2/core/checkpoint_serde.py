@@ -0,0 +1,69 @@
+# core/checkpoint_serde.py
+import threading
+from typing import Any, Optional, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app_config import CHECKPOINT_COMPRESS_MIN_BYTES, CHECKPOINT_ZSTD_LEVEL
+
+
+# -------------------------------------------------------
+# Checkpoint serializer: ormsgpack + zstd for large values
+# -------------------------------------------------------
+# JsonPlusSerializer already encodes channel values with ormsgpack. This
+# subclass zstd-compresses encoded values of at least `min_bytes` and
+# tags them "<type>+zstd" in the saver's type column. Anything without the
+# suffix is handed to JsonPlusSerializer untouched, so checkpoints written
+# before (or with compression disabled) keep loading.
+# -------------------------------------------------------
+
+ZSTD_SUFFIX = "+zstd"
+
+# zstd contexts are not thread-safe; one pair per thread, reused across calls
+_local = threading.local()
+
+
+def _compressor(level: int) -> zstandard.ZstdCompressor:
+    ctx = getattr(_local, "compressor", None)
+    if ctx is None or _local.level != level:
+        ctx = _local.compressor = zstandard.ZstdCompressor(level=level)
+        _local.level = level
+    return ctx
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    ctx = getattr(_local, "decompressor", None)
+    if ctx is None:
+        ctx = _local.decompressor = zstandard.ZstdDecompressor()
+    return ctx
+
+
+class CompressingSerializer(JsonPlusSerializer):
+    """
+    JsonPlusSerializer that compresses large encoded values.
+    min_bytes=None disables compression (reading compressed values still works).
+    """
+
+    def __init__(self, *, min_bytes: Optional[int] = CHECKPOINT_COMPRESS_MIN_BYTES,
+                 level: int = CHECKPOINT_ZSTD_LEVEL, **kwargs):
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if self.min_bytes is None or type_ == "null" or len(data) < self.min_bytes:
+            return type_, data
+
+        compressed = _compressor(self.level).compress(data)
+        if len(compressed) >= len(data):
+            return type_, data  # incompressible (already-compressed bytes etc.)
+        return type_ + ZSTD_SUFFIX, compressed
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_.endswith(ZSTD_SUFFIX):
+            type_ = type_[:-len(ZSTD_SUFFIX)]
+            data_ = _decompressor().decompress(data_)
+        return super().loads_typed((type_, data_))
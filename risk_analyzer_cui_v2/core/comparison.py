@@ -0,0 +1,92 @@
+# core/comparison.py
+import uuid
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from agents.agent_state import AgentState
+from agents.orchestrator_agent import OrchestratorAgent
+from utils.risk_merge import compare_reports
+from core.logger import logger
+from app_config import COMPARE_CONCURRENCY
+
+
+# -------------------------------------------------------
+# Multi-contract comparison
+# -------------------------------------------------------
+# Each contract runs through the offline pipeline (no conversation rows,
+# in-memory checkpoints) on the shared event loop. One semaphore is shared
+# by ALL comparison requests, so a burst of comparisons can't flood the
+# LLM provider.
+# -------------------------------------------------------
+
+COMPARE_USER_ID = "contract-compare"
+
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    # Created lazily so it binds to the shared loop, not the importing thread's
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(COMPARE_CONCURRENCY)
+    return _slots
+
+
+def _contract_summary(name: str, result: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+    if error:
+        return {"name": name, "status": "failed", "errors": [error]}
+
+    report = result.get("risk_analysis_report") or {}
+    if "__interrupt__" in result:
+        status = "needs_human"
+    else:
+        status = result.get("status") or "unknown"
+
+    return {
+        "name": name,
+        "status": status,
+        "quality_score": result.get("quality_score"),
+        "summary": result.get("summary"),
+        "risk_count": len(report.get("analysis") or []),
+        "clarification": report.get("clarification"),
+        "errors": result.get("errors") or [],
+    }
+
+
+async def _analyze(name: str, text: str, deadline_at: Optional[float], options: Dict[str, Any]):
+    state = AgentState(
+        user_id=COMPARE_USER_ID,
+        input_contract=text,
+        input_history=[text],
+        thread_id=f"compare-{uuid.uuid4()}",
+        deadline_at=deadline_at,
+        **options
+    )
+
+    async with _get_slots():
+        try:
+            return name, await OrchestratorAgent(state).arun_offline(), None
+        except Exception as e:
+            logger.exception("Comparison run failed for %s: %s", name, e)
+            return name, {}, str(e)
+
+
+async def compare_contracts(contracts: List[Dict[str, str]], deadline_at: Optional[float] = None,
+                            options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    contracts: [{"name": ..., "text": ...}] with unique names.
+    Returns per-contract outcomes plus the category × impact matrix and
+    de-duplicated shared/unique risks.
+    """
+    options = options or {}
+    logger.info("Comparing %d contracts (concurrency=%d)", len(contracts), COMPARE_CONCURRENCY)
+
+    runs = await asyncio.gather(*(_analyze(c["name"], c["text"], deadline_at, options) for c in contracts))
+
+    reports = {}
+    summaries = []
+    for name, result, error in runs:
+        summaries.append(_contract_summary(name, result, error))
+        reports[name] = (result or {}).get("risk_analysis_report") or {}
+
+    return {"contracts": summaries, **compare_reports(reports)}
@@ -0,0 +1,134 @@
+# core/conversation_repo.py
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from core import blob_store, db_utils, conversation_search
+from core.cache import LRUCache
+from core.message_buffer import message_buffer
+from core.logger import logger
+from app_config import CONVERSATION_CACHE_MAX_ITEMS, CONVERSATION_CACHE_TTL_SECONDS, MESSAGE_WRITE_BEHIND
+
+
+# -------------------------------------------------------
+# Conversation lookups by thread_id
+# -------------------------------------------------------
+# One request used to look the same conversation up several times
+# (start_chat, OrchestratorAgent.run, from_checkpoint). Lookups now go
+# through two layers:
+#
+#   * a request-scoped identity map (conversation_scope(); opened per
+#     Flask request and per worker job): within a scope a thread's
+#     conversation is read at most once and is always the same dict
+#   * a process-wide TTL cache shared by all requests
+#
+# Creating a conversation fills both. Writing a message bumps the row's
+# updated_at, so it drops the shared entry; the scope keeps its row, since
+# the conversation's identity can't change under a request. Rows are
+# shared: treat them as read-only.
+# -------------------------------------------------------
+
+_scope: contextvars.ContextVar[Optional[Dict[str, Dict[str, Any]]]] = contextvars.ContextVar(
+    "conversation_scope", default=None
+)
+_conversations = LRUCache(CONVERSATION_CACHE_MAX_ITEMS, ttl_seconds=CONVERSATION_CACHE_TTL_SECONDS)
+
+
+@contextmanager
+def conversation_scope():
+    """Open an identity map for the current request / job (nested scopes reuse the outer one)."""
+    if _scope.get() is not None:
+        yield
+        return
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def open_scope():
+    """Start a scope spanning a whole Flask request; returns the token for close_scope()."""
+    return _scope.set({})
+
+
+def close_scope(token) -> None:
+    _scope.reset(token)
+
+
+def get_by_thread(thread_id: str) -> Optional[Dict[str, Any]]:
+    scope = _scope.get()
+    if scope is not None and thread_id in scope:
+        return scope[thread_id]
+
+    conv = _conversations.get(thread_id)
+    if conv is None:
+        conv = db_utils.get_conversation_by_thread(thread_id)
+        if conv is None:
+            return None
+        _conversations.put(thread_id, conv)
+
+    if scope is not None:
+        scope[thread_id] = conv
+    return conv
+
+
+def create(user_id, thread_id: str) -> Dict[str, Any]:
+    conv = db_utils.insert_conversation(user_id, thread_id)
+    _remember(conv)
+    return conv
+
+
+def get_or_create(user_id, thread_id: str) -> Dict[str, Any]:
+    return get_by_thread(thread_id) or create(user_id, thread_id)
+
+
+def add_message(conv: Dict[str, Any], role: str, content: str, metadata=None, message_id=None):
+    if MESSAGE_WRITE_BEHIND:
+        msg_id = message_buffer.add(conv["conversation_id"], role, content, metadata, message_id)
+    else:
+        msg_id = db_utils.add_message(conv["conversation_id"], role, content, metadata, message_id)
+    invalidate(conv["thread_id"])
+    return msg_id
+
+
+# Readers flush queued messages first so callers always see their own writes.
+# Best effort: if the flush fails the rows stay queued and the read goes ahead.
+def _flush_for_read() -> None:
+    try:
+        message_buffer.flush()
+    except Exception as e:
+        logger.warning("Message flush before read failed; queued messages may be missing: %s", e)
+
+
+def get_messages(conversation_id, limit: int = 200, cursor: Optional[str] = None):
+    _flush_for_read()
+    page = db_utils.get_conversation_messages(conversation_id, limit, cursor)
+    # Contracts stay out of the listing: a message holding a blob reference
+    # gets contract_hash (text at /contracts/<hash>) and only what follows
+    # the reference as content
+    for msg in page["items"]:
+        msg["contract_hash"], msg["content"] = blob_store.split_ref(msg["content"])
+    return page
+
+
+def list_for_user(user_id, limit: int = 20, cursor: Optional[str] = None):
+    _flush_for_read()   # updated_at ordering
+    return db_utils.list_conversations_for_user(user_id, limit, cursor)
+
+
+def search(user_id, query: str, limit: int = 20, cursor: Optional[str] = None):
+    _flush_for_read()
+    return conversation_search.search_conversations(user_id, query, limit, cursor)
+
+
+def invalidate(thread_id: str) -> None:
+    """Drop the shared entry after the conversation row changed."""
+    _conversations.pop(thread_id)
+
+
+def _remember(conv: Dict[str, Any]) -> None:
+    _conversations.put(conv["thread_id"], conv)
+    scope = _scope.get()
+    if scope is not None:
+        scope[conv["thread_id"]] = conv
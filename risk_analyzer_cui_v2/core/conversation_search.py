@@ -0,0 +1,167 @@
+# core/conversation_search.py
+import uuid
+from typing import Any, Dict, List, Optional
+
+from psycopg.errors import QueryCanceled
+
+from core.blob_store import get_text
+from core.db_utils import get_conn, encode_cursor, decode_cursor, page_size
+from core.logger import logger
+from core.tracing import traced
+from app_config import SEARCH_STATEMENT_TIMEOUT_MS
+
+
+# -------------------------------------------------------
+# Full-text search over a user's conversations
+# -------------------------------------------------------
+# Three sources, each with a generated / stored tsvector and a GIN index
+# (db_scripts.sql):
+#
+#   * conversations: title (weight A) and summary (weight B)
+#   * messages: content
+#   * contract_blobs: the text of contracts that messages hold by
+#     reference ("blob:sha256:<hex>"), joined back through
+#     idx_messages_blob_ref
+#
+# Results are one row per conversation, carrying its best-ranked match
+# and a highlighted snippet, ordered by ts_rank and keyset-paginated on
+# (rank, conversation_id). The query uses websearch_to_tsquery syntax:
+# plain words, "quoted phrases", OR, -excluded. Snippets are built only
+# for the rows on the page; they are the stored text with <mark> around
+# matches, not escaped HTML.
+#
+# Cost grows with the number of the user's messages that match: rare
+# terms are a few GIN lookups, a word in most of a large history means
+# ranking all of those rows, so searches are capped at
+# SEARCH_STATEMENT_TIMEOUT_MS. Postgres stores word positions only up to
+# 16383, so in very long contracts matches past that point still count
+# but rank low, and phrase queries can't match them.
+# -------------------------------------------------------
+
+_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=12, MaxFragments=2"
+
+# The tsquery is written inline (not as a CTE) so the planner can estimate
+# its selectivity. Messages are restricted with = ANY(<the user's
+# conversation ids>) rather than a join: the GIN index is then scanned
+# once and ANDed with idx_messages_conversation_created, where a join
+# tends to become a nested loop that repeats the GIN scan per conversation.
+_SEARCH_SQL = """
+    WITH hits AS (
+        SELECT c.conversation_id, 'conversation' AS kind, NULL::uuid AS message_id,
+               ts_rank(c.search_vector, websearch_to_tsquery('english', %(query)s), 1) AS rank
+        FROM conversations c
+        WHERE c.user_id = %(user_id)s
+          AND c.search_vector @@ websearch_to_tsquery('english', %(query)s)
+      UNION ALL
+        SELECT m.conversation_id, 'message', m.message_id,
+               ts_rank(m.search_vector, websearch_to_tsquery('english', %(query)s), 1)
+        FROM messages m
+        WHERE m.conversation_id = ANY(ARRAY(
+                  SELECT conversation_id FROM conversations WHERE user_id = %(user_id)s))
+          AND m.search_vector @@ websearch_to_tsquery('english', %(query)s)
+      UNION ALL
+        SELECT m.conversation_id, 'contract', m.message_id,
+               ts_rank(b.search_vector, websearch_to_tsquery('english', %(query)s), 1)
+        FROM contract_blobs b
+        JOIN messages m
+          ON left(m.content, 76) = 'blob:sha256:' || b.blob_hash AND m.content LIKE 'blob:sha256:%%'
+        JOIN conversations c ON c.conversation_id = m.conversation_id
+        WHERE c.user_id = %(user_id)s
+          AND b.search_vector @@ websearch_to_tsquery('english', %(query)s)
+    ),
+    best AS (
+        SELECT DISTINCT ON (conversation_id) *
+        FROM hits
+        ORDER BY conversation_id, rank DESC, kind, message_id
+    ),
+    page AS (
+        SELECT * FROM best
+        WHERE {after}
+        ORDER BY rank DESC, conversation_id DESC
+        LIMIT %(limit)s
+    )
+    SELECT p.conversation_id, c.thread_id, c.title, c.updated_at, p.rank, p.kind,
+           p.message_id, m.role, m.created_at,
+           CASE p.kind
+               WHEN 'conversation' THEN
+                   ts_headline('english', concat_ws(' — ', c.title, c.summary),
+                               websearch_to_tsquery('english', %(query)s), %(options)s)
+               WHEN 'message' THEN
+                   ts_headline('english', left(m.content, 250000),
+                               websearch_to_tsquery('english', %(query)s), %(options)s)
+           END AS snippet,
+           CASE WHEN p.kind = 'contract' THEN left(m.content, 76) END AS contract_ref
+    FROM page p
+    JOIN conversations c ON c.conversation_id = p.conversation_id
+    LEFT JOIN messages m ON m.message_id = p.message_id
+    ORDER BY p.rank DESC, p.conversation_id DESC
+"""
+
+# Contract texts are compressed in the table, so their snippets come from the decoded text
+_CONTRACT_HEADLINE_SQL = """
+    SELECT ts_headline('english', left(doc, 250000), websearch_to_tsquery('english', %s), %s)
+    FROM unnest(%s::text[]) WITH ORDINALITY AS d(doc, n)
+    ORDER BY n
+"""
+
+
+@traced("db.search_conversations", kind="db")
+def search_conversations(user_id: uuid.UUID, query: str, limit: int = 20,
+                         cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Best-matching conversations of a user for `query`, most relevant first.
+    Pass the returned next_cursor back as `cursor` for the next page.
+    """
+    query = (query or "").strip()
+    if not query:
+        raise ValueError("q is required")
+    limit = page_size(limit)
+    logger.info("search_conversations: user_id=%s limit=%d cursor=%s", user_id, limit, cursor)
+
+    params: Dict[str, Any] = {
+        "query": query, "user_id": user_id, "limit": limit + 1, "options": _HEADLINE_OPTIONS,
+    }
+    after = "TRUE"
+    if cursor:
+        params["rank"], params["after_id"] = decode_cursor(cursor, float, uuid.UUID)
+        after = "(rank, conversation_id) < (%(rank)s::real, %(after_id)s)"
+
+    try:
+        with get_conn() as cur:
+            # The pool rolls the connection back on return, which resets the timeout
+            cur.execute(f"SET LOCAL statement_timeout = {int(SEARCH_STATEMENT_TIMEOUT_MS)}")
+            # Never prepared: a generic plan can't see how rare the terms are
+            cur.execute(_SEARCH_SQL.format(after=after), params, prepare=False)
+            rows = cur.fetchall()
+    except QueryCanceled:
+        raise ValueError("search is too broad; add more specific terms") from None
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    headlines = iter(())
+    texts = [get_text(r[10]) for r in rows if r[10]]
+    if texts:
+        with get_conn() as cur:
+            cur.execute(_CONTRACT_HEADLINE_SQL, (query, _HEADLINE_OPTIONS, texts))
+            headlines = iter([r[0] for r in cur.fetchall()])
+
+    items: List[Dict[str, Any]] = []
+    for r in rows:
+        items.append({
+            "conversation_id": r[0],
+            "thread_id": r[1],
+            "title": r[2],
+            "updated_at": r[3],
+            "rank": r[4],
+            "match": {
+                "kind": r[5],               # conversation | message | contract
+                "message_id": r[6],
+                "role": r[7],
+                "created_at": r[8],
+                "snippet": next(headlines) if r[10] else r[9],
+            },
+        })
+
+    next_cursor = encode_cursor(rows[-1][4], rows[-1][0]) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -2,10 +2,15 @@
 import json
 import uuid
 import time
+import base64
+from datetime import datetime
 from contextlib import contextmanager
 from typing import Optional, Dict, Any, List
 from core.database import app_pool
+from core.cache import LRUCache
 from core.logger import logger
+from core.tracing import traced
+from app_config import USER_CACHE_MAX_ITEMS, USER_CACHE_TTL_SECONDS
 
 
 # -------------------------------------------------------
@@ -35,45 +40,75 @@ def get_conn(transactional=False):
 # -------------------------------------------------------
 # USERS
 # -------------------------------------------------------
+# email → user_id. Users are never deleted or re-keyed by the app, so
+# entries only age out (TTL) or get evicted.
+_user_ids = LRUCache(USER_CACHE_MAX_ITEMS, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+
 def get_or_create_user(email: str):
-    sql_select = "SELECT user_id FROM users WHERE email = %s"
-    sql_insert = """
-        INSERT INTO users (user_id, email)
-        VALUES (%s, %s)
-        RETURNING user_id
+    user_id = _user_ids.get(email)
+    if user_id is None:
+        user_id = _upsert_user(email)
+        _user_ids.put(email, user_id)
+    return user_id
+
+
+@traced("db.get_or_create_user", kind="db")
+def _upsert_user(email: str):
+    # New and existing users in one statement. When a concurrent request
+    # inserts the same email first, ON CONFLICT waits for it and skips, and
+    # this statement's snapshot can't see that row yet: hence the fallback
+    # SELECT, which runs with a fresh snapshot.
+    sql_upsert = """
+        WITH ins AS (
+            INSERT INTO users (user_id, email)
+            VALUES (%s, %s)
+            ON CONFLICT (email) DO NOTHING
+            RETURNING user_id
+        )
+        SELECT user_id FROM ins
+        UNION ALL
+        SELECT user_id FROM users WHERE email = %s
+        LIMIT 1
     """
+    sql_select = "SELECT user_id FROM users WHERE email = %s"
 
     with get_conn(transactional=True) as cur:
-        cur.execute(sql_select, (email,))
+        cur.execute(sql_upsert, (uuid.uuid4(), email, email))
         row = cur.fetchone()
-        if row:
-            return row[0]
-
-        new_id = uuid.uuid4()
-        cur.execute(sql_insert, (new_id, email))
-        return cur.fetchone()[0]
+        if row is None:
+            cur.execute(sql_select, (email,))
+            row = cur.fetchone()
+        return row[0]
 
 
 # -------------------------------------------------------
 # CONVERSATIONS
 # -------------------------------------------------------
-def create_conversation(user_id: uuid.UUID, thread_id: str):
-    sql = """
+_CONVERSATION_COLUMNS = "conversation_id, user_id, thread_id, title, summary, created_at, updated_at"
+
+
+@traced("db.create_conversation", kind="db")
+def insert_conversation(user_id: uuid.UUID, thread_id: str) -> Dict[str, Any]:
+    """
+    Create a conversation and return the stored row (as get_conversation_by_thread would).
+    """
+    sql = f"""
         INSERT INTO conversations (conversation_id, user_id, thread_id)
         VALUES (%s, %s, %s)
-        RETURNING conversation_id
+        RETURNING {_CONVERSATION_COLUMNS}
     """
 
     new_id = uuid.uuid4()
     with get_conn(transactional=True) as cur:
         cur.execute(sql, (new_id, user_id, thread_id))
-        return cur.fetchone()[0]
-
+        return _conversation_from_row(cur.fetchone())
 
 
+@traced("db.get_conversation_by_thread", kind="db")
 def get_conversation_by_thread(thread_id: str):
-    sql = """
-        SELECT conversation_id, user_id, thread_id, title, summary, created_at, updated_at
+    sql = f"""
+        SELECT {_CONVERSATION_COLUMNS}
         FROM conversations
         WHERE thread_id = %s
     """
@@ -85,6 +120,10 @@ def get_conversation_by_thread(thread_id: str):
     if not row:
         return None
 
+    return _conversation_from_row(row)
+
+
+def _conversation_from_row(row) -> Dict[str, Any]:
     return {
         "conversation_id": row[0],
         "user_id": row[1],
@@ -99,15 +138,19 @@ def get_conversation_by_thread(thread_id: str):
 # -------------------------------------------------------
 # MESSAGES
 # -------------------------------------------------------
-def add_message(conversation_id, role, content, metadata=None):
+@traced("db.add_message", kind="db")
+def add_message(conversation_id, role, content, metadata=None, message_id=None):
+    """
+    Pass a stable message_id to make the insert idempotent (retried jobs).
+    """
     sql_insert = """
         INSERT INTO messages (message_id, conversation_id, role, content, metadata)
         VALUES (%s, %s, %s, %s, %s)
-        RETURNING message_id
+        ON CONFLICT (message_id) DO NOTHING
     """
     sql_update = "UPDATE conversations SET updated_at = NOW() WHERE conversation_id = %s"
 
-    msg_id = uuid.uuid4()
+    msg_id = message_id or uuid.uuid4()
     meta_json = json.dumps(metadata or {})
 
     with get_conn(transactional=True) as cur:
@@ -119,22 +162,70 @@ def add_message(conversation_id, role, content, metadata=None):
 # -------------------------------------------------------
 # MESSAGE LISTING
 # -------------------------------------------------------
-def get_conversation_messages(conversation_id: uuid.UUID, limit: int = 200):
-    logger.info("get_conversation_messages: cid=%s limit=%d", conversation_id, limit)
+# Both listings are keyset-paginated: a page ends with an opaque
+# next_cursor (the sort key of its last row) and the next page starts
+# strictly after it, so every page is one range scan of the composite
+# indexes in db_scripts.sql however deep it is, and rows written between
+# requests never shift a page. The unique id breaks ties between rows with
+# the same timestamp.
+# -------------------------------------------------------
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(*key) -> str:
+    """Opaque cursor for a row's sort key (datetimes, UUIDs, numbers)."""
+    values = [k.isoformat() if isinstance(k, datetime) else k if isinstance(k, (int, float)) else str(k)
+              for k in key]
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    sql = """
+
+def decode_cursor(cursor: str, *parsers):
+    """Inverse of encode_cursor(); each value goes through its parser. Raises ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(parsers):
+            raise ValueError
+        return tuple(parse(v) for parse, v in zip(parsers, values))
+    except Exception:
+        raise ValueError("invalid cursor") from None
+
+
+def page_size(limit) -> int:
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+@traced("db.get_conversation_messages", kind="db")
+def get_conversation_messages(conversation_id: uuid.UUID, limit: int = 200,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Oldest-first page of a conversation's messages; pass next_cursor back as `cursor`."""
+    limit = page_size(limit)
+    logger.info("get_conversation_messages: cid=%s limit=%d cursor=%s", conversation_id, limit, cursor)
+
+    where = "conversation_id = %s"
+    params: List[Any] = [conversation_id]
+    if cursor:
+        where += " AND (created_at, message_id) > (%s, %s)"
+        params.extend(decode_cursor(cursor, datetime.fromisoformat, uuid.UUID))
+    params.append(limit + 1)
+
+    sql = f"""
         SELECT message_id, role, content, metadata, created_at
         FROM messages
-        WHERE conversation_id = %s
-        ORDER BY created_at ASC
+        WHERE {where}
+        ORDER BY created_at ASC, message_id ASC
         LIMIT %s
     """
 
     try:
         with get_conn() as cur:
-            cur.execute(sql, (conversation_id, limit))
+            cur.execute(sql, params)
             rows = cur.fetchall()
 
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
         msgs = []
         for r in rows:
             meta = r[3]
@@ -152,7 +243,8 @@ def get_conversation_messages(conversation_id: uuid.UUID, limit: int = 200):
                 "created_at": r[4],
             })
 
-        return msgs
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][0]) if has_more else None
+        return {"items": msgs, "next_cursor": next_cursor}
 
     except Exception as e:
         logger.exception("get_conversation_messages failed: %s", e)
@@ -162,24 +254,37 @@ def get_conversation_messages(conversation_id: uuid.UUID, limit: int = 200):
 # -------------------------------------------------------
 # USER CONVERSATION LIST
 # -------------------------------------------------------
-def list_conversations_for_user(user_id: uuid.UUID, limit: int = 20, offset: int = 0):
-    logger.info("list_conversations_for_user: user_id=%s limit=%d offset=%d",
-                user_id, limit, offset)
-
-    sql = """
+@traced("db.list_conversations_for_user", kind="db")
+def list_conversations_for_user(user_id: uuid.UUID, limit: int = 20,
+                                cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Most recently updated first; pass next_cursor back as `cursor`."""
+    limit = page_size(limit)
+    logger.info("list_conversations_for_user: user_id=%s limit=%d cursor=%s",
+                user_id, limit, cursor)
+
+    where = "user_id = %s"
+    params: List[Any] = [user_id]
+    if cursor:
+        where += " AND (updated_at, conversation_id) < (%s, %s)"
+        params.extend(decode_cursor(cursor, datetime.fromisoformat, uuid.UUID))
+    params.append(limit + 1)
+
+    sql = f"""
         SELECT conversation_id, thread_id, title, summary, updated_at
         FROM conversations
-        WHERE user_id = %s
-        ORDER BY updated_at DESC
-        LIMIT %s OFFSET %s
+        WHERE {where}
+        ORDER BY updated_at DESC, conversation_id DESC
+        LIMIT %s
     """
 
     try:
         with get_conn() as cur:
-            cur.execute(sql, (user_id, limit, offset))
+            cur.execute(sql, params)
             rows = cur.fetchall()
 
-        return [
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
             {
                 "conversation_id": r[0],
                 "thread_id": r[1],
@@ -189,6 +294,8 @@ def list_conversations_for_user(user_id: uuid.UUID, limit: int = 20, offset: int
             }
             for r in rows
         ]
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][0]) if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
 
     except Exception as e:
         logger.exception("list_conversations_for_user failed: %s", e)
@@ -0,0 +1,82 @@
+# core/deadline.py
+import time
+from typing import Optional
+
+from app_config import (
+    LLM_MAX_TIMEOUT_SECONDS,
+    LLM_MIN_TIMEOUT_SECONDS,
+    ESTIMATED_ANALYZER_SECONDS,
+    SUMMARY_RESERVE_SECONDS,
+)
+
+
+# -------------------------------------------------------
+# End-to-end latency budget for one graph run
+# -------------------------------------------------------
+# AgentState.deadline_at holds an absolute epoch timestamp, so the budget
+# survives checkpoints and node boundaries. None means "no deadline".
+# -------------------------------------------------------
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there is no time left for another LLM call."""
+
+
+def deadline_from_seconds(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None or seconds <= 0:
+        return None
+    return time.time() + float(seconds)
+
+
+def resolve_deadline(seconds, default_seconds: Optional[float]) -> Optional[float]:
+    """
+    Absolute deadline from a client-supplied budget (None → default, 0 → no deadline).
+    """
+    if seconds is None:
+        seconds = default_seconds
+    try:
+        return deadline_from_seconds(float(seconds) if seconds is not None else None)
+    except (TypeError, ValueError):
+        return deadline_from_seconds(default_seconds)
+
+
+def remaining_seconds(deadline_at: Optional[float]) -> Optional[float]:
+    if deadline_at is None:
+        return None
+    return deadline_at - time.time()
+
+
+def llm_timeout(deadline_at: Optional[float]) -> float:
+    """
+    Per-call LLM timeout derived from the remaining budget, capped at
+    LLM_MAX_TIMEOUT_SECONDS. Raises DeadlineExceeded when the remaining
+    budget can't fit even a minimal call.
+    """
+    remaining = remaining_seconds(deadline_at)
+    if remaining is None:
+        return LLM_MAX_TIMEOUT_SECONDS
+
+    if remaining < LLM_MIN_TIMEOUT_SECONDS:
+        raise DeadlineExceeded(f"Deadline exceeded ({remaining:.1f}s left)")
+
+    return min(remaining, LLM_MAX_TIMEOUT_SECONDS)
+
+
+def can_afford_refinement(deadline_at: Optional[float]) -> bool:
+    """
+    Another analyzer → critic → arbiter round still has to leave room for the summary.
+    """
+    remaining = remaining_seconds(deadline_at)
+    if remaining is None:
+        return True
+    return remaining >= ESTIMATED_ANALYZER_SECONDS + SUMMARY_RESERVE_SECONDS
+
+
+def summary_time_is_short(deadline_at: Optional[float]) -> bool:
+    """
+    True when an LLM summary would likely blow the budget.
+    """
+    remaining = remaining_seconds(deadline_at)
+    if remaining is None:
+        return False
+    return remaining < SUMMARY_RESERVE_SECONDS
@@ -0,0 +1,66 @@
+# core/http_compression.py
+import gzip
+import threading
+
+import zstandard
+from flask import Response, request
+
+from app_config import RESPONSE_COMPRESS_MIN_BYTES, RESPONSE_GZIP_LEVEL, RESPONSE_ZSTD_LEVEL
+
+
+# -------------------------------------------------------
+# Response compression (Accept-Encoding: zstd / gzip)
+# -------------------------------------------------------
+# Registered as an after_request hook. Compresses buffered text/JSON
+# bodies of at least RESPONSE_COMPRESS_MIN_BYTES with the best encoding
+# the client accepts (zstd preferred on equal q-values). Streamed
+# responses (SSE) and already-encoded bodies are passed through.
+# -------------------------------------------------------
+
+ENCODINGS = ("zstd", "gzip")
+
+_COMPRESSIBLE = ("application/json", "application/javascript", "image/svg+xml")
+
+# zstd contexts are not thread-safe; one per thread, reused across responses
+_local = threading.local()
+
+
+def _zstd(data: bytes) -> bytes:
+    ctx = getattr(_local, "compressor", None)
+    if ctx is None:
+        ctx = _local.compressor = zstandard.ZstdCompressor(level=RESPONSE_ZSTD_LEVEL)
+    return ctx.compress(data)
+
+
+def _compressible(response: Response) -> bool:
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if "Content-Encoding" in response.headers:
+        return False
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") and mimetype != "text/event-stream" or mimetype in _COMPRESSIBLE
+
+
+def compress_response(response: Response) -> Response:
+    if not _compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < RESPONSE_COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "zstd":
+        body = _zstd(data)
+    else:
+        body = gzip.compress(data, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
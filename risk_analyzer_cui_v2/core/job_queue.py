@@ -0,0 +1,368 @@
+# core/job_queue.py
+import json
+import time
+import uuid
+import threading
+import dataclasses
+from typing import Optional, Dict, Any, List
+
+import psycopg
+
+from core.database import RAW_DSN
+from core.db_utils import get_conn
+from core.jobs import TERMINAL_STATUSES, JOB_AWAITING_HUMAN
+from core.logger import logger
+from app_config import JOB_WAIT_RECHECK_SECONDS
+
+
+# -------------------------------------------------------
+# Durable analysis job queue (table: analysis_jobs)
+# -------------------------------------------------------
+# Workers on any number of machines claim jobs with
+# FOR UPDATE SKIP LOCKED, so concurrent claims never block on
+# (or return) the same row. A claimed job carries a lease token
+# and a lease expiry that the worker extends with heartbeats.
+# Every state change after the claim is guarded by the lease
+# token, so a worker that lost its lease can't overwrite the
+# outcome of the worker that re-claimed the job.
+#
+# Every change that bumps `version` also sends
+# NOTIFY analysis_jobs, '<job_id>' (delivered at commit). Waiters
+# (long-poll, SSE) sleep on one shared LISTEN connection per
+# process instead of polling the table through app_pool.
+# -------------------------------------------------------
+
+JOB_NOTIFY_CHANNEL = "analysis_jobs"
+_NOTIFY = f"pg_notify('{JOB_NOTIFY_CHANNEL}', j.job_id::text)"
+
+JOB_COLUMNS = [
+    "job_id", "kind", "thread_id", "user_id", "payload", "status", "attempts", "max_attempts",
+    "locked_by", "lease_token", "result", "errors", "version",
+    "created_at", "started_at", "finished_at",
+]
+
+
+def _select_list(alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + c for c in JOB_COLUMNS)
+
+
+def _jsonable(value):
+    """json.dumps default: graph results may contain dataclasses (e.g. Interrupt)."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    return str(value)
+
+
+def _row_to_job(r) -> Dict[str, Any]:
+    return {
+        "job_id": str(r[0]),
+        "kind": r[1],
+        "thread_id": r[2],
+        "user_id": str(r[3]) if r[3] else None,
+        "payload": r[4],
+        "status": r[5],
+        "attempts": r[6],
+        "max_attempts": r[7],
+        "locked_by": r[8],
+        "lease_token": str(r[9]) if r[9] else None,
+        "result": r[10],
+        "errors": r[11] or [],
+        "version": r[12],
+        "created_at": r[13],
+        "started_at": r[14],
+        "finished_at": r[15],
+    }
+
+
+def enqueue_job(kind: str, thread_id: str, payload: Dict[str, Any],
+                user_id: Optional[uuid.UUID] = None, max_attempts: int = 3) -> str:
+    sql = """
+        INSERT INTO analysis_jobs (job_id, kind, thread_id, user_id, payload, max_attempts)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        RETURNING job_id
+    """
+
+    job_id = uuid.uuid4()
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (job_id, kind, thread_id, user_id, json.dumps(payload), max_attempts))
+        job_id = cur.fetchone()[0]
+
+    logger.info("Durable job enqueued: job_id=%s kind=%s thread_id=%s", job_id, kind, thread_id)
+    return str(job_id)
+
+
+def claim_job(worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the oldest ready job, or return None if the queue is empty.
+    """
+    sql = f"""
+        WITH next AS (
+            SELECT job_id
+            FROM analysis_jobs
+            WHERE status = 'queued' AND available_at <= NOW()
+            ORDER BY available_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE analysis_jobs j
+        SET status = 'running',
+            attempts = j.attempts + 1,
+            locked_by = %s,
+            lease_token = %s,
+            lease_expires_at = NOW() + make_interval(secs => %s),
+            heartbeat_at = NOW(),
+            started_at = COALESCE(j.started_at, NOW()),
+            version = j.version + 1,
+            updated_at = NOW()
+        FROM next
+        WHERE j.job_id = next.job_id
+        RETURNING {_select_list("j")}, {_NOTIFY}
+    """
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (worker_id, uuid.uuid4(), lease_seconds))
+        row = cur.fetchone()
+
+    return _row_to_job(row) if row else None
+
+
+def heartbeat_job(job_id: str, lease_token: str, lease_seconds: int) -> bool:
+    """
+    Extend the lease. Returns False if the lease was lost (job re-claimed or finished).
+    """
+    sql = """
+        UPDATE analysis_jobs
+        SET lease_expires_at = NOW() + make_interval(secs => %s),
+            heartbeat_at = NOW(),
+            updated_at = NOW()
+        WHERE job_id = %s AND lease_token = %s AND status = 'running'
+    """
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (lease_seconds, job_id, lease_token))
+        return cur.rowcount == 1
+
+
+def complete_job(job_id: str, lease_token: str, status: str, result: Dict[str, Any],
+                 errors: Optional[List[str]] = None) -> bool:
+    """
+    Record the outcome ('completed', 'awaiting_human', or 'failed' for a graph
+    run that gave up, with its errors) if we still hold the lease. Unlike
+    fail_job() this is final: the graph itself ran to its end.
+    """
+    sql = f"""
+        UPDATE analysis_jobs j
+        SET status = %s,
+            result = %s,
+            errors = COALESCE(errors, '[]'::jsonb) || %s::jsonb,
+            lease_token = NULL,
+            lease_expires_at = NULL,
+            finished_at = NOW(),
+            version = version + 1,
+            updated_at = NOW()
+        WHERE job_id = %s AND lease_token = %s AND status = 'running'
+        RETURNING {_NOTIFY}
+    """
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (status, json.dumps(result, default=_jsonable), json.dumps(errors or []),
+                          job_id, lease_token))
+        ok = cur.rowcount == 1
+
+    if not ok:
+        logger.warning("complete_job: lease lost for job_id=%s; result discarded", job_id)
+    return ok
+
+
+def fail_job(job_id: str, lease_token: str, error: str, retry_backoff_seconds: int) -> bool:
+    """
+    Release a failed attempt: requeue with exponential backoff,
+    or mark 'dead' once max_attempts is exhausted.
+    """
+    sql = f"""
+        UPDATE analysis_jobs j
+        SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+            available_at = NOW() + make_interval(secs => %s * power(2, attempts - 1)),
+            errors = COALESCE(errors, '[]'::jsonb) || jsonb_build_array(%s::text),
+            lease_token = NULL,
+            lease_expires_at = NULL,
+            locked_by = NULL,
+            finished_at = CASE WHEN attempts >= max_attempts THEN NOW() ELSE NULL END,
+            version = version + 1,
+            updated_at = NOW()
+        WHERE job_id = %s AND lease_token = %s AND status = 'running'
+        RETURNING {_NOTIFY}
+    """
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (retry_backoff_seconds, error, job_id, lease_token))
+        return cur.rowcount == 1
+
+
+def reap_expired_leases(batch_size: int = 100) -> int:
+    """
+    Requeue jobs whose worker stopped heartbeating (crash, network partition).
+    Jobs that already used every attempt are marked 'dead'.
+    """
+    sql = f"""
+        WITH expired AS (
+            SELECT job_id
+            FROM analysis_jobs
+            WHERE status = 'running' AND lease_expires_at < NOW()
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE analysis_jobs j
+        SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'dead' ELSE 'queued' END,
+            errors = COALESCE(j.errors, '[]'::jsonb) || jsonb_build_array('lease expired (worker ' || COALESCE(j.locked_by, '?') || ')'),
+            available_at = NOW(),
+            lease_token = NULL,
+            lease_expires_at = NULL,
+            locked_by = NULL,
+            finished_at = CASE WHEN j.attempts >= j.max_attempts THEN NOW() ELSE NULL END,
+            version = j.version + 1,
+            updated_at = NOW()
+        FROM expired
+        WHERE j.job_id = expired.job_id
+        RETURNING {_NOTIFY}
+    """
+
+    with get_conn(transactional=True) as cur:
+        cur.execute(sql, (batch_size,))
+        count = cur.rowcount
+
+    if count:
+        logger.warning("Requeued %d job(s) with expired leases", count)
+    return count
+
+
+class JobChangeListener:
+    """
+    One LISTEN connection per process (not from app_pool), shared by every
+    waiter. wait() returns when a watched job was changed, or on timeout.
+    While the connection is down waiters fall back to their timeout, and
+    all of them are woken once it is back, since changes may have been missed.
+    """
+
+    def __init__(self, dsn: str = RAW_DSN, channel: str = JOB_NOTIFY_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._watchers: Dict[str, int] = {}
+        self._changed: Dict[str, int] = {}   # watched job_id → _seq of its latest change
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, job_id: str) -> int:
+        """Start watching a job; returns the token to pass to wait()."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="job-listener", daemon=True)
+                self._thread.start()
+            self._watchers[job_id] = self._watchers.get(job_id, 0) + 1
+            return self._seq
+
+    def unwatch(self, job_id: str) -> None:
+        with self._cond:
+            count = self._watchers.get(job_id, 0) - 1
+            if count > 0:
+                self._watchers[job_id] = count
+            else:
+                self._watchers.pop(job_id, None)
+                self._changed.pop(job_id, None)
+
+    def wait(self, job_id: str, token: int, timeout: float) -> int:
+        """Block until the job changed after `token` or the timeout; returns the new token."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._changed.get(job_id, -1) > token, timeout)
+            return self._seq
+
+    def _changed_jobs(self, job_ids) -> None:
+        with self._cond:
+            self._seq += 1
+            for job_id in job_ids:
+                if job_id in self._watchers:
+                    self._changed[job_id] = self._seq
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        reconnect = False
+        while True:
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    logger.info("Listening for job changes on channel %s", self.channel)
+                    if reconnect:
+                        with self._cond:
+                            missed = list(self._watchers)
+                        self._changed_jobs(missed)
+                    reconnect = True
+                    for n in conn.notifies():
+                        self._changed_jobs([n.payload])
+            except Exception as e:
+                logger.error("Job change listener failed (%s); reconnecting in %.0fs", e, JOB_WAIT_RECHECK_SECONDS)
+                time.sleep(JOB_WAIT_RECHECK_SECONDS)
+
+
+_listener = JobChangeListener()
+
+
+class PostgresJobStore:
+    """
+    Read side of the durable queue with the same get()/wait() shape as
+    core.jobs.JobManager, so /jobs/<id> works with either backend.
+    """
+
+    def __init__(self, recheck_interval: float = JOB_WAIT_RECHECK_SECONDS):
+        self.recheck_interval = recheck_interval
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        sql = f"SELECT {_select_list()} FROM analysis_jobs WHERE job_id = %s"
+
+        try:
+            job_uuid = uuid.UUID(job_id)
+        except ValueError:
+            return None
+
+        with get_conn() as cur:
+            cur.execute(sql, (job_uuid,))
+            row = cur.fetchone()
+
+        if not row:
+            return None
+
+        job = _row_to_job(row)
+        job.pop("lease_token", None)
+        job["prompt_for_human"] = _prompt_from_result(job)
+        return job
+
+    def wait(self, job_id: str, timeout: float, after_version: int = -1) -> Optional[Dict[str, Any]]:
+        """
+        Re-reads the job (one pooled connection for one SELECT) only when it
+        was notified as changed, or every recheck_interval as a backstop.
+        """
+        deadline = time.time() + timeout
+        token = _listener.watch(job_id)   # before the first read, so no change is missed
+        try:
+            while True:
+                job = self.get(job_id)
+                if job is None:
+                    return None
+                if job["version"] > after_version and (after_version >= 0 or job["status"] in TERMINAL_STATUSES):
+                    return job
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return job
+                token = _listener.wait(job_id, token, min(remaining, self.recheck_interval))
+        finally:
+            _listener.unwatch(job_id)
+
+
+def _prompt_from_result(job: Dict[str, Any]) -> Optional[str]:
+    if job["status"] != JOB_AWAITING_HUMAN or not isinstance(job.get("result"), dict):
+        return None
+    items = job["result"].get("__interrupt__") or []
+    if items and isinstance(items[0], dict):
+        return items[0].get("value")
+    return "Human input required"
@@ -0,0 +1,157 @@
+# core/jobs.py
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, Any
+
+from core.logger import logger
+
+
+# Job lifecycle
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_AWAITING_HUMAN = "awaiting_human"
+JOB_FAILED = "failed"
+JOB_DEAD = "dead"  # durable queue only: retries exhausted
+
+TERMINAL_STATUSES = {JOB_COMPLETED, JOB_AWAITING_HUMAN, JOB_FAILED, JOB_DEAD}
+
+
+def outcome_for_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a graph result onto job fields.
+    A graph that stopped on interrupt() returns '__interrupt__' instead of a summary;
+    one that gave up (deadline, LLM failure) returns status "failed" and its message.
+    """
+    if isinstance(result, dict) and "__interrupt__" in result:
+        items = result["__interrupt__"]
+        prompt = getattr(items[0], "value", None) if items else None
+        return {
+            "status": JOB_AWAITING_HUMAN,
+            "prompt_for_human": prompt or "Human input required",
+        }
+
+    if isinstance(result, dict) and result.get("status") == "failed":
+        errors = [str(e) for e in result.get("errors") or []]
+        message = result.get("message")
+        if message and message not in errors:
+            errors.insert(0, str(message))
+        return {
+            "status": JOB_FAILED,
+            "prompt_for_human": None,
+            "errors": errors or ["Analysis failed"],
+        }
+
+    return {"status": JOB_COMPLETED, "prompt_for_human": None}
+
+
+class JobManager:
+    """
+    In-process background job runner for graph executions.
+
+    - submit() returns immediately with a job_id
+    - a bounded thread pool runs the graph
+    - get()/wait() support polling and long-polling
+    - every status change wakes waiters (used for SSE push)
+    """
+
+    def __init__(self, max_workers: int = 4, result_ttl: int = 3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="graph-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._result_ttl = result_ttl
+
+    # -----------------------------------------------
+    def submit(self, fn: Callable[[], Dict[str, Any]], thread_id: str, kind: str) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self._cond:
+            self._evict_expired(now)
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "thread_id": thread_id,
+                "status": JOB_QUEUED,
+                "prompt_for_human": None,
+                "result": None,
+                "errors": [],
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "version": 0,
+            }
+
+        logger.info("Job queued: job_id=%s kind=%s thread_id=%s", job_id, kind, thread_id)
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    # -----------------------------------------------
+    def _run(self, job_id: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+        start = time.time()
+
+        try:
+            result = fn()
+            outcome = outcome_for_result(result)
+            self._update(job_id, result=result, finished_at=time.time(), **outcome)
+            logger.info("Job finished: job_id=%s status=%s elapsed=%.2fs",
+                        job_id, outcome["status"], time.time() - start)
+
+        except Exception as e:
+            logger.exception("Job failed: job_id=%s error=%s", job_id, e)
+            self._update(job_id, status=JOB_FAILED, errors=[str(e)], finished_at=time.time())
+
+    # -----------------------------------------------
+    def _update(self, job_id: str, **fields) -> None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["version"] += 1
+            self._cond.notify_all()
+
+    # -----------------------------------------------
+    def _evict_expired(self, now: float) -> None:
+        # Caller holds self._cond
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATUSES
+            and job["finished_at"] and now - job["finished_at"] > self._result_ttl
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+
+    # -----------------------------------------------
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    # -----------------------------------------------
+    def wait(self, job_id: str, timeout: float, after_version: int = -1) -> Optional[Dict[str, Any]]:
+        """
+        Block until the job changes past `after_version`, reaches a terminal
+        status, or the timeout expires. Returns a snapshot of the job.
+        """
+        deadline = time.time() + timeout
+
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["version"] > after_version and (after_version >= 0 or job["status"] in TERMINAL_STATUSES):
+                    return dict(job)
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return dict(job)
+                self._cond.wait(remaining)
+
+    # -----------------------------------------------
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,37 @@
+# core/json_provider.py
+from typing import Any, Union
+
+import orjson
+from flask import Response
+from flask.json.provider import JSONProvider, _default
+
+
+# -------------------------------------------------------
+# orjson-backed Flask JSON provider
+# -------------------------------------------------------
+# Same output types as Flask's default provider (dates as HTTP dates,
+# Decimal/UUID as strings, dataclasses as dicts) but encoded by orjson
+# straight to bytes, without sorting keys. Install with
+# app.json = OrjsonProvider(app).
+# -------------------------------------------------------
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        option = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dumps_bytes(obj, indent=self._app.debug) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
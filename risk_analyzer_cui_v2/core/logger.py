@@ -80,5 +80,22 @@ def setup_logging() -> None:
     logger._configured = True  # type: ignore[attr-defined]
 
 
+class lazy_dump:
+    """
+    Log argument that dumps a model only if a handler actually formats the
+    record, so debug-level state dumps cost nothing at INFO level:
+
+        logger.debug("Incoming state: %s", lazy_dump(state))
+    """
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        dump = getattr(self.obj, "model_dump", None)
+        return str(dump() if callable(dump) else self.obj)
+
+
 # Shared global logger – just import and use
 logger = logging.getLogger(APP_LOGGER_NAME)
@@ -0,0 +1,199 @@
+# core/message_buffer.py
+import json
+import uuid
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from psycopg import OperationalError
+
+from core.db_utils import get_conn
+from core.logger import logger
+from core.tracing import traced
+from app_config import (
+    MESSAGE_BUFFER_MAX_ROWS,
+    MESSAGE_BUFFER_FLUSH_SECONDS,
+    MESSAGE_BUFFER_MAX_PENDING,
+)
+
+
+# -------------------------------------------------------
+# Write-behind message persistence (MESSAGE_WRITE_BEHIND)
+# -------------------------------------------------------
+# add() queues the row and returns its message_id immediately. A
+# background thread writes queued rows in one transaction per batch:
+# one multi-row INSERT (unnest of arrays) plus one UPDATE per batch that
+# moves each touched conversation's updated_at to its newest message.
+# Batches go out when MESSAGE_BUFFER_MAX_ROWS are queued, when the oldest
+# row has waited MESSAGE_BUFFER_FLUSH_SECONDS, and at process exit.
+#
+# created_at is stamped when the message is queued (as timestamptz, which
+# the server converts exactly like NOW()), so ordering is unchanged.
+# Readers in this process call flush() first, so a request always sees
+# its own messages; other processes see them once the batch is written.
+# If the database is unavailable rows stay queued; past
+# MESSAGE_BUFFER_MAX_PENDING add() reports it to the caller. A batch that
+# fails for any other reason is retried row by row, so one bad row (a
+# deleted conversation, a NUL byte) can't hold back the rest: rows that
+# fail on their own are logged in full and dropped.
+# -------------------------------------------------------
+
+_INSERT_SQL = """
+    INSERT INTO messages (message_id, conversation_id, role, content, metadata, created_at)
+    SELECT * FROM unnest(%s::uuid[], %s::uuid[], %s::text[], %s::text[], %s::jsonb[], %s::timestamptz[])
+    ON CONFLICT (message_id) DO NOTHING   -- a batch retried after a commit whose ack was lost
+"""
+
+_TOUCH_SQL = """
+    UPDATE conversations c
+    SET updated_at = GREATEST(c.updated_at, t.ts)
+    FROM unnest(%s::uuid[], %s::timestamptz[]) AS t(conversation_id, ts)
+    WHERE c.conversation_id = t.conversation_id
+"""
+
+
+class MessageBufferFull(RuntimeError):
+    pass
+
+
+class MessageBuffer:
+    """
+    Process-wide queue of message rows, flushed in batches by a daemon thread.
+    """
+
+    def __init__(self, max_rows: int = MESSAGE_BUFFER_MAX_ROWS,
+                 flush_seconds: float = MESSAGE_BUFFER_FLUSH_SECONDS,
+                 max_pending: int = MESSAGE_BUFFER_MAX_PENDING):
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._rows: List[tuple] = []
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()   # one batch in flight at a time
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def add(self, conversation_id, role: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+            message_id: Optional[uuid.UUID] = None):
+        msg_id = message_id or uuid.uuid4()
+        if not isinstance(conversation_id, uuid.UUID):
+            conversation_id = uuid.UUID(str(conversation_id))
+        row = (msg_id, conversation_id, role, content, json.dumps(metadata or {}), datetime.now(timezone.utc))
+
+        with self._cond:
+            if len(self._rows) >= self.max_pending:
+                raise MessageBufferFull(f"{len(self._rows)} messages waiting to be written")
+            self._start()
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+        return msg_id
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far; returns the number of rows written.
+        Raises (and keeps the rows queued) if the database is unavailable.
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._rows, self._oldest = self._rows, [], None
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+                return len(batch)
+            except OperationalError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                logger.warning("Message buffer: batch of %d failed (%s); writing rows one by one", len(batch), e)
+            return self._write_each(batch)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Message buffer: %d messages lost at shutdown: %s", self.pending(), e)
+
+    # -- internals --
+    def _start(self) -> None:
+        # caller holds self._cond
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="message-buffer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _requeue(self, rows: List[tuple]) -> None:
+        with self._cond:
+            self._rows[:0] = rows
+            self._oldest = self._oldest or time.monotonic()
+
+    def _write_each(self, batch: List[tuple]) -> int:
+        written = 0
+        for i, row in enumerate(batch):
+            try:
+                self._write([row])
+                written += 1
+            except OperationalError:
+                self._requeue(batch[i:])
+                raise
+            except Exception as e:
+                logger.error("Message buffer: dropping message that can't be written (%s): %s", e,
+                             json.dumps({"message_id": str(row[0]), "conversation_id": str(row[1]),
+                                         "role": row[2], "content": row[3], "metadata": row[4],
+                                         "created_at": row[5].isoformat()}))
+        return written
+
+    def _due(self) -> bool:
+        return bool(self._rows) and (
+            len(self._rows) >= self.max_rows or time.monotonic() - self._oldest >= self.flush_seconds
+        )
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    wait = self.flush_seconds if self._oldest is None else \
+                        self.flush_seconds - (time.monotonic() - self._oldest)
+                    self._cond.wait(timeout=max(wait, 0.01))
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                backoff = 0.0
+            except Exception as e:
+                backoff = min(max(backoff * 2, 0.5), 30.0)
+                logger.error("Message buffer flush failed (%d queued, retry in %.1fs): %s",
+                             self.pending(), backoff, e)
+                with self._cond:
+                    self._cond.wait(timeout=backoff)
+
+    @traced("db.flush_messages", kind="db")
+    def _write(self, batch: List[tuple]) -> None:
+        columns = list(zip(*batch))
+        touched: Dict[Any, datetime] = {}
+        for row in batch:
+            touched[row[1]] = max(touched.get(row[1], row[5]), row[5])
+
+        with get_conn(transactional=True) as cur:
+            cur.execute(_INSERT_SQL, [list(c) for c in columns])
+            cur.execute(_TOUCH_SQL, (list(touched), list(touched.values())))
+        logger.debug("Message buffer: wrote %d messages for %d conversations", len(batch), len(touched))
+
+
+message_buffer = MessageBuffer()
@@ -0,0 +1,251 @@
+# core/risk_analytics.py
+"""
+Portfolio risk analytics over risk_items.
+
+Dashboards read two small rollup tables instead of scanning items:
+
+    risk_rollup_daily   (subject, day, type, impact) → count
+    risk_theme_monthly  (subject, month, theme) → count
+
+Every item is counted under two subjects, "user:<user_id>" and
+"org:<email domain>", so a dashboard for either reads at most a year of
+its own rollup rows no matter how many users an organization has. Users
+of public mail providers (app_config.PUBLIC_EMAIL_DOMAINS) have no
+organization and are counted under their user subject only.
+
+Both are maintained incrementally by core/risk_store.save_risk_items()
+in the same transaction that replaces a thread's items, so they are always
+consistent with risk_items. If they ever drift (manual edits, restored
+backups) rebuild them with:
+
+    python -m core.risk_analytics --rebuild
+"""
+import argparse
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from core.db_utils import get_conn
+from core.logger import logger, setup_logging
+from core.tracing import traced
+
+
+IMPACT_COLUMNS = ("High", "Medium", "Low", "Unspecified")
+TREND_BUCKETS = ("day", "week", "month")
+SCOPES = ("user", "org")
+
+# Fans each risk_items row out to its user and organization subjects
+_SUBJECTS = """
+    FROM risk_items i
+    CROSS JOIN LATERAL (VALUES ('user:' || i.user_id), ('org:' || i.organization)) s(subject)
+    WHERE s.subject IS NOT NULL
+"""
+
+
+def subject(scope: str, key) -> str:
+    return f"{scope}:{key}"
+
+
+# -------------------------------------------------------
+# INCREMENTAL MAINTENANCE (called inside save_risk_items' transaction)
+# -------------------------------------------------------
+def lock_subjects(cur, conversation_id, new_subjects) -> None:
+    """
+    Serialize rollup writers per subject: take a transaction advisory lock
+    for every subject the replacement touches (those of the conversation's
+    current items and `new_subjects`), in sorted order. Saves of different
+    conversations share the "org:" rows; the multi-row INSERT / UPDATE
+    statements below lock those rows in plan order, which differs between
+    transactions and deadlocks without this.
+    """
+    cur.execute(f"SELECT DISTINCT s.subject {_SUBJECTS} AND i.conversation_id = %s", (conversation_id,))
+    subjects = {r[0] for r in cur.fetchall()} | {s for s in new_subjects if s}
+    for s in sorted(subjects):
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (s,))
+
+
+def add_to_rollups(cur, conversation_id) -> None:
+    cur.execute(
+        f"""
+        INSERT INTO risk_rollup_daily (subject, day, risk_type, impact, item_count)
+        SELECT s.subject, i.created_at::date, i.risk_type, i.impact, count(*)
+        {_SUBJECTS} AND i.conversation_id = %s
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (subject, day, risk_type, impact)
+        DO UPDATE SET item_count = risk_rollup_daily.item_count + EXCLUDED.item_count
+        """,
+        (conversation_id,),
+    )
+    cur.execute(
+        f"""
+        INSERT INTO risk_theme_monthly (subject, month, theme_key, risk_type, sample_risk, item_count)
+        SELECT s.subject, date_trunc('month', i.created_at)::date, i.theme_key, min(i.risk_type), min(i.risk), count(*)
+        {_SUBJECTS} AND i.conversation_id = %s
+        GROUP BY 1, 2, 3
+        ON CONFLICT (subject, month, theme_key)
+        DO UPDATE SET item_count = risk_theme_monthly.item_count + EXCLUDED.item_count
+        """,
+        (conversation_id,),
+    )
+
+
+def remove_from_rollups(cur, conversation_id) -> None:
+    cur.execute(
+        f"""
+        UPDATE risk_rollup_daily r SET item_count = r.item_count - a.n
+        FROM (
+            SELECT s.subject, i.created_at::date AS day, i.risk_type, i.impact, count(*) AS n
+            {_SUBJECTS} AND i.conversation_id = %s
+            GROUP BY 1, 2, 3, 4
+        ) a
+        WHERE r.subject = a.subject AND r.day = a.day AND r.risk_type = a.risk_type AND r.impact = a.impact
+        """,
+        (conversation_id,),
+    )
+    cur.execute(
+        f"""
+        UPDATE risk_theme_monthly t SET item_count = t.item_count - a.n
+        FROM (
+            SELECT s.subject, date_trunc('month', i.created_at)::date AS month, i.theme_key, count(*) AS n
+            {_SUBJECTS} AND i.conversation_id = %s
+            GROUP BY 1, 2, 3
+        ) a
+        WHERE t.subject = a.subject AND t.month = a.month AND t.theme_key = a.theme_key
+        """,
+        (conversation_id,),
+    )
+
+
+def rebuild_rollups() -> None:
+    """
+    Recompute both rollups from risk_items (one transaction; readers see
+    either the old or the new numbers).
+    """
+    with get_conn(transactional=True) as cur:
+        cur.execute("DELETE FROM risk_rollup_daily")
+        cur.execute("DELETE FROM risk_theme_monthly")
+        cur.execute(
+            f"""
+            INSERT INTO risk_rollup_daily (subject, day, risk_type, impact, item_count)
+            SELECT s.subject, i.created_at::date, i.risk_type, i.impact, count(*)
+            {_SUBJECTS}
+            GROUP BY 1, 2, 3, 4
+            """
+        )
+        cur.execute(
+            f"""
+            INSERT INTO risk_theme_monthly (subject, month, theme_key, risk_type, sample_risk, item_count)
+            SELECT s.subject, date_trunc('month', i.created_at)::date, i.theme_key, min(i.risk_type), min(i.risk), count(*)
+            {_SUBJECTS}
+            GROUP BY 1, 2, 3
+            """
+        )
+    logger.info("Rebuilt risk rollups")
+
+
+# -------------------------------------------------------
+# DASHBOARD QUERIES
+# -------------------------------------------------------
+def _heatmap(cur, subject_key: str, since: date) -> Dict[str, Any]:
+    cur.execute(
+        """
+        SELECT risk_type, impact, sum(item_count)
+        FROM risk_rollup_daily
+        WHERE subject = %s AND day >= %s
+        GROUP BY 1, 2
+        HAVING sum(item_count) > 0
+        """,
+        (subject_key, since),
+    )
+    cells: Dict[str, Dict[str, int]] = {}
+    for risk_type, impact, n in cur.fetchall():
+        cells.setdefault(risk_type, dict.fromkeys(IMPACT_COLUMNS, 0))[impact] = int(n)
+
+    # Rows ordered by how many High items they hold, then by volume
+    ordered = sorted(cells.items(), key=lambda kv: (-kv[1]["High"], -sum(kv[1].values()), kv[0]))
+    return {
+        "impacts": list(IMPACT_COLUMNS),
+        "rows": [{"type": t, **counts, "total": sum(counts.values())} for t, counts in ordered],
+        "total": sum(sum(c.values()) for c in cells.values()),
+    }
+
+
+def _trend(cur, subject_key: str, since: date, bucket: str) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT date_trunc(%s, day)::date AS period, impact, sum(item_count)
+        FROM risk_rollup_daily
+        WHERE subject = %s AND day >= %s
+        GROUP BY 1, 2
+        ORDER BY 1
+        """,
+        (bucket, subject_key, since),
+    )
+    periods: Dict[date, Dict[str, int]] = {}
+    for period, impact, n in cur.fetchall():
+        periods.setdefault(period, dict.fromkeys(IMPACT_COLUMNS, 0))[impact] = int(n)
+
+    return [
+        {"period": p.isoformat(), **counts, "total": sum(counts.values())}
+        for p, counts in periods.items()
+    ]
+
+
+def _top_themes(cur, subject_key: str, since: date, limit: int) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT theme_key, min(sample_risk), min(risk_type), sum(item_count) AS n
+        FROM risk_theme_monthly
+        WHERE subject = %s AND month >= date_trunc('month', %s::date)::date
+        GROUP BY theme_key
+        HAVING sum(item_count) > 1
+        ORDER BY n DESC, theme_key
+        LIMIT %s
+        """,
+        (subject_key, since, limit),
+    )
+    return [
+        {"theme": sample, "type": risk_type, "count": int(n)}
+        for _, sample, risk_type, n in cur.fetchall()
+    ]
+
+
+@traced("db.portfolio_analytics", kind="db")
+def portfolio_analytics(scope: str, key, days: int = 365, bucket: str = "month", top: int = 10) -> Dict[str, Any]:
+    """
+    Heatmap (type × impact), trend per bucket and top recurring themes for
+    one user (scope="user", key=user_id) or one organization (scope="org",
+    key=email domain) over the last `days` days.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(TREND_BUCKETS)}")
+
+    subject_key = subject(scope, key)
+    since = date.today() - timedelta(days=max(1, days))
+
+    with get_conn() as cur:
+        return {
+            "scope": scope,
+            "key": str(key),
+            "since": since.isoformat(),
+            "heatmap": _heatmap(cur, subject_key, since),
+            "trend": _trend(cur, subject_key, since, bucket),
+            "top_themes": _top_themes(cur, subject_key, since, max(1, min(top, 100))),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk analytics rollup maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from risk_items")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.rebuild:
+        rebuild_rollups()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
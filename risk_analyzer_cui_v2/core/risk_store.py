@@ -0,0 +1,220 @@
+# core/risk_store.py
+import json
+import hashlib
+from typing import Optional, Dict, Any, List, Sequence
+
+from core.db_utils import get_conn
+from core.logger import logger
+from core.tracing import traced
+from core.risk_analytics import add_to_rollups, remove_from_rollups, lock_subjects, subject
+from core.blob_store import is_blob_ref, ref_digest
+from prompts.category_prompts import CATEGORY_FOCUS
+from utils.risk_merge import theme_key
+from app_config import PUBLIC_EMAIL_DOMAINS
+
+
+# -------------------------------------------------------
+# Normalized risk items (table: risk_items)
+# -------------------------------------------------------
+# Every analysis item of a finished run is written as one row, so
+# portfolio questions ("all High Compliance risks across my contracts")
+# are index lookups instead of checkpoint scans. A thread's rows are
+# replaced whenever it produces a new report.
+# -------------------------------------------------------
+
+IMPACTS = ("High", "Medium", "Low")
+MAX_PAGE_SIZE = 500
+
+
+def _type_key(value: str) -> str:
+    return "/".join(part.strip() for part in value.lower().split("/"))
+
+
+# "Legal", "compliance", "Compliance/Legal" → "Compliance / Legal"
+_CATEGORY_ALIASES = {
+    _type_key(word): category
+    for category in CATEGORY_FOCUS
+    for word in [category] + category.split("/")
+}
+
+
+def contract_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def normalize_type(value) -> str:
+    text = " ".join(str(value or "").split())
+    if not text:
+        return "General"
+    key = _type_key(text)
+    if key in _CATEGORY_ALIASES:
+        return _CATEGORY_ALIASES[key]
+    for part in key.split("/"):
+        if part in _CATEGORY_ALIASES:
+            return _CATEGORY_ALIASES[part]
+    return text[:100]
+
+
+def normalize_impact(value) -> str:
+    text = str(value or "").strip().capitalize()
+    return text if text in IMPACTS else "Unspecified"
+
+
+def organization_for(email_domain: Optional[str]) -> Optional[str]:
+    """Email domain as organization; None for public mail providers."""
+    if not email_domain or email_domain in PUBLIC_EMAIL_DOMAINS:
+        return None
+    return email_domain
+
+
+# -------------------------------------------------------
+# WRITE
+# -------------------------------------------------------
+@traced("db.save_risk_items", kind="db")
+def save_risk_items(thread_id: str, contract_text: str, report: Optional[Dict[str, Any]]) -> int:
+    """
+    Replace the thread's stored risk items with the items of `report`.
+    `contract_text` may be the text or its blob reference.
+    Returns the number of rows written (0 when the thread has no conversation).
+    """
+    items = [i for i in (report or {}).get("analysis") or [] if isinstance(i, dict) and i.get("risk")]
+    # A blob reference already carries the sha256 of the text (core/blob_store.py)
+    digest = ref_digest(contract_text) if is_blob_ref(contract_text) else contract_hash(contract_text)
+
+    with get_conn(transactional=True) as cur:
+        # Row lock: concurrent saves for a thread must run remove → replace → add
+        # one after another, or both subtract the same old items from the rollups
+        cur.execute(
+            """
+            SELECT c.conversation_id, c.user_id, lower(split_part(u.email, '@', 2))
+            FROM conversations c JOIN users u ON u.user_id = c.user_id
+            WHERE c.thread_id = %s
+            FOR UPDATE OF c
+            """,
+            (thread_id,),
+        )
+        row = cur.fetchone()
+        if not row:
+            return 0
+        conversation_id, user_id, email_domain = row
+        organization = organization_for(email_domain)
+
+        try:
+            # Rollups are kept in step inside the same transaction (core/risk_analytics.py)
+            lock_subjects(cur, conversation_id, [
+                subject("user", user_id),
+                subject("org", organization) if organization else None,
+            ])
+            remove_from_rollups(cur, conversation_id)
+            cur.execute("DELETE FROM risk_items WHERE conversation_id = %s", (conversation_id,))
+            if items:
+                cur.executemany(
+                    """
+                    INSERT INTO risk_items
+                        (conversation_id, user_id, organization, thread_id, contract_hash,
+                         risk_type, impact, risk, theme_key, payload)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    [
+                        (conversation_id, user_id, organization, thread_id, digest,
+                         normalize_type(i.get("type")), normalize_impact(i.get("impact")),
+                         str(i["risk"]), theme_key(i["risk"]), json.dumps(i, default=str))
+                        for i in items
+                    ],
+                )
+                add_to_rollups(cur, conversation_id)
+        except Exception as e:
+            logger.error("Risk items for conversation_id=%s (thread_id=%s) not stored; "
+                         "items and rollups unchanged: %s", conversation_id, thread_id, e)
+            raise
+
+    logger.info("Stored %d risk items for thread_id=%s", len(items), thread_id)
+    return len(items)
+
+
+def record_report(result: Dict[str, Any]) -> None:
+    """
+    Store the risk items of a finished graph run. Never raises: the
+    portfolio index must not fail the request that produced the report.
+    """
+    if not isinstance(result, dict) or result.get("status") != "success":
+        return
+    # The first input is the contract; later entries are clarifications / feedback
+    history = result.get("input_history") or [result.get("input_contract") or ""]
+    try:
+        save_risk_items(result.get("thread_id"), history[0], result.get("risk_analysis_report"))
+    except Exception as e:
+        logger.exception("Failed to store risk items for thread_id=%s: %s", result.get("thread_id"), e)
+
+
+# -------------------------------------------------------
+# QUERY
+# -------------------------------------------------------
+@traced("db.query_risk_items", kind="db")
+def query_risk_items(
+    user_id,
+    risk_types: Optional[Sequence[str]] = None,
+    impacts: Optional[Sequence[str]] = None,
+    contract_hash: Optional[str] = None,
+    conversation_id=None,
+    payload_contains: Optional[Dict[str, Any]] = None,
+    limit: int = 50,
+    cursor: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Newest-first page of a user's risk items. Keyset pagination: pass the
+    returned next_cursor back as `cursor`; every page is an index range scan
+    no matter how deep it is.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    where: List[str] = ["user_id = %s"]
+    params: List[Any] = [user_id]
+
+    if risk_types:
+        where.append("risk_type = ANY(%s)")
+        params.append([normalize_type(t) for t in risk_types])
+    if impacts:
+        where.append("impact = ANY(%s)")
+        params.append([normalize_impact(i) for i in impacts])
+    if contract_hash:
+        where.append("contract_hash = %s")
+        params.append(contract_hash)
+    if conversation_id:
+        where.append("conversation_id = %s")
+        params.append(conversation_id)
+    if payload_contains:
+        where.append("payload @> %s::jsonb")
+        params.append(json.dumps(payload_contains))
+    if cursor is not None:
+        where.append("risk_item_id < %s")
+        params.append(int(cursor))
+
+    sql = f"""
+        SELECT risk_item_id, conversation_id, thread_id, contract_hash, risk_type, impact, payload, created_at
+        FROM risk_items
+        WHERE {' AND '.join(where)}
+        ORDER BY risk_item_id DESC
+        LIMIT %s
+    """
+    params.append(limit + 1)
+
+    with get_conn() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [
+        {
+            "risk_item_id": r[0],
+            "conversation_id": r[1],
+            "thread_id": r[2],
+            "contract_hash": r[3],
+            "type": r[4],
+            "impact": r[5],
+            "item": r[6],
+            "created_at": r[7],
+        }
+        for r in rows
+    ]
+    return {"items": items, "next_cursor": rows[-1][0] if has_more else None}
@@ -0,0 +1,283 @@
+# core/tracing.py
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+from langgraph.errors import GraphBubbleUp
+
+from core.logger import logger
+from app_config import TRACE_ENABLED, TRACE_BUFFER_SIZE
+
+
+# -------------------------------------------------------
+# Span-style tracing for graph runs
+# -------------------------------------------------------
+# A trace covers one graph execution for one thread_id. Spans are
+# recorded for every node, LLM call, DB helper and checkpoint read/write,
+# tagged with thread_id and refinement_count, and kept in a bounded
+# in-memory ring buffer (oldest spans are dropped first).
+# -------------------------------------------------------
+
+SERVICE_NAME = "risk-analyzer"
+
+_trace: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("trace", default=None)
+_parent_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("parent_span_id", default=None)
+_refinement_count: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("refinement_count", default=None)
+
+_spans: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_spans_lock = threading.Lock()
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def _record(span: Dict[str, Any]) -> None:
+    with _spans_lock:
+        _spans.append(span)
+
+
+# -------------------------------------------------------
+# CONTEXT
+# -------------------------------------------------------
+@contextmanager
+def trace_context(thread_id: Optional[str], name: str = "graph.run"):
+    """
+    Open a trace for one graph run. Nested calls for the same thread_id
+    (e.g. run() → arun() → ainvoke_graph()) join the outer trace.
+    """
+    current = _trace.get()
+    if not TRACE_ENABLED or (current and current["thread_id"] == thread_id):
+        yield
+        return
+
+    token = _trace.set({"trace_id": _new_id(16), "thread_id": thread_id})
+    parent_token = _parent_span_id.set(None)
+    try:
+        with span(name, kind="run"):
+            yield
+    finally:
+        _parent_span_id.reset(parent_token)
+        _trace.reset(token)
+
+
+@contextmanager
+def refinement_scope(refinement_count: Optional[int]):
+    """Tag every span opened inside (LLM, DB, checkpoint) with the node's refinement_count."""
+    token = _refinement_count.set(refinement_count)
+    try:
+        yield
+    finally:
+        _refinement_count.reset(token)
+
+
+# -------------------------------------------------------
+# SPANS
+# -------------------------------------------------------
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """
+    Record one span. Outside of a trace_context() this is a no-op,
+    so instrumented helpers cost nothing when called from elsewhere.
+    """
+    trace = _trace.get()
+    if not TRACE_ENABLED or trace is None:
+        yield None
+        return
+
+    span_id = _new_id(8)
+    record = {
+        "trace_id": trace["trace_id"],
+        "span_id": span_id,
+        "parent_span_id": _parent_span_id.get(),
+        "name": name,
+        "kind": kind,
+        "thread_id": trace["thread_id"],
+        "refinement_count": _refinement_count.get(),
+        "attributes": dict(attributes),
+        "start_ns": time.time_ns(),
+        "end_ns": None,
+        "duration_ms": None,
+        "status": "ok",
+        "error": None,
+    }
+
+    token = _parent_span_id.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield record
+    except GraphBubbleUp:
+        # interrupt() / Command bubbling is control flow, not a failure
+        record["status"] = "interrupted"
+        raise
+    except BaseException as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _parent_span_id.reset(token)
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        record["end_ns"] = record["start_ns"] + int(record["duration_ms"] * 1_000_000)
+        _record(record)
+
+
+def traced(name: str, kind: str = "internal"):
+    """
+    Decorator form of span() for sync and async functions.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind=kind):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, kind=kind):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# -------------------------------------------------------
+# CHECKPOINTER INSTRUMENTATION
+# -------------------------------------------------------
+def _checkpoint_attrs(config) -> Dict[str, Any]:
+    configurable = (config or {}).get("configurable", {})
+    return {"checkpoint_id": configurable.get("checkpoint_id")}
+
+
+class TracedCheckpointerMixin:
+    """
+    Mix into a LangGraph checkpoint saver (before the saver class) to record
+    a span for every checkpoint read and write, sync or async.
+    """
+
+    def get_tuple(self, config):
+        with span("checkpoint.get_tuple", kind="checkpoint", **_checkpoint_attrs(config)):
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with span("checkpoint.put", kind="checkpoint", channels=len(new_versions or {})):
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with span("checkpoint.put_writes", kind="checkpoint", writes=len(writes or [])):
+            return super().put_writes(config, writes, task_id, task_path)
+
+    async def aget_tuple(self, config):
+        with span("checkpoint.aget_tuple", kind="checkpoint", **_checkpoint_attrs(config)):
+            return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with span("checkpoint.aput", kind="checkpoint", channels=len(new_versions or {})):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with span("checkpoint.aput_writes", kind="checkpoint", writes=len(writes or [])):
+            return await super().aput_writes(config, writes, task_id, task_path)
+
+
+# -------------------------------------------------------
+# READ / EXPORT
+# -------------------------------------------------------
+def get_spans(thread_id: str) -> List[Dict[str, Any]]:
+    with _spans_lock:
+        spans = [dict(s) for s in _spans if s["thread_id"] == thread_id]
+    spans.sort(key=lambda s: s["start_ns"])
+    return spans
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Where did the time go: totals per kind and per span name (milliseconds).
+    Totals of nested kinds overlap (an LLM span sits inside its node span).
+    """
+    by_kind: Dict[str, float] = {}
+    by_name: Dict[str, Dict[str, float]] = {}
+
+    for s in spans:
+        ms = s["duration_ms"] or 0.0
+        by_kind[s["kind"]] = round(by_kind.get(s["kind"], 0.0) + ms, 3)
+        entry = by_name.setdefault(s["name"], {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + ms, 3)
+
+    runs = [s for s in spans if s["kind"] == "run"]
+    return {
+        "runs": len(runs),
+        "wall_ms": round(sum(s["duration_ms"] or 0.0 for s in runs), 3),
+        "by_kind_ms": by_kind,
+        "by_name": dict(sorted(by_name.items(), key=lambda kv: -kv[1]["total_ms"])),
+    }
+
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert spans to an OTLP/JSON ExportTraceServiceRequest document.
+    """
+    otlp_spans = []
+    for s in spans:
+        attrs = {"thread_id": s["thread_id"], "span.kind": s["kind"]}
+        if s["refinement_count"] is not None:
+            attrs["refinement_count"] = s["refinement_count"]
+        attrs.update({k: v for k, v in s["attributes"].items() if v is not None})
+
+        otlp_span = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": 3 if s["kind"] in ("llm", "db", "checkpoint") else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"] or s["start_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+            "status": {"code": 2, "message": s["error"]} if s["status"] == "error" else {"code": 1},
+        }
+        if s["parent_span_id"]:
+            otlp_span["parentSpanId"] = s["parent_span_id"]
+        otlp_spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+def export_otlp(path: str, thread_id: str) -> int:
+    """
+    Append the thread's spans to `path` as one OTLP/JSON document per line
+    (the layout used by the OpenTelemetry Collector file exporter).
+    Returns the number of spans written.
+    """
+    spans = get_spans(thread_id)
+    if not spans:
+        return 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(to_otlp(spans)) + "\n")
+
+    logger.info("Exported %d spans for thread_id=%s to %s", len(spans), thread_id, path)
+    return len(spans)
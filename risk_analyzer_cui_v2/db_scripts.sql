@@ -30,13 +30,22 @@ CREATE TABLE conversations (
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
     is_archived BOOLEAN DEFAULT FALSE,          -- optional archive support
+    search_vector TSVECTOR GENERATED ALWAYS AS (  -- full-text search (core/conversation_search.py)
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B')
+    ) STORED,
     CONSTRAINT fk_conversation_user
         FOREIGN KEY (user_id) REFERENCES users(user_id)
         ON DELETE CASCADE
 );
 
-CREATE INDEX idx_conversations_user ON conversations(user_id);
+-- Keyset pages of a user's conversations, newest first (db_utils.list_conversations_for_user).
+-- Also serves plain user_id lookups. Existing databases:
+--   CREATE INDEX CONCURRENTLY idx_conversations_user_updated ON conversations(user_id, updated_at DESC, conversation_id DESC);
+--   DROP INDEX CONCURRENTLY idx_conversations_user;
+CREATE INDEX idx_conversations_user_updated ON conversations(user_id, updated_at DESC, conversation_id DESC);
 CREATE INDEX idx_conversations_thread ON conversations(thread_id);
+CREATE INDEX idx_conversations_search ON conversations USING GIN (search_vector);
 
 
 -- ===============================================================
@@ -50,14 +59,144 @@ CREATE TABLE messages (
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}'::jsonb,         -- agent metadata, scores, flags, LLM tokens, etc.
     created_at TIMESTAMP DEFAULT NOW(),
+    -- Full-text search; the first 250k characters keep the vector well under its 1 MB limit
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', left(content, 250000))) STORED,
 
     CONSTRAINT fk_message_conversation
         FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
         ON DELETE CASCADE
 );
 
-CREATE INDEX idx_messages_conversation ON messages(conversation_id);
+-- Keyset pages of a conversation's messages, oldest first (db_utils.get_conversation_messages).
+-- Existing databases:
+--   CREATE INDEX CONCURRENTLY idx_messages_conversation_created ON messages(conversation_id, created_at, message_id);
+--   DROP INDEX CONCURRENTLY idx_messages_conversation;
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at, message_id);
 CREATE INDEX idx_messages_created_at   ON messages(created_at);
+-- Existing databases: ALTER TABLE messages / conversations ADD COLUMN search_vector ... (as above;
+-- rewrites the table), ALTER TABLE contract_blobs ADD COLUMN search_vector TSVECTOR (older blobs
+-- stay unsearchable until backfilled from their text), then the indexes CONCURRENTLY.
+CREATE INDEX idx_messages_search ON messages USING GIN (search_vector);
+-- Messages that hold a contract by reference ("blob:sha256:<hex>...") → contract_blobs.blob_hash
+CREATE INDEX idx_messages_blob_ref ON messages (left(content, 76)) WHERE content LIKE 'blob:sha256:%';
+
+
+-- ===============================================================
+-- CONTRACT BLOBS (content-addressed contract texts, see core/blob_store.py)
+-- ===============================================================
+-- State, checkpoints and messages reference large contracts as
+-- "blob:sha256:<blob_hash>" instead of repeating the text.
+
+CREATE TABLE contract_blobs (
+    blob_hash CHAR(64) PRIMARY KEY,             -- sha256 of the UTF-8 text (= risk_items.contract_hash)
+    codec VARCHAR(10) NOT NULL DEFAULT 'zstd' CHECK (codec IN ('zstd', 'none')),
+    size_bytes INT NOT NULL,                    -- uncompressed size
+    data BYTEA NOT NULL,
+    search_vector TSVECTOR,                     -- of the text (data is compressed), set by put_text()
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_contract_blobs_search ON contract_blobs USING GIN (search_vector);
+
+
+-- ===============================================================
+-- ANALYSIS JOBS TABLE (durable work queue, see core/job_queue.py)
+-- ===============================================================
+
+CREATE TABLE analysis_jobs (
+    job_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('start', 'resume')),
+    thread_id VARCHAR(255) NOT NULL,            -- LangGraph thread the job runs on
+    user_id UUID,
+    payload JSONB NOT NULL,                     -- request payload needed to (re)run the job
+    status VARCHAR(20) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'completed', 'awaiting_human', 'failed', 'dead')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    available_at TIMESTAMP NOT NULL DEFAULT NOW(), -- visibility: not claimable before this
+    locked_by VARCHAR(255),                     -- worker id holding the lease
+    lease_token UUID,                           -- guards every update after claim
+    lease_expires_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    result JSONB,
+    errors JSONB DEFAULT '[]'::jsonb,
+    version BIGINT NOT NULL DEFAULT 0,          -- bumped on every change (long-poll / SSE)
+    created_at TIMESTAMP DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW(),
+
+    CONSTRAINT fk_analysis_job_user
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+        ON DELETE CASCADE
+);
+
+-- Partial indexes keep claim / reap scans proportional to the live queue, not history
+CREATE INDEX idx_analysis_jobs_ready ON analysis_jobs(available_at) WHERE status = 'queued';
+CREATE INDEX idx_analysis_jobs_lease ON analysis_jobs(lease_expires_at) WHERE status = 'running';
+CREATE INDEX idx_analysis_jobs_thread ON analysis_jobs(thread_id);
+
+
+-- ===============================================================
+-- RISK ITEMS TABLE (normalized report items, see core/risk_store.py)
+-- ===============================================================
+
+CREATE TABLE risk_items (
+    risk_item_id BIGSERIAL PRIMARY KEY,         -- monotonic: newest-first order + keyset cursor
+    conversation_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    organization VARCHAR(255),                  -- email domain of the user; NULL for public mail providers
+    thread_id VARCHAR(255) NOT NULL,
+    contract_hash CHAR(64) NOT NULL,            -- sha256 of the analyzed contract text
+    risk_type VARCHAR(100) NOT NULL,            -- canonical category (Financial, Compliance / Legal, ...)
+    impact VARCHAR(20) NOT NULL CHECK (impact IN ('High', 'Medium', 'Low', 'Unspecified')),
+    risk TEXT NOT NULL,
+    theme_key VARCHAR(200) NOT NULL,            -- order-insensitive key for recurring themes
+    payload JSONB NOT NULL,                     -- the full analysis item as returned by the analyzer
+    created_at TIMESTAMP DEFAULT NOW(),
+
+    CONSTRAINT fk_risk_item_conversation
+        FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_risk_item_user
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+        ON DELETE CASCADE
+);
+
+-- Portfolio filters end in risk_item_id so each page is one ordered index range scan
+CREATE INDEX idx_risk_items_user ON risk_items(user_id, risk_item_id DESC);
+CREATE INDEX idx_risk_items_user_type_impact ON risk_items(user_id, risk_type, impact, risk_item_id DESC);
+CREATE INDEX idx_risk_items_user_impact ON risk_items(user_id, impact, risk_item_id DESC);
+CREATE INDEX idx_risk_items_conversation ON risk_items(conversation_id);
+CREATE INDEX idx_risk_items_contract ON risk_items(contract_hash);
+-- Ad-hoc containment filters on the item itself (payload @> '{...}')
+CREATE INDEX idx_risk_items_payload ON risk_items USING GIN (payload jsonb_path_ops);
+
+
+-- ===============================================================
+-- RISK ROLLUPS (dashboard aggregates, see core/risk_analytics.py)
+-- ===============================================================
+-- Maintained incrementally in the same transaction as risk_items.
+-- Each item counts once for its user and once for its organization.
+
+CREATE TABLE risk_rollup_daily (
+    subject VARCHAR(300) NOT NULL,              -- 'user:<user_id>' or 'org:<email domain>'
+    day DATE NOT NULL,
+    risk_type VARCHAR(100) NOT NULL,
+    impact VARCHAR(20) NOT NULL,
+    item_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (subject, day, risk_type, impact)
+);
+
+CREATE TABLE risk_theme_monthly (
+    subject VARCHAR(300) NOT NULL,
+    month DATE NOT NULL,
+    theme_key VARCHAR(200) NOT NULL,
+    risk_type VARCHAR(100) NOT NULL,            -- display only: one category the theme was raised under
+    sample_risk TEXT NOT NULL,                  -- display only: one original wording
+    item_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (subject, month, theme_key)
+);
 
 
 -- ===============================================================
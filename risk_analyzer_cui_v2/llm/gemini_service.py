@@ -1,6 +1,7 @@
 # llm/gemini_service.py
 import os
 from google import genai
+from google.genai import types
 from core.logger import logger
 from app_config import GEMINI_API_KEY
 
@@ -22,15 +23,21 @@ def _preview(text: str, limit: int = 200) -> str:
     return text if len(text) <= limit else text[:limit] + "..."
 
 
-def call_gemini_llm(prompt: str) -> str:
+def call_gemini_llm(prompt: str, timeout: float = None) -> str:
     logger.info("call_gemini_llm invoked")
     logger.debug("Prompt preview: %s", _preview(prompt))
 
     try:
         logger.info("Sending request to Gemini model: gemini-2.0-flash")
+        config = None
+        if timeout:
+            # HttpOptions.timeout is in milliseconds
+            config = types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
         response = client.models.generate_content(
             model="gemini-2.0-flash",  # gemini-2.0-flash, gemini-2.5-flash-lite
             contents=prompt,
+            config=config,
         )
 
         # Log what response object contains
@@ -55,7 +62,7 @@ def call_gemini_llm(prompt: str) -> str:
 
         try:
             from llm.llama_service import call_llama_model
-            return call_llama_model(prompt)
+            return call_llama_model(prompt, timeout=timeout)
         except Exception:
             logger.exception("Fallback LLaMA model also failed")
             raise
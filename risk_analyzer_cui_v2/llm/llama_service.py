@@ -15,7 +15,7 @@ def _preview(text: str, limit: int = 200) -> str:
     return text if len(text) <= limit else text[:limit] + "..."
 
 
-def call_llama_model(prompt: str):
+def call_llama_model(prompt: str, timeout: float = None):
     logger.info("call_llama_model invoked")
     logger.debug("Prompt preview: %s", _preview(prompt))
 
@@ -40,7 +40,7 @@ def call_llama_model(prompt: str):
     logger.info("Sending request to LLaMA API endpoint: %s", LLAMA_URL)
 
     try:
-        response = requests.post(LLAMA_URL, json=payload, headers=headers)
+        response = requests.post(LLAMA_URL, json=payload, headers=headers, timeout=timeout)
 
         logger.debug("LLaMA API HTTP status=%s", response.status_code)
 
@@ -1,7 +1,13 @@
 # llm_manager.py
 
-from app_config import LLM_PROVIDER
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app_config import LLM_PROVIDER, LLM_THREAD_POOL_SIZE
 from core.logger import logger
+from core.tracing import span
 
 # Import all providers (safe even if some fail)
 try:
@@ -19,13 +25,38 @@ try:
 except Exception:
     call_llama_model = None
 
+# Blocking provider calls from acall_llm() run here. The event loop's default
+# executor is sized by CPU count, which is far too small for I/O-bound fan-out.
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_THREAD_POOL_SIZE, thread_name_prefix="llm-call")
+
 
-def call_llm(prompt: str) -> str:
+class LLMUnavailableError(TimeoutError):
+    """
+    The provider gave no answer. Providers log and swallow their own errors
+    (including HTTP timeouts) and return None, so this is all callers see;
+    it is a TimeoutError so deadline fallbacks treat it like one.
+    """
+
+
+def call_llm(prompt: str, timeout: Optional[float] = None) -> str:
     """
     Calls the correct LLM based on app_config.LLM_PROVIDER.
     Options: "gemini", "openai", "llama".
+
+    timeout: per-call limit in seconds (derived from the request deadline).
+    Raises LLMUnavailableError when the provider returns nothing.
     """
+    with span("llm.call", kind="llm", provider=LLM_PROVIDER, timeout=timeout,
+              prompt_chars=len(prompt) if isinstance(prompt, str) else 0) as s:
+        result = _dispatch_llm(prompt, timeout)
+        if s is not None:
+            s["attributes"]["response_chars"] = len(result) if isinstance(result, str) else 0
+        if not isinstance(result, str) or not result.strip():
+            raise LLMUnavailableError(f"LLM provider '{LLM_PROVIDER}' returned no response (timeout={timeout})")
+        return result
 
+
+def _dispatch_llm(prompt: str, timeout: Optional[float] = None) -> str:
     logger.info("call_llm invoked using provider=%s", LLM_PROVIDER)
 
     provider = (LLM_PROVIDER or "").lower()
@@ -33,21 +64,37 @@ def call_llm(prompt: str) -> str:
     if provider == "gemini":
         if call_gemini_llm:
             logger.info("Using Gemini LLM")
-            return call_gemini_llm(prompt)
+            return call_gemini_llm(prompt, timeout=timeout)
         logger.error("Gemini provider selected but not available")
 
     elif provider == "openai":
         if call_openai_llm:
             logger.info("Using OpenAI LLM")
-            return call_openai_llm(prompt)
+            return call_openai_llm(prompt, timeout=timeout)
         logger.error("OpenAI provider selected but not available")
 
     elif provider == "llama":
         if call_llama_model:
             logger.info("Using LLaMA (RapidAPI) model")
-            return call_llama_model(prompt)
+            return call_llama_model(prompt, timeout=timeout)
         logger.error("LLaMA provider selected but not available")
 
     # Fallback
     logger.error("LLM_PROVIDER '%s' is invalid or unavailable", LLM_PROVIDER)
     return None
+
+
+async def acall_llm(prompt: str, timeout: Optional[float] = None) -> str:
+    """
+    Async counterpart of call_llm().
+
+    The provider clients are blocking, so the call runs in a worker thread
+    and the event loop stays free for other graph runs. The provider gets
+    the timeout too; wait_for() is the backstop if it doesn't honour it.
+    Raises TimeoutError (LLMUnavailableError or the backstop's) when no
+    response arrives.
+    """
+    backstop = timeout + 1 if timeout else None
+    ctx = contextvars.copy_context()  # keep the trace context, like asyncio.to_thread()
+    call = asyncio.get_running_loop().run_in_executor(_llm_executor, ctx.run, call_llm, prompt, timeout)
+    return await asyncio.wait_for(call, backstop)
@@ -23,7 +23,7 @@ def _preview(text: str, limit: int = 200) -> str:
     return text if len(text) <= limit else text[:limit] + "..."
 
 
-def call_openai_llm(prompt: str):
+def call_openai_llm(prompt: str, timeout: float = None):
     logger.info("call_openai_llm invoked")
     logger.debug("Prompt preview: %s", _preview(prompt))
 
@@ -34,9 +34,12 @@ def call_openai_llm(prompt: str):
     try:
         logger.info("Sending request to OpenAI model: gpt-4.1")
 
+        # Only override the client's default timeout when a budget was given
+        extra = {"timeout": timeout} if timeout else {}
         response = client.responses.create(
             model="gpt-4.1",
-            input=prompt
+            input=prompt,
+            **extra
         )
 
         # Log the structure of response
@@ -1,33 +1,74 @@
 # main.py
+import json
 import uuid
 import time
-from typing import Optional
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from typing import Optional, Tuple
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, url_for, g
 from flask_cors import CORS
 from core.logger import logger, setup_logging
+from core.json_provider import OrjsonProvider
+from core.http_compression import compress_response
 
 # DB helpers
-from core.db_utils import (
-    get_or_create_user,
-    get_conversation_by_thread,
-    create_conversation,
-    add_message,
-    get_conversation_messages,
-    list_conversations_for_user,
-)
+from core.db_utils import get_or_create_user
+from core import conversation_repo
 
 # Agents
-from agents.orchestrator_agent import OrchestratorAgent
+from agents.orchestrator_agent import OrchestratorAgent, DURABILITY_MODES
 from agents.agent_state import AgentState
+from agents.summarizer_agent import SUMMARY_MODES
+from agents.risk_analysis_agent import ANALYSIS_MODES
 
 # LangGraph Command & checkpointer
 from langgraph.types import Command
 from core.database import checkpointer
 
+# Background jobs
+from core.jobs import JobManager, TERMINAL_STATUSES
+from core.job_queue import enqueue_job, PostgresJobStore
+from app_config import JOB_WORKERS, JOB_RESULT_TTL_SECONDS, JOB_MODE_DEFAULT, JOB_BACKEND
+
+# Tracing
+from core.tracing import get_spans, summarize_spans, to_otlp, export_otlp
+from app_config import TRACE_EXPORT_PATH
+
+# Latency budget
+from core.deadline import resolve_deadline
+from app_config import DEFAULT_DEADLINE_SECONDS, JOB_DEADLINE_SECONDS
+
+# Multi-contract comparison
+from core.async_runtime import run_sync
+from core.comparison import compare_contracts
+from utils.docs_reader import process_file, FileReadError
+from app_config import COMPARE_MAX_CONTRACTS, COMPARE_DEADLINE_SECONDS
+
+# Portfolio risk items
+from core.risk_store import query_risk_items
+from core.blob_store import externalize, get_text, BLOB_REF_PREFIX
+from core.risk_analytics import portfolio_analytics
+
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.json = OrjsonProvider(app)
+app.after_request(compress_response)
 CORS(app)
 setup_logging()
 
+jobs = JobManager(max_workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL_SECONDS)
+# Where /jobs/<id> reads from: in-process jobs, or the durable queue run by worker.py
+job_store = PostgresJobStore() if JOB_BACKEND == "postgres" else jobs
+
+
+@app.before_request
+def _open_conversation_scope():
+    g.conversation_scope = conversation_repo.open_scope()
+
+
+@app.teardown_request
+def _close_conversation_scope(exc):
+    token = g.pop("conversation_scope", None)
+    if token is not None:
+        conversation_repo.close_scope(token)
+
 
 def _preview(text, limit=200):
     if not isinstance(text, str):
@@ -35,6 +76,97 @@ def _preview(text, limit=200):
     return text if len(text) <= limit else text[:limit] + "..."
 
 
+def _wants_job(payload) -> bool:
+    """
+    Async job mode: payload {"async": true} or ?async=1.
+    """
+    flag = payload.get("async")
+    if flag is None:
+        flag = request.args.get("async")
+    if flag is None:
+        return JOB_MODE_DEFAULT
+    if isinstance(flag, str):
+        return flag.lower() in ("1", "true", "yes")
+    return bool(flag)
+
+
+def _deadline_at(payload, as_job: bool):
+    """
+    Absolute deadline for this run: payload "deadline_seconds" (0 disables),
+    else the interactive or background default.
+    """
+    default = JOB_DEADLINE_SECONDS if as_job else DEFAULT_DEADLINE_SECONDS
+    return resolve_deadline(payload.get("deadline_seconds"), default)
+
+
+RUN_OPTIONS = {"summary_mode": SUMMARY_MODES, "analysis_mode": ANALYSIS_MODES, "durability": DURABILITY_MODES}
+
+
+def _run_options(payload) -> dict:
+    """
+    Per-request pipeline options stored on AgentState. Raises ValueError
+    for unknown values.
+    """
+    options = {}
+    for key, allowed in RUN_OPTIONS.items():
+        value = payload.get(key)
+        if value is None:
+            continue
+        if value not in allowed:
+            raise ValueError(f"{key} must be one of {', '.join(allowed)}")
+        options[key] = value
+    return options
+
+
+# Graph state fields returned by /chat/start, /chat/resume and job results. Clients
+# pick others with "fields" (payload list, or ?fields=a,b); "*" returns the whole state.
+RESPONSE_FIELDS = ("status", "message", "errors", "summary", "risk_analysis_report", "quality_score",
+                   "thread_id", "__interrupt__")
+_STATE_FIELDS = frozenset(AgentState.model_fields) | {"__interrupt__"}
+
+
+def _response_fields(payload=None) -> Optional[Tuple[str, ...]]:
+    """
+    Requested result fields; None means the whole state. Raises ValueError
+    for unknown fields.
+    """
+    raw = request.args.get("fields") or (payload or {}).get("fields")
+    if not raw:
+        return RESPONSE_FIELDS
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        raise ValueError("fields must be a list or a comma-separated string")
+
+    fields = tuple(f.strip() for f in raw if isinstance(f, str) and f.strip())
+    if "*" in fields:
+        return None
+    unknown = sorted(set(fields) - _STATE_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _project(result, fields: Optional[Tuple[str, ...]]):
+    if fields is None or not isinstance(result, dict):
+        return result
+    return {k: result[k] for k in fields if k in result}
+
+
+def _job_accepted(job_id: str, thread_id: str, fields: Optional[Tuple[str, ...]] = RESPONSE_FIELDS):
+    # Polling / event URLs carry a non-default field selection along
+    query = {} if fields == RESPONSE_FIELDS else {"fields": "*" if fields is None else ",".join(fields)}
+    status_url = url_for("get_job", job_id=job_id, **query)
+    body = {
+        "status": "queued",
+        "job_id": job_id,
+        "thread_id": thread_id,
+        "status_url": status_url,
+        "events_url": url_for("job_events", job_id=job_id, **query),
+    }
+    return jsonify(body), 202, {"Location": status_url}
+
+
 @app.route("/", methods=["GET"])
 def index():
     logger.info("GET / — Home page loaded")
@@ -59,25 +191,52 @@ def start_chat():
     if not user_email or not message.strip():
         return jsonify({"status": "failed", "errors": ["user_email and message are required"]}), 400
 
+    try:
+        options = _run_options(payload)
+        fields = _response_fields(payload)
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
+
     try:
         user_id = get_or_create_user(user_email)
+        as_job = _wants_job(payload)
+
+        # Large contracts are stored once; state, checkpoints, messages and job payloads keep the reference
+        contract = externalize(message.strip())
 
         # INITIAL AgentState with first message
         state = AgentState(
             user_id=str(user_id),
-            input_contract=message.strip(),
-            input_history=[message.strip()],  # 🔥 Store first message
-            thread_id=thread_id
+            input_contract=contract,
+            input_history=[contract],  # 🔥 Store first message
+            thread_id=thread_id,
+            deadline_at=None if as_job else _deadline_at(payload, as_job=False),
+            **options
         )
 
-        conv = get_conversation_by_thread(thread_id)
-        if not conv:
-            create_conversation(user_id, thread_id)
+        conversation_repo.get_or_create(user_id, thread_id)
 
         agent = OrchestratorAgent(state)
+
+        if as_job:
+            # The budget starts when a worker picks the job up, not while it sits in the queue
+            if JOB_BACKEND == "postgres":
+                job_payload = {
+                    "message": contract,
+                    "deadline_seconds": payload.get("deadline_seconds"),
+                    "options": options,
+                }
+                job_id = enqueue_job("start", thread_id, job_payload, user_id=user_id)
+            else:
+                def run_job():
+                    agent.state.deadline_at = _deadline_at(payload, as_job=True)
+                    return agent.run()
+                job_id = jobs.submit(run_job, thread_id=thread_id, kind="start")
+            return _job_accepted(job_id, thread_id, fields)
+
         result = agent.run()
 
-        return jsonify(result), 200
+        return jsonify(_project(result, fields)), 200
 
     except Exception as e:
         logger.exception("Error in /chat/start: %s", e)
@@ -102,40 +261,47 @@ def resume_chat():
     if not thread_id:
         return jsonify({"status": "failed", "message": "'thread_id' is required"}), 400
 
+    try:
+        options = _run_options(payload)
+        fields = _response_fields(payload)
+    except ValueError as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+
     try:
         logger.info("Resuming chat for thread_id=%s", thread_id)
 
-        # 🔥 Restore the previous checkpoint state
-        saved_state = checkpointer.get_tuple({"configurable": {"thread_id": thread_id}})
-        if not saved_state:
+        as_job = _wants_job(payload)
+
+        # Durable queue: the worker restores the checkpoint and applies feedback
+        if as_job and JOB_BACKEND == "postgres":
+            job_payload = {
+                "decision": feedback,
+                "deadline_seconds": payload.get("deadline_seconds"),
+                "options": options,
+            }
+            job_id = enqueue_job("resume", thread_id, job_payload)
+            return _job_accepted(job_id, thread_id, fields)
+
+        # 🔥 Restore the previous checkpoint state and apply feedback
+        agent = OrchestratorAgent.from_checkpoint(thread_id, feedback)
+        if agent is None:
             return jsonify({"status": "failed", "message": "No saved state found"}), 404
+        state = agent.state
+        for key, value in options.items():
+            setattr(state, key, value)
 
-        restored = saved_state.checkpoint["channel_values"]
-        logger.debug("Restored state from checkpoint: %s", restored)
-
-        # 🔥 Convert restored state to AgentState
-        state = AgentState(**restored)
-
-        # 🔥 Append new human feedback
-        if feedback:
-            add_message(
-                get_conversation_by_thread(thread_id)["conversation_id"],
-                "user",
-                feedback
-            )
-            state.input_history.append(feedback)
-            state.input_contract = "\n".join(state.input_history)
-            state.human_input = False       # feedback consumed
-            state.message = None            # clear prior prompt
-
-        # Restart the agent from validation
-        agent = OrchestratorAgent(state)
+        if as_job:
+            def run_job():
+                state.deadline_at = _deadline_at(payload, as_job=True)
+                return agent.invoke_graph(state.model_dump())
+            job_id = jobs.submit(run_job, thread_id=thread_id, kind="resume")
+            return _job_accepted(job_id, thread_id, fields)
+
+        # Every turn gets a fresh budget (the restored one belongs to the previous request)
+        state.deadline_at = _deadline_at(payload, as_job=False)
 
         logger.info("Restarting full pipeline after human feedback")
-        result = agent.graph.invoke(
-            state.model_dump(),
-            config={"configurable": {"thread_id": thread_id}}
-        )
+        result = agent.invoke_graph(state.model_dump())
 
         # Check if graph wants more human input
         if "__interrupt__" in result:
@@ -143,7 +309,7 @@ def resume_chat():
             prompt = interrupt_items[0].value if interrupt_items else "Human input required"
 
 
-            return jsonify(result), 200
+            return jsonify(_project(result, fields)), 200
 
             # return jsonify({
             #     "status": "awaiting_human",
@@ -152,7 +318,7 @@ def resume_chat():
             # }), 200
 
         # Completed normally
-        return jsonify(result), 200
+        return jsonify(_project(result, fields)), 200
 
     except Exception as e:
         logger.exception("Error in /chat/resume: %s", e)
@@ -161,13 +327,165 @@ def resume_chat():
 
 
 # ==========================================================================================
-# /conversations/<user_id>
+# /contracts/compare  → Analyze several contracts concurrently, side by side
+# ==========================================================================================
+def _contracts_from_request(payload):
+    """
+    JSON {"contracts": [{"name": ..., "text": ...}]} or multipart "files".
+    Names default to contract_<n> and are made unique.
+    """
+    contracts = []
+    if request.files:
+        for f in request.files.getlist("files"):
+            contracts.append({"name": f.filename, "text": process_file(f)})
+    else:
+        for item in payload.get("contracts") or []:
+            if isinstance(item, str):
+                item = {"text": item}
+            contracts.append({"name": item.get("name"), "text": item.get("text") or ""})
+
+    seen = set()
+    for i, c in enumerate(contracts, start=1):
+        name = c["name"] or f"contract_{i}"
+        while name in seen:
+            name = f"{name} ({i})"
+        seen.add(name)
+        c["name"] = name
+    return contracts
+
+
+@app.route("/contracts/compare", methods=["POST"])
+def compare_contracts_route():
+    start = time.time()
+    logger.info("POST /contracts/compare called")
+
+    payload = request.get_json(silent=True) or request.form.to_dict()
+
+    try:
+        options = _run_options(payload)
+        contracts = _contracts_from_request(payload)
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
+    except FileReadError as e:
+        return jsonify({"status": "failed", "errors": e.errors}), e.http_status
+
+    if not 2 <= len(contracts) <= COMPARE_MAX_CONTRACTS:
+        return jsonify({"status": "failed",
+                        "errors": [f"between 2 and {COMPARE_MAX_CONTRACTS} contracts are required"]}), 400
+    empty = [c["name"] for c in contracts if not c["text"].strip()]
+    if empty:
+        return jsonify({"status": "failed", "errors": [f"empty contract text: {', '.join(empty)}"]}), 400
+
+    try:
+        deadline_at = resolve_deadline(payload.get("deadline_seconds"), COMPARE_DEADLINE_SECONDS)
+        result = run_sync(compare_contracts(contracts, deadline_at=deadline_at, options=options))
+        result["elapsed_s"] = round(time.time() - start, 2)
+        return jsonify({"status": "success", **result}), 200
+
+    except Exception as e:
+        logger.exception("Error in /contracts/compare: %s", e)
+        return jsonify({"status": "failed", "errors": [str(e)]}), 500
+
+
+
+# ==========================================================================================
+# /jobs/<job_id>  → Poll (optionally long-poll with ?wait=<seconds>)
+# ==========================================================================================
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    wait = min(request.args.get("wait", default=0, type=float), 60)
+    try:
+        fields = _response_fields()
+    except ValueError as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+
+    job = job_store.wait(job_id, timeout=wait) if wait > 0 else job_store.get(job_id)
+    if not job:
+        return jsonify({"status": "failed", "message": "Unknown job_id"}), 404
+
+    job.pop("version", None)
+    job["result"] = _project(job.get("result"), fields)
+    return jsonify(job), 200
+
+
+
+# ==========================================================================================
+# /jobs/<job_id>/events  → Push (Server-Sent Events)
+# ==========================================================================================
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    try:
+        fields = _response_fields()
+    except ValueError as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+    if not job_store.get(job_id):
+        return jsonify({"status": "failed", "message": "Unknown job_id"}), 404
+
+    def stream():
+        version = -1
+        while True:
+            if version < 0:
+                job = job_store.get(job_id)
+            else:
+                job = job_store.wait(job_id, timeout=15, after_version=version)
+            if job is None:
+                return
+
+            if job["version"] == version:
+                # keep-alive comment so proxies don't drop the connection
+                yield ": keep-alive\n\n"
+                continue
+
+            version = job["version"]
+            job["result"] = _project(job.get("result"), fields)
+            yield f"id: {version}\nevent: {job['status']}\ndata: {app.json.dumps(job)}\n\n"
+
+            if job["status"] in TERMINAL_STATUSES:
+                return
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
+
+
+
+# ==========================================================================================
+# /debug/trace/<thread_id>  → Span timeline (?format=otlp, ?export=1)
+# ==========================================================================================
+@app.route("/debug/trace/<thread_id>", methods=["GET"])
+def debug_trace(thread_id):
+    spans = get_spans(thread_id)
+    if not spans:
+        return jsonify({"status": "failed", "message": "No spans recorded for thread_id"}), 404
+
+    if request.args.get("export") in ("1", "true"):
+        written = export_otlp(TRACE_EXPORT_PATH, thread_id)
+        return jsonify({"status": "success", "exported_spans": written, "path": TRACE_EXPORT_PATH}), 200
+
+    if request.args.get("format") == "otlp":
+        return jsonify(to_otlp(spans)), 200
+
+    return jsonify({
+        "thread_id": thread_id,
+        "summary": summarize_spans(spans),
+        "spans": spans,
+    }), 200
+
+
+
+# ==========================================================================================
+# /conversations/<user_id>  → ?limit=20&cursor=<next_cursor>
 # ==========================================================================================
 @app.route("/conversations/<user_id>", methods=["GET"])
 def list_convs(user_id):
     try:
-        convs = list_conversations_for_user(uuid.UUID(user_id))
-        return jsonify(convs), 200
+        page = conversation_repo.list_for_user(
+            uuid.UUID(user_id),
+            limit=request.args.get("limit", default=20, type=int),
+            cursor=request.args.get("cursor"),
+        )
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
     except Exception as e:
         logger.exception("Error: %s", e)
         return jsonify({"status": "failed", "errors": [str(e)]}), 500
@@ -175,19 +493,129 @@ def list_convs(user_id):
 
 
 # ==========================================================================================
-# /conversation/<conv_id>/messages
+# /conversation/<conv_id>/messages  → ?limit=200&cursor=<next_cursor>
 # ==========================================================================================
 @app.route("/conversation/<conv_id>/messages", methods=["GET"])
 def get_msgs(conv_id):
     try:
-        msgs = get_conversation_messages(uuid.UUID(conv_id))
-        return jsonify(msgs), 200
+        page = conversation_repo.get_messages(
+            uuid.UUID(conv_id),
+            limit=request.args.get("limit", default=200, type=int),
+            cursor=request.args.get("cursor"),
+        )
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
     except Exception as e:
         logger.exception("Error fetching messages: %s", e)
         return jsonify({"status": "failed", "errors": [str(e)]}), 500
 
 
 
+# ==========================================================================================
+# /search/<user_id>  → ?q=indemnity cap&limit=20&cursor=<next_cursor>
+#   Ranked conversations with a highlighted snippet of their best match
+# ==========================================================================================
+@app.route("/search/<user_id>", methods=["GET"])
+def search_convs(user_id):
+    try:
+        page = conversation_repo.search(
+            uuid.UUID(user_id),
+            request.args.get("q", ""),
+            limit=request.args.get("limit", default=20, type=int),
+            cursor=request.args.get("cursor"),
+        )
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
+    except Exception as e:
+        logger.exception("Error searching conversations: %s", e)
+        return jsonify({"status": "failed", "errors": [str(e)]}), 500
+
+
+
+# ==========================================================================================
+# /risks/<user_id>  → Portfolio query over stored risk items
+#   ?type=Compliance&impact=High,Medium&contract_hash=&conversation_id=
+#   &match={"mitigation": "..."}&limit=50&cursor=<next_cursor>
+# ==========================================================================================
+def _csv_arg(name):
+    values = [v.strip() for raw in request.args.getlist(name) for v in raw.split(",")]
+    return [v for v in values if v] or None
+
+
+@app.route("/risks/<user_id>", methods=["GET"])
+def query_risks(user_id):
+    try:
+        match = request.args.get("match")
+        match = json.loads(match) if match else None
+        if match is not None and not isinstance(match, dict):
+            raise ValueError("match must be a JSON object")
+
+        conversation_id = request.args.get("conversation_id")
+        page = query_risk_items(
+            uuid.UUID(user_id),
+            risk_types=_csv_arg("type"),
+            impacts=_csv_arg("impact"),
+            contract_hash=request.args.get("contract_hash"),
+            conversation_id=uuid.UUID(conversation_id) if conversation_id else None,
+            payload_contains=match,
+            limit=request.args.get("limit", default=50, type=int),
+            cursor=request.args.get("cursor", type=int),
+        )
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
+    except Exception as e:
+        logger.exception("Error querying risk items: %s", e)
+        return jsonify({"status": "failed", "errors": [str(e)]}), 500
+
+    return jsonify(page), 200
+
+
+
+# ==========================================================================================
+# /analytics/<scope>/<key>  → Portfolio dashboard (scope: user → user_id, org → email domain)
+#   ?days=365&bucket=month&top=10
+# ==========================================================================================
+@app.route("/analytics/<scope>/<key>", methods=["GET"])
+def risk_analytics(scope, key):
+    start = time.time()
+    try:
+        result = portfolio_analytics(
+            scope,
+            uuid.UUID(key) if scope == "user" else key.lower(),
+            days=request.args.get("days", default=365, type=int),
+            bucket=request.args.get("bucket", default="month"),
+            top=request.args.get("top", default=10, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"status": "failed", "errors": [str(e)]}), 400
+    except Exception as e:
+        logger.exception("Error computing analytics: %s", e)
+        return jsonify({"status": "failed", "errors": [str(e)]}), 500
+
+    result["elapsed_ms"] = round((time.time() - start) * 1000, 1)
+    return jsonify(result), 200
+
+
+
+# ==========================================================================================
+# /contracts/<contract_hash>  → Full text behind a "blob:sha256:<hash>" reference
+# ==========================================================================================
+@app.route("/contracts/<contract_hash>", methods=["GET"])
+def get_contract_text(contract_hash):
+    try:
+        text = get_text(BLOB_REF_PREFIX + contract_hash.lower())
+    except KeyError:
+        return jsonify({"status": "failed", "errors": ["contract not found"]}), 404
+    except Exception as e:
+        logger.exception("Error fetching contract blob: %s", e)
+        return jsonify({"status": "failed", "errors": [str(e)]}), 500
+
+    return jsonify({"contract_hash": contract_hash.lower(), "text": text}), 200
+
+
+
 # ==========================================================================================
 # Static Files
 # ==========================================================================================
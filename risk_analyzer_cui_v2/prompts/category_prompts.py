@@ -0,0 +1,49 @@
+# Focused prompts for the parallel category-specialist analyzers.
+# Each specialist looks at ONE category and returns the same JSON schema
+# as risk_analysis_prompt, so the merged report is interchangeable.
+
+CATEGORY_FOCUS = {
+    "Financial": "payment terms, pricing, budget, cost overruns, penalties, liquidated damages, currency and invoicing",
+    "Compliance / Legal": "liability, indemnity, IP ownership, confidentiality, termination, governing law, regulatory and data-protection obligations",
+    "Technical": "architecture, integrations, technology choices, performance, security and technical dependencies",
+    "Operational": "processes, support and maintenance, service levels, handovers and operational dependencies",
+    "Strategic": "business alignment, vendor lock-in, market or stakeholder changes and long-term commitments",
+    "Resource / Staffing": "team size, key-person dependencies, skills, subcontractors and availability",
+    "Timeline / Delivery": "milestones, deadlines, acceptance criteria, delivery dependencies and schedule slippage",
+}
+
+category_risk_prompt = """
+You are an Expert Contract & Project Risk Analyst specialising ONLY in {category} risks
+({focus}).
+
+Analyze the input below and report ONLY {category} risks. Ignore every other category.
+If the input contains no {category} risks, return an empty "analysis" list.
+Ask for clarification ONLY if the input is too incomplete to assess {category} risks at all.
+
+Return STRICTLY in the following JSON format:
+
+{{
+"human_input": false,
+"clarification": [],
+"analysis": [
+    {{
+    "risk": "Describe the identified risk",
+    "type": "{category}",
+    "impact": "High / Medium / Low",
+    "reason": "Explain the cause of the risk",
+    "mitigation": "Provide actionable mitigation steps"
+    }}
+]
+}}
+
+Do NOT output anything outside this JSON.
+
+--------------------------------------------------------
+## INPUT DATA
+
+"""
+
+category_prompts = {
+    category: category_risk_prompt.format(category=category, focus=focus)
+    for category, focus in CATEGORY_FOCUS.items()
+}
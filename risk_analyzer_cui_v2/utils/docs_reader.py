@@ -27,6 +27,28 @@ def process_file(file_storage) -> str:
     _, ext = os.path.splitext(filename)
     ext = ext.lower()
 
+    _check_extension(ext)
+
+    return _extract_text(file_storage, ext)
+
+
+def read_contract_file(path: str) -> str:
+    """
+    Extract plain text from a contract file on disk.
+
+    Same rules and errors as process_file(); used by offline/bulk runs.
+    Top-level function so it can be shipped to a ProcessPoolExecutor.
+    """
+    _, ext = os.path.splitext(path)
+    ext = ext.lower()
+
+    _check_extension(ext)
+
+    with open(path, "rb") as fh:
+        return _extract_text(fh, ext)
+
+
+def _check_extension(ext: str) -> None:
     if ext not in ALLOWED_EXTENSIONS:
         raise FileReadError(
             message="Unsupported file type.",
@@ -37,15 +59,17 @@ def process_file(file_storage) -> str:
             ],
         )
 
+
+def _extract_text(stream, ext: str) -> str:
     try:
         text = ""
 
         if ext == ".txt":
-            raw = file_storage.read()
+            raw = stream.read()
             text = raw.decode("utf-8", errors="ignore")
 
         elif ext == ".pdf":
-            reader = PdfReader(file_storage)
+            reader = PdfReader(stream)
             pages = []
             for page in reader.pages:
                 page_text = page.extract_text() or ""
@@ -53,7 +77,7 @@ def process_file(file_storage) -> str:
             text = "\n\n".join(pages)
 
         elif ext == ".docx":
-            doc = docx.Document(file_storage)
+            doc = docx.Document(stream)
             paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
             text = "\n\n".join(paragraphs)
 
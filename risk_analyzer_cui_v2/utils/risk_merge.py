@@ -0,0 +1,148 @@
+# utils/risk_merge.py
+import re
+from typing import Any, Dict, List, Optional
+
+
+# -------------------------------------------------------
+# Merge category-specialist reports into one analysis
+# -------------------------------------------------------
+# Specialists overlap (a penalty clause is both Financial and Legal), so
+# near-identical risks are collapsed, keeping the higher-impact entry.
+# -------------------------------------------------------
+
+IMPACT_RANK = {"high": 0, "medium": 1, "low": 2}
+SIMILARITY_THRESHOLD = 0.7
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "be", "may", "with", "by", "if", "not"}
+
+
+def _tokens(text) -> frozenset:
+    return frozenset(w for w in _WORD.findall(str(text or "").lower()) if w not in _STOPWORDS)
+
+
+def _similar(a: frozenset, b: frozenset) -> bool:
+    if not a or not b:
+        return a == b
+    return len(a & b) / len(a | b) >= SIMILARITY_THRESHOLD
+
+
+def _rank(item: Dict[str, Any]) -> int:
+    return IMPACT_RANK.get(str(item.get("impact") or "").strip().lower(), len(IMPACT_RANK))
+
+
+def merge_reports(reports: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge {category: parsed specialist report} into the risk_analysis_prompt
+    schema. Items without a type get their specialist's category. Clarification
+    is only requested when no specialist could produce any analysis.
+    """
+    merged: List[Dict[str, Any]] = []
+    keys: List[frozenset] = []
+    clarification: List[str] = []
+
+    for category, report in reports.items():
+        if not isinstance(report, dict):
+            continue
+
+        for question in report.get("clarification") or []:
+            if question and question not in clarification:
+                clarification.append(question)
+
+        for item in report.get("analysis") or []:
+            if not isinstance(item, dict) or not item.get("risk"):
+                continue
+            item = dict(item)
+            item.setdefault("type", category)
+
+            key = _tokens(item["risk"])
+            dup = next((i for i, k in enumerate(keys) if _similar(k, key)), None)
+            if dup is None:
+                merged.append(item)
+                keys.append(key)
+            elif _rank(item) < _rank(merged[dup]):
+                merged[dup] = item
+
+    merged.sort(key=_rank)
+
+    if not merged and clarification:
+        return {"human_input": True, "clarification": clarification}
+    return {"human_input": False, "analysis": merged}
+
+
+# -------------------------------------------------------
+# Side-by-side comparison of several contracts
+# -------------------------------------------------------
+IMPACT_LEVELS = ("High", "Medium", "Low")
+
+
+def _impact_label(item: Dict[str, Any]) -> str:
+    value = str(item.get("impact") or "").strip().capitalize()
+    return value if value in IMPACT_LEVELS else "Unspecified"
+
+
+def compare_reports(reports: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Build a comparison of {contract name: risk report}:
+
+    - matrix: {category: {contract: {"High": n, "Medium": n, "Low": n, ...}}}
+    - shared_risks: risks raised (near-identically) for two or more contracts,
+      listed once with the impact per contract
+    - unique_risks: {contract: [risks only that contract has]}
+    """
+    names = list(reports)
+    matrix: Dict[str, Dict[str, Dict[str, int]]] = {}
+    clusters: List[Dict[str, Any]] = []
+    keys: List[frozenset] = []
+
+    for name, report in reports.items():
+        for item in (report or {}).get("analysis") or []:
+            if not isinstance(item, dict) or not item.get("risk"):
+                continue
+
+            category = str(item.get("type") or "General").strip()
+            impact = _impact_label(item)
+            cell = matrix.setdefault(category, {}).setdefault(name, {level: 0 for level in IMPACT_LEVELS})
+            cell[impact] = cell.get(impact, 0) + 1
+
+            key = _tokens(item["risk"])
+            idx = next((i for i, k in enumerate(keys) if _similar(k, key)), None)
+            if idx is None:
+                clusters.append({"risk": item["risk"], "type": category, "item": item, "contracts": {}})
+                keys.append(key)
+                idx = len(clusters) - 1
+            # A contract raising the same risk twice keeps its worst impact
+            seen = clusters[idx]["contracts"].get(name)
+            if seen is None or _rank(item) < IMPACT_RANK.get(seen.lower(), len(IMPACT_RANK)):
+                clusters[idx]["contracts"][name] = impact
+
+    # Every contract gets a cell in every row so the matrix renders as a grid
+    empty = {level: 0 for level in IMPACT_LEVELS}
+    for row in matrix.values():
+        for name in names:
+            row.setdefault(name, dict(empty))
+
+    shared = [
+        {"risk": c["risk"], "type": c["type"], "contracts": c["contracts"]}
+        for c in clusters if len(c["contracts"]) > 1
+    ]
+    shared.sort(key=lambda c: (-len(c["contracts"]), min(IMPACT_RANK.get(v.lower(), len(IMPACT_RANK)) for v in c["contracts"].values())))
+
+    unique = {name: [] for name in names}
+    for c in clusters:
+        if len(c["contracts"]) == 1:
+            unique[next(iter(c["contracts"]))].append(c["item"])
+
+    return {
+        "matrix": dict(sorted(matrix.items())),
+        "shared_risks": shared,
+        "unique_risks": unique,
+    }
+
+
+def theme_key(text, max_tokens: int = 8) -> str:
+    """
+    Order-insensitive key for recurring-risk grouping: "Uncapped penalty
+    clause" and "Penalty clause uncapped" share a theme.
+    """
+    return " ".join(sorted(_tokens(text))[:max_tokens])[:200]
@@ -0,0 +1,110 @@
+# utils/summary_renderer.py
+from typing import Any, Dict, List
+
+
+# -------------------------------------------------------
+# Deterministic markdown summary of a risk report
+# -------------------------------------------------------
+# Same sections the summarizer prompt asks the LLM for (posture, critical
+# risks, risks by category, mitigation themes), built from the report
+# with plain string formatting — no LLM call.
+# -------------------------------------------------------
+
+IMPACT_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+UNSPECIFIED = "Unspecified"
+MAX_THEMES = 5
+REQUIRED_FIELDS = ("risk", "type", "impact")
+
+
+def _impact(item: Dict[str, Any]) -> str:
+    value = str(item.get("impact") or "").strip().capitalize()
+    return value if value in IMPACT_ORDER else UNSPECIFIED
+
+
+def _rank(impact: str) -> int:
+    return IMPACT_ORDER.get(impact, len(IMPACT_ORDER))
+
+
+def _text(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+def _first_sentence(text: str) -> str:
+    for sep in (". ", "; "):
+        if sep in text:
+            return text.split(sep, 1)[0].rstrip(".") + "."
+    return text
+
+
+def is_well_formed(report) -> bool:
+    """
+    True when every analysis item is a dict with the fields the renderer needs.
+    """
+    if not isinstance(report, dict):
+        return False
+    analysis = report.get("analysis")
+    if not isinstance(analysis, list) or not analysis:
+        return False
+    return all(
+        isinstance(item, dict) and all(_text(item.get(f)) for f in REQUIRED_FIELDS)
+        for item in analysis
+    )
+
+
+def render_summary(report: Dict[str, Any]) -> str:
+    """
+    Markdown summary: overall posture, high-impact risks, risks grouped
+    by type (ordered by impact) and the main mitigation themes.
+    """
+    risks: List[Dict[str, Any]] = [r for r in (report or {}).get("analysis") or [] if isinstance(r, dict)]
+    if not risks:
+        clarification = (report or {}).get("clarification") or []
+        if clarification:
+            lines = ["**More information is needed before the risks can be assessed:**"]
+            lines.extend(f"- {_text(q)}" for q in clarification)
+            return "\n".join(lines)
+        return "No risks were identified in the analysis."
+
+    counts = {level: 0 for level in (*IMPACT_ORDER, UNSPECIFIED)}
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for r in risks:
+        counts[_impact(r)] += 1
+        groups.setdefault(_text(r.get("type")) or "General", []).append(r)
+
+    posture = next((level for level in IMPACT_ORDER if counts[level]), UNSPECIFIED)
+    breakdown = ", ".join(f"{counts[level]} {level.lower()}" for level in IMPACT_ORDER if counts[level])
+    lines = [
+        f"**Overall risk posture: {posture}** — {len(risks)} risk{'s' if len(risks) != 1 else ''} "
+        f"across {len(groups)} categor{'ies' if len(groups) != 1 else 'y'}"
+        + (f" ({breakdown} impact)." if breakdown else "."),
+    ]
+
+    high = [r for r in risks if _impact(r) == "High"]
+    if high:
+        lines += ["", "### Critical risks"]
+        for r in high:
+            reason = _text(r.get("reason"))
+            lines.append(f"- **{_text(r.get('type')) or 'General'}** — {_text(r.get('risk'))}"
+                         + (f" _(cause: {_first_sentence(reason)})_" if reason else ""))
+
+    # Categories with the most severe risks first, then the busiest ones
+    ordered = sorted(groups.items(), key=lambda kv: (min(_rank(_impact(r)) for r in kv[1]), -len(kv[1]), kv[0]))
+    lines += ["", "### Risks by category"]
+    for name, items in ordered:
+        lines.append(f"**{name}** ({len(items)})")
+        for r in sorted(items, key=lambda r: _rank(_impact(r))):
+            lines.append(f"- [{_impact(r)}] {_text(r.get('risk'))}")
+
+    themes, seen = [], set()
+    for r in sorted(risks, key=lambda r: _rank(_impact(r))):
+        theme = _first_sentence(_text(r.get("mitigation")))
+        if theme and theme.lower() not in seen:
+            seen.add(theme.lower())
+            themes.append(theme)
+        if len(themes) == MAX_THEMES:
+            break
+    if themes:
+        lines += ["", "### Mitigation themes"]
+        lines.extend(f"- {t}" for t in themes)
+
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+# worker.py
+"""
+Durable analysis worker.
+
+Claims jobs from the Postgres `analysis_jobs` queue and runs them through
+the OrchestratorAgent graph. Start as many of these as needed, on as many
+machines as needed, against the same database:
+
+    python worker.py --concurrency 4
+"""
+import os
+import time
+import uuid
+import signal
+import socket
+import argparse
+import threading
+
+from core.logger import logger, setup_logging
+from core.jobs import outcome_for_result
+from core.job_queue import (
+    claim_job,
+    heartbeat_job,
+    complete_job,
+    fail_job,
+    reap_expired_leases,
+)
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.agent_state import AgentState
+from core.deadline import resolve_deadline
+from core.conversation_repo import conversation_scope
+from core.message_buffer import message_buffer
+from app_config import (
+    JOB_DEADLINE_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+)
+
+
+def run_job(job):
+    """
+    Execute one claimed job and return the graph result.
+
+    Safe to run again for the same job (retry after a failure, or a lease
+    reclaimed from a dead worker): the job's messages are keyed by job_id,
+    and an attempt that finds checkpoints of an earlier one continues from
+    them instead of applying the input to the thread again.
+    """
+    payload = job["payload"] or {}
+    job_id = job["job_id"]
+    thread_id = job["thread_id"]
+    deadline_at = resolve_deadline(payload.get("deadline_seconds"), JOB_DEADLINE_SECONDS)
+
+    if job["attempts"] > 1:
+        agent = OrchestratorAgent.from_job_checkpoint(thread_id, job_id)
+        if agent is not None:
+            result = agent.continue_run(deadline_at)
+            if job["kind"] == "start":
+                agent.save_reply(result)
+            return result
+
+    options = payload.get("options") or {}  # summary_mode / analysis_mode / durability, validated by the API
+
+    if job["kind"] == "start":
+        message = payload["message"]
+        state = AgentState(
+            user_id=job["user_id"],
+            input_contract=message,
+            input_history=[message],
+            thread_id=thread_id,
+            deadline_at=deadline_at,
+            **options
+        )
+        return OrchestratorAgent(state, job_id=job_id).run()
+
+    agent = OrchestratorAgent.from_checkpoint(thread_id, payload.get("decision", ""), job_id=job_id)
+    if agent is None:
+        raise RuntimeError(f"No saved state found for thread_id={thread_id}")
+    agent.state.deadline_at = deadline_at
+    for key, value in options.items():
+        setattr(agent.state, key, value)
+    return agent.invoke_graph(agent.state.model_dump())
+
+
+class Heartbeat(threading.Thread):
+    """
+    Extends the job lease in the background while the graph runs.
+    """
+
+    def __init__(self, job_id: str, lease_token: str):
+        super().__init__(name=f"heartbeat-{job_id[:8]}", daemon=True)
+        self.job_id = job_id
+        self.lease_token = lease_token
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                if not heartbeat_job(self.job_id, self.lease_token, JOB_LEASE_SECONDS):
+                    # Another worker owns the job now; complete_job() will discard our result
+                    logger.warning("Lease lost for job_id=%s", self.job_id)
+                    return
+            except Exception as e:
+                # Transient DB error: keep trying until the lease actually expires
+                logger.exception("Heartbeat failed for job_id=%s: %s", self.job_id, e)
+
+    def stop(self):
+        self._done.set()
+
+
+def process_job(job):
+    job_id, lease_token = job["job_id"], job["lease_token"]
+    logger.info("Processing job_id=%s kind=%s attempt=%d/%d",
+                job_id, job["kind"], job["attempts"], job["max_attempts"])
+
+    heartbeat = Heartbeat(job_id, lease_token)
+    heartbeat.start()
+    start = time.time()
+
+    try:
+        with conversation_scope():
+            result = run_job(job)
+    except Exception as e:
+        logger.exception("Job failed: job_id=%s error=%s", job_id, e)
+        heartbeat.stop()
+        fail_job(job_id, lease_token, str(e), JOB_RETRY_BACKOFF_SECONDS)
+        return
+
+    heartbeat.stop()
+    try:
+        message_buffer.flush()   # a finished job's messages are readable from any process
+    except Exception as e:
+        logger.error("Message flush after job_id=%s failed; the buffer will retry: %s", job_id, e)
+    outcome = outcome_for_result(result)
+    complete_job(job_id, lease_token, outcome["status"], result, outcome.get("errors"))
+    logger.info("Job done: job_id=%s status=%s elapsed=%.2fs", job_id, outcome["status"], time.time() - start)
+
+
+def worker_loop(worker_id: str, stop: threading.Event):
+    last_reap = 0.0
+
+    while not stop.is_set():
+        try:
+            # Any worker may reap; SKIP LOCKED keeps concurrent reapers from colliding
+            if time.time() - last_reap > JOB_LEASE_SECONDS / 2:
+                reap_expired_leases()
+                last_reap = time.time()
+
+            job = claim_job(worker_id, JOB_LEASE_SECONDS)
+        except Exception as e:
+            logger.exception("Queue access failed (%s); backing off", e)
+            stop.wait(JOB_POLL_INTERVAL_SECONDS * 5)
+            continue
+
+        if not job:
+            stop.wait(JOB_POLL_INTERVAL_SECONDS)
+            continue
+
+        process_job(job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable analysis queue worker")
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs processed in parallel")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = threading.Event()
+
+    def _shutdown(signum, frame):
+        logger.info("Signal %s received; finishing in-flight jobs", signum)
+        stop.set()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    threads = []
+    for i in range(args.concurrency):
+        worker_id = f"{base_id}:{i}:{uuid.uuid4().hex[:6]}"
+        t = threading.Thread(target=worker_loop, args=(worker_id, stop), name=f"worker-{i}")
+        t.start()
+        threads.append(t)
+
+    logger.info("Worker %s started with concurrency=%d", base_id, args.concurrency)
+
+    for t in threads:
+        while t.is_alive():
+            t.join(timeout=1)
+
+    message_buffer.close()
+
+
+if __name__ == "__main__":
+    main()